@@ -531,6 +531,7 @@ function cleanSourceData() {
     if (lastRow > 1) {
       sourceSheet.deleteRows(2, lastRow - 1);
     }
+    invalidateSourceUrlIndex();
     return {
       success: true,
       message: 'クリーニング完了（全削除）',
@@ -552,6 +553,10 @@ function cleanSourceData() {
     sourceSheet.deleteRows(newLastRow + 1, lastRow - newLastRow);
   }
 
+  if (removedCount > 0) {
+    invalidateSourceUrlIndex();
+  }
+
   return {
     success: true,
     message: 'クリーニング完了',
@@ -560,6 +565,35 @@ function cleanSourceData() {
   };
 }
 
+/**
+ * receiver のURLインデックスを削除（記録数が変わったため次回記録時に再構築される）
+ * RECEIVER_WEBAPP_URL があれば receiver の invalidateUrlIndex に依頼する（記録中のインデックス保存と競合しない）。
+ * 未設定の場合だけ直接削除する（receiver の記録と重なると古いインデックスが残り得る）
+ */
+function invalidateSourceUrlIndex() {
+  if (RECEIVER_WEBAPP_URL) {
+    const response = UrlFetchApp.fetch(RECEIVER_WEBAPP_URL, {
+      method: 'post',
+      contentType: 'application/json',
+      payload: JSON.stringify({ action: 'invalidateUrlIndex' }),
+      muteHttpExceptions: true
+    });
+    const result = JSON.parse(response.getContentText());
+    if (!result.success) {
+      throw new Error('URLインデックスの削除に失敗しました: ' + (result.error || response.getResponseCode()));
+    }
+    Logger.log('URLインデックスを削除しました（receiver 側で再構築されます）');
+    return;
+  }
+
+  Logger.log('RECEIVER_WEBAPP_URL が未設定のため、URLインデックスを直接削除します');
+  const indexSheet = SpreadsheetApp.openById(SOURCE_SPREADSHEET_ID).getSheetByName(SOURCE_URL_INDEX_SHEET_NAME);
+  if (indexSheet) {
+    indexSheet.getParent().deleteSheet(indexSheet);
+    Logger.log('URLインデックスを削除しました（receiver 側で再構築されます）');
+  }
+}
+
 /**
  * 日次トリガーを設定（初回のみ手動実行）
  */
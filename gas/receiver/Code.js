@@ -6,6 +6,9 @@
 // スプレッドシートのシート名
 const SHEET_NAME = '記録データ';
 const TRACKING_SHEET_NAME = 'トラッキング';
+const URL_INDEX_SHEET_NAME = '_URLインデックス';  // URL → 記録数・トラッキング行（非表示）
+const BATCH_LOG_SHEET_NAME = '_一括記録ID';  // 適用済みの一括記録ID（再送の重複防止、非表示）
+const BATCH_LOG_MAX_ROWS = 5000;  // 一括記録IDを残す件数（超えたら古いものから削除）
 
 // トラッキング設定
 const TRACKING_DAYS = 14;  // 追跡期間（日数）
@@ -24,6 +27,7 @@ function onOpen() {
   ui.createMenu('📈 Note Sales Tracker')
     .addItem('🆕 新しい記録シートを作成', 'createNewSheetWithUI')
     .addItem('🧹 重複URLをクリーニング', 'cleanDuplicatesWithUI')
+    .addItem('🔄 URLインデックスを再構築', 'rebuildUrlIndex')
     .addSeparator()
     .addItem('📊 統計情報を表示', 'showStats')
     .addToUi();
@@ -58,6 +62,7 @@ function createNewSheetWithUI() {
   // 新しいシートを作成
   const newSheet = ss.insertSheet(SHEET_NAME);
   setupSheetWithAnalysisColumns(newSheet);
+  rebuildUrlIndex();
 
   ui.alert(
     '作成完了',
@@ -259,9 +264,8 @@ function initializeSheet() {
  * POSTリクエストを処理（拡張機能からのデータ受信）
  */
 function doPost(e) {
+  let data;
   try {
-    let data;
-
     // postDataがある場合はJSONとしてパース
     if (e.postData && e.postData.contents) {
       data = JSON.parse(e.postData.contents);
@@ -274,12 +278,29 @@ function doPost(e) {
 
     // トラッキング結果更新
     if (data.action === 'updateTrackingResults' && data.results) {
-      const result = updateTrackingResults(data.results);
+      const result = updateTrackingResults(data.results, data.runId);
+      return ContentService
+        .createTextOutput(JSON.stringify(result))
+        .setMimeType(ContentService.MimeType.JSON);
+    }
+
+    // URLインデックスの削除（organizer のクリーニング後）
+    if (data.action === 'invalidateUrlIndex') {
+      const result = invalidateUrlIndex();
       return ContentService
         .createTextOutput(JSON.stringify(result))
         .setMimeType(ContentService.MimeType.JSON);
     }
 
+    // 一括記録（配列 または { action: 'recordBatch', records: [...] }）
+    if (Array.isArray(data) || (data.action === 'recordBatch' && Array.isArray(data.records))) {
+      const records = Array.isArray(data) ? data : data.records;
+      const results = recordArticles(records, data.batchId);
+      return ContentService
+        .createTextOutput(JSON.stringify({ success: true, count: results.length, results: results, batchId: data.batchId }))
+        .setMimeType(ContentService.MimeType.JSON);
+    }
+
     // データを記録
     const result = recordArticle(data);
 
@@ -288,10 +309,12 @@ function doPost(e) {
       .setMimeType(ContentService.MimeType.JSON);
 
   } catch (error) {
+    // batchId を返す＝同じIDの再送は重複して記録しない（送信側はこれを見て再送してよいか判断する）
     return ContentService
       .createTextOutput(JSON.stringify({
         success: false,
-        error: error.message
+        error: error.message,
+        batchId: data && !Array.isArray(data) ? data.batchId : undefined
       }))
       .setMimeType(ContentService.MimeType.JSON);
   }
@@ -352,49 +375,59 @@ function doGet(e) {
  * 重複URLは新しい行として追記（履歴として保持）
  */
 function recordArticle(data) {
-  // 除外著者チェック
-  const author = String(data.author || '');
-  for (const excludeAuthor of EXCLUDE_AUTHORS) {
-    if (author.includes(excludeAuthor)) {
-      return {
+  return recordArticles([data])[0];
+}
+
+/**
+ * 複数の記事データを一括でスプレッドシートに記録
+ * 行データは setValues 1回、分析列の数式は列ごとに1回でまとめて書き込む
+ * batchId を指定すると、同じIDの一括記録は1回だけ適用する（送信側の再送・スプールからの再送で行を重複させない）。
+ * 適用済みのIDには前回の記録結果を返す
+ * @param {Array} records 記事データ配列
+ * @param {string} batchId 一括記録ID（省略可）
+ * @return {Array} 記事ごとの記録結果（recordArticle と同じ形式、入力と同じ順序）
+ */
+function recordArticles(records, batchId) {
+  const lock = LockService.getScriptLock();
+  lock.waitLock(30000);
+  try {
+    if (batchId) {
+      const applied = findAppliedBatch_(batchId);
+      if (applied) return applied;
+    }
+    return recordArticlesLocked_(records, batchId);
+  } finally {
+    lock.releaseLock();
+  }
+}
+
+function recordArticlesLocked_(records, batchId) {
+  const results = new Array(records.length);
+  const accepted = [];
+
+  records.forEach((data, index) => {
+    // 除外著者チェック
+    const author = String(data.author || '');
+    const excluded = EXCLUDE_AUTHORS.some(excludeAuthor => author.includes(excludeAuthor));
+    if (excluded) {
+      results[index] = {
         success: true,
         message: '除外著者のためスキップしました',
         skipped: true,
         author: author
       };
+      return;
     }
+    accepted.push({ data, index });
+  });
+
+  if (accepted.length === 0) {
+    return results;
   }
 
   const sheet = initializeSheet();
   const headerMap = getHeaderMap_(sheet);
 
-  // 日本時間でフォーマット
-  const recordedAt = data.recordedAt
-    ? new Date(data.recordedAt)
-    : new Date();
-  const formattedDate = Utilities.formatDate(
-    recordedAt,
-    'Asia/Tokyo',
-    'yyyy/MM/dd HH:mm:ss'
-  );
-
-  // 記事作成日をフォーマット
-  let formattedCreatedAt = '';
-  if (data.createdAt) {
-    try {
-      const createdAt = new Date(data.createdAt);
-      formattedCreatedAt = Utilities.formatDate(
-        createdAt,
-        'Asia/Tokyo',
-        'yyyy/MM/dd'
-      );
-    } catch (e) {
-      formattedCreatedAt = data.createdAt; // パース失敗時は元の値を使用
-    }
-  }
-
-  // 新しい行を追加（ヘッダー名に基づき列ずれを回避）
-  const lastRow = sheet.getLastRow() + 1;
   const columnDefaults = {
     '記録日時': 1,
     '作成日': 2,
@@ -409,79 +442,181 @@ function recordArticle(data) {
     '販売主張': 11,
     '24h購入確認': 12
   };
+  const colOf = (label) => headerMap[label] || columnDefaults[label];
+  const numCols = Math.max(sheet.getLastColumn(), 12);
+
+  // 追記開始行
+  const startRow = sheet.getLastRow() + 1;
+
+  // 同じURLの既存記録数はURLインデックスから取得（URL列は読まない）
+  const urlIndex = openUrlIndex_();
+
+  // 行データを組み立て（ヘッダー名に基づき列ずれを回避）
+  const rows = accepted.map(({ data }) => {
+    const row = new Array(numCols).fill('');
+    const setCellByHeader = (label, value) => {
+      const col = colOf(label);
+      if (!col || col > numCols) return;
+      row[col - 1] = value;
+    };
 
-  const setCellByHeader = (label, value) => {
-    const col = headerMap[label] || columnDefaults[label];
-    if (!col) return;
-    sheet.getRange(lastRow, col).setValue(value);
-  };
+    setCellByHeader('記録日時', formatRecordedAt_(data.recordedAt));
+    setCellByHeader('作成日', formatCreatedAt_(data.createdAt));
+    setCellByHeader('タイトル', data.title || '');
+    setCellByHeader('著者', data.author || '');
+    setCellByHeader('著者URL', data.authorUrl || '');
+    setCellByHeader('URL', data.url || '');
+    setCellByHeader('スキ数', data.likes || 0);
+    setCellByHeader('高評価数', data.highRating || 0);
+    setCellByHeader('価格', data.price || 0);
+    setCellByHeader('タグ', data.tags || '');
+    setCellByHeader('販売主張', data.salesClaim || '');
+    setCellByHeader('24h購入確認', data.purchased24h ? '○' : '');
+    // 任意列: ヘッダーに「キーワード」がある場合のみ、記事を見つけた検索キーワードを記録
+    setCellByHeader('キーワード', Array.isArray(data.keywords) ? data.keywords.join(',') : (data.keywords || ''));
+    // 任意列: ヘッダーに「ジャンル」がある場合のみ、スクレイパー側で判定したジャンルを記録
+    setCellByHeader('ジャンル', data.genre || '');
+    return row;
+  });
+
+  sheet.getRange(startRow, 1, rows.length, numCols).setValues(rows);
+  // 行を書いた直後に適用済みとして残す（この後の数式・トラッキング・インデックスで失敗しても、再送で行を重複させない）
+  const batchLogRow = batchId ? logBatch_(batchId, startRow, records.length) : 0;
+
+  // 分析列に数式を設定（列が存在する場合のみ、列ごとに一括）
+  const recordedAtCol = colOf('記録日時');
+  const createdAtCol = colOf('作成日');
+  const likesCol = colOf('スキ数');
+  const highRatingCol = colOf('高評価数');
+  const priceCol = colOf('価格');
 
-  setCellByHeader('記録日時', formattedDate);
-  setCellByHeader('作成日', formattedCreatedAt);
-  setCellByHeader('タイトル', data.title || '');
-  setCellByHeader('著者', data.author || '');
-  setCellByHeader('著者URL', data.authorUrl || '');
-  setCellByHeader('URL', data.url || '');
-  setCellByHeader('スキ数', data.likes || 0);
-  setCellByHeader('高評価数', data.highRating || 0);
-  setCellByHeader('価格', data.price || 0);
-  setCellByHeader('タグ', data.tags || '');
-  setCellByHeader('販売主張', data.salesClaim || '');
-  setCellByHeader('24h購入確認', data.purchased24h ? '○' : '');
-
-  // 分析列に数式を設定（列が存在する場合のみ）
-  const elapsedCol = headerMap['経過日数'];
-  const minRevenueCol = headerMap['最低売上推定'];
-  const purchaseRateCol = headerMap['購入者率(%)'];
-
-  const recordedAtCol = headerMap['記録日時'] || columnDefaults['記録日時'];
-  const createdAtCol = headerMap['作成日'] || columnDefaults['作成日'];
-  const likesCol = headerMap['スキ数'] || columnDefaults['スキ数'];
-  const highRatingCol = headerMap['高評価数'] || columnDefaults['高評価数'];
-  const priceCol = headerMap['価格'] || columnDefaults['価格'];
-
-  if (elapsedCol) {
+  const formulaColumns = [
     // 経過日数 = DATEDIF(作成日, 記録日時, "D") ※作成日が空の場合は空白
-    sheet.getRange(lastRow, elapsedCol).setFormulaR1C1(
-      `=IF(RC${createdAtCol}="","",DATEDIF(RC${createdAtCol},RC${recordedAtCol},"D"))`
-    );
-  }
-  if (minRevenueCol) {
+    [headerMap['経過日数'], `=IF(RC${createdAtCol}="","",DATEDIF(RC${createdAtCol},RC${recordedAtCol},"D"))`],
     // 最低売上推定 = 高評価数 × 価格
-    sheet.getRange(lastRow, minRevenueCol).setFormulaR1C1(
-      `=RC${highRatingCol}*RC${priceCol}`
-    );
-  }
-  if (purchaseRateCol) {
+    [headerMap['最低売上推定'], `=RC${highRatingCol}*RC${priceCol}`],
     // 購入者率(%) = 高評価数 / スキ数 × 100 ※スキ数が0の場合は空白
-    sheet.getRange(lastRow, purchaseRateCol).setFormulaR1C1(
-      `=IF(RC${likesCol}=0,"",ROUND(RC${highRatingCol}/RC${likesCol}*100,1))`
-    );
+    [headerMap['購入者率(%)'], `=IF(RC${likesCol}=0,"",ROUND(RC${highRatingCol}/RC${likesCol}*100,1))`]
+  ];
+  formulaColumns.forEach(([col, formula]) => {
+    if (!col) return;
+    sheet.getRange(startRow, col, rows.length, 1).setFormulasR1C1(rows.map(() => [formula]));
+  });
+
+  // バッチ内のURLをまとめてインデックスから読む（URLごとの検索・読み込みをしない）
+  urlIndex.prefetch(accepted.map(({ data }) => data.url).filter(Boolean));
+
+  accepted.forEach(({ data, index }, offset) => {
+    const sameUrlCount = data.url ? urlIndex.incrementCount(data.url) : 1;
+
+    // 24h購入確認ありの場合、トラッキングリストに追加
+    let trackingAdded = false;
+    if (data.purchased24h) {
+      trackingAdded = addToTracking(data, urlIndex);
+    }
+
+    results[index] = {
+      success: true,
+      message: sameUrlCount > 1
+        ? `更新として記録しました（${sameUrlCount}回目）`
+        : '新規記録しました',
+      row: startRow + offset,
+      isUpdate: sameUrlCount > 1,
+      recordCount: sameUrlCount,
+      trackingAdded: trackingAdded
+    };
+  });
+
+  urlIndex.save();
+  if (batchLogRow) {
+    getBatchLogSheet_().getRange(batchLogRow, 5).setValue(JSON.stringify(results));
   }
+  return results;
+}
+
+// ============================================
+// 一括記録ID（再送の重複防止）
+// ============================================
 
-  // 同じURLの記録数をカウント（データが1行しかない場合のエラー回避）
-  let sameUrlCount = 1;
-  if (lastRow > 1) {
-    const urlColumn = sheet.getRange(2, 6, lastRow - 1, 1).getValues();  // URL は 6列目
-    sameUrlCount = urlColumn.filter(row => row[0] === data.url).length;
+/**
+ * 一括記録IDのシートを取得（存在しない場合は作成）
+ * 列: 一括記録ID / 記録日時 / 開始行 / 件数 / 記録結果(JSON)
+ */
+function getBatchLogSheet_() {
+  const ss = SpreadsheetApp.getActiveSpreadsheet();
+  let sheet = ss.getSheetByName(BATCH_LOG_SHEET_NAME);
+  if (!sheet) {
+    sheet = ss.insertSheet(BATCH_LOG_SHEET_NAME);
+    sheet.hideSheet();
+    sheet.getRange(1, 1, 1, 5).setValues([['一括記録ID', '記録日時', '開始行', '件数', '記録結果']]);
   }
+  return sheet;
+}
 
-  // 24h購入確認ありの場合、トラッキングリストに追加
-  let trackingAdded = false;
-  if (data.purchased24h) {
-    trackingAdded = addToTracking(data);
+/**
+ * 一括記録IDを適用済みとして追記し、その行番号を返す（BATCH_LOG_MAX_ROWS を超えた古いIDは削除）
+ */
+function logBatch_(batchId, startRow, count) {
+  const sheet = getBatchLogSheet_();
+  let lastRow = sheet.getLastRow();
+  if (lastRow - 1 >= BATCH_LOG_MAX_ROWS) {
+    const excess = lastRow - BATCH_LOG_MAX_ROWS;
+    sheet.deleteRows(2, excess);
+    lastRow -= excess;
   }
+  sheet.getRange(lastRow + 1, 1, 1, 5).setValues([[batchId, formatRecordedAt_(), startRow, count, '']]);
+  return lastRow + 1;
+}
 
-  return {
-    success: true,
-    message: sameUrlCount > 1
-      ? `更新として記録しました（${sameUrlCount}回目）`
-      : '新規記録しました',
-    row: lastRow,
-    isUpdate: sameUrlCount > 1,
-    recordCount: sameUrlCount,
-    trackingAdded: trackingAdded
-  };
+/**
+ * 適用済みの一括記録IDなら記事ごとの記録結果（duplicate: true 付き）を返す。未適用なら null
+ * 行の書き込み後に失敗して結果が残っていない場合は、記録済みとしての結果を組み立てる
+ */
+function findAppliedBatch_(batchId) {
+  const sheet = getBatchLogSheet_();
+  const lastRow = sheet.getLastRow();
+  if (lastRow <= 1) return null;
+  const cell = sheet.getRange(2, 1, lastRow - 1, 1)
+    .createTextFinder(String(batchId))
+    .matchCase(true)
+    .matchEntireCell(true)
+    .findNext();
+  if (!cell) return null;
+  const [, , startRow, count, resultsJson] = sheet.getRange(cell.getRow(), 1, 1, 5).getValues()[0];
+  if (resultsJson) {
+    return JSON.parse(resultsJson).map(result => Object.assign(result, { duplicate: true }));
+  }
+  const results = [];
+  for (let i = 0; i < Number(count); i++) {
+    results.push({
+      success: true,
+      message: '記録済みの一括記録のため再記録しませんでした',
+      row: Number(startRow) + i,
+      isUpdate: true,
+      duplicate: true
+    });
+  }
+  return results;
+}
+
+/**
+ * 記録日時を日本時間でフォーマット
+ */
+function formatRecordedAt_(value) {
+  const recordedAt = value ? new Date(value) : new Date();
+  return Utilities.formatDate(recordedAt, 'Asia/Tokyo', 'yyyy/MM/dd HH:mm:ss');
+}
+
+/**
+ * 記事作成日をフォーマット
+ */
+function formatCreatedAt_(value) {
+  if (!value) return '';
+  try {
+    return Utilities.formatDate(new Date(value), 'Asia/Tokyo', 'yyyy/MM/dd');
+  } catch (e) {
+    return value; // パース失敗時は元の値を使用
+  }
 }
 
 function getHeaderMap_(sheet) {
@@ -613,6 +748,7 @@ function cleanDuplicates() {
     if (lastRow > 1) {
       sheet.deleteRows(2, lastRow - 1);
     }
+    rebuildUrlIndex();
     return {
       success: true,
       message: 'クリーニング完了（全削除）',
@@ -634,6 +770,9 @@ function cleanDuplicates() {
     sheet.deleteRows(newLastRow + 1, lastRow - newLastRow);
   }
 
+  // 記録数が変わったのでURLインデックスを作り直す
+  rebuildUrlIndex();
+
   return {
     success: true,
     message: 'クリーニング完了',
@@ -677,8 +816,9 @@ function initializeTrackingSheet() {
   }
 
   // ヘッダー行が空の場合のみ設定
-  const headerRange = sheet.getRange(1, 1, 1, 11);
-  if (headerRange.getValues()[0][0] === '') {
+  const headerRange = sheet.getRange(1, 1, 1, 12);
+  const header = headerRange.getValues()[0];
+  if (header[0] === '') {
     headerRange.setValues([[
       'URL',
       'タイトル',
@@ -690,7 +830,8 @@ function initializeTrackingSheet() {
       'ヒット回数',
       '最終チェック日',
       'ステータス',
-      'ヒット率(%)'
+      'ヒット率(%)',
+      '最終チェックID'
     ]]);
 
     // ヘッダー行の書式設定
@@ -710,12 +851,16 @@ function initializeTrackingSheet() {
     sheet.setColumnWidth(9, 110);   // 最終チェック日
     sheet.setColumnWidth(10, 80);   // ステータス
     sheet.setColumnWidth(11, 80);   // ヒット率
+    sheet.setColumnWidth(12, 150);  // 最終チェックID
 
     // フィルターを設定
-    sheet.getRange(1, 1, 1, 11).createFilter();
+    sheet.getRange(1, 1, 1, 12).createFilter();
 
     // 1行目を固定
     sheet.setFrozenRows(1);
+  } else if (header[11] === '') {
+    // 既存のシートに最終チェックID列（updateTrackingResults の重複適用防止）を追加
+    sheet.getRange(1, 12).setValue('最終チェックID');
   }
 
   return sheet;
@@ -724,22 +869,21 @@ function initializeTrackingSheet() {
 /**
  * トラッキングリストに記事を追加
  * @param {Object} data 記事データ
+ * @param {Object} urlIndex openUrlIndex_() のインデックス（省略時はこの関数内で開いて保存）
  * @return {boolean} 追加されたかどうか
  */
-function addToTracking(data) {
+function addToTracking(data, urlIndex) {
   const sheet = initializeTrackingSheet();
   const lastRow = sheet.getLastRow();
-
-  // 既にトラッキング中かチェック（URL列で検索）
-  if (lastRow > 1) {
-    const urls = sheet.getRange(2, 1, lastRow - 1, 1).getValues();
-    const statuses = sheet.getRange(2, 10, lastRow - 1, 1).getValues();
-
-    for (let i = 0; i < urls.length; i++) {
-      if (urls[i][0] === data.url && statuses[i][0] === '追跡中') {
-        // 既に追跡中の場合はスキップ
-        return false;
-      }
+  const index = urlIndex || openUrlIndex_();
+
+  // 既にトラッキング中かチェック（インデックスの行のステータスだけを確認）
+  const trackingRow = index.getTrackingRow(data.url);
+  if (trackingRow > 1 && trackingRow <= lastRow) {
+    const row = sheet.getRange(trackingRow, 1, 1, 10).getValues()[0];
+    if (row[0] === data.url && row[9] === '追跡中') {
+      // 既に追跡中の場合はスキップ
+      return false;
     }
   }
 
@@ -766,9 +910,248 @@ function addToTracking(data) {
     ''                      // ヒット率（後で計算）
   ]]);
 
+  index.setTrackingRow(data.url, newRow);
+  if (!urlIndex) {
+    index.save();
+  }
   return true;
 }
 
+// ============================================
+// URLインデックス
+// ============================================
+
+/**
+ * URLインデックスシートを取得（存在しない場合は作成して全件から構築）
+ */
+function getUrlIndexSheet_() {
+  const ss = SpreadsheetApp.getActiveSpreadsheet();
+  const sheet = ss.getSheetByName(URL_INDEX_SHEET_NAME);
+  if (sheet) {
+    return sheet;
+  }
+  return rebuildUrlIndex();
+}
+
+/**
+ * URLインデックスを削除（次回記録時に再構築される）
+ * organizer がクリーニングで記録シートの行を変えた後に呼ぶ。recordArticles と同じスクリプトロックの中で消し、
+ * 記録中のインデックス保存と入れ違いにならないようにする
+ * @return {Object} { success, deleted }
+ */
+function invalidateUrlIndex() {
+  const lock = LockService.getScriptLock();
+  lock.waitLock(30000);
+  try {
+    const ss = SpreadsheetApp.getActiveSpreadsheet();
+    const sheet = ss.getSheetByName(URL_INDEX_SHEET_NAME);
+    if (sheet) {
+      ss.deleteSheet(sheet);
+    }
+    return { success: true, deleted: !!sheet };
+  } finally {
+    lock.releaseLock();
+  }
+}
+
+/**
+ * URLインデックスを記録シート・トラッキングシートから作り直す
+ * 記録データ・トラッキングを1回ずつ読み、1回の setValues で書き込む
+ * @return {Sheet} インデックスシート
+ */
+function rebuildUrlIndex() {
+  const ss = SpreadsheetApp.getActiveSpreadsheet();
+  let indexSheet = ss.getSheetByName(URL_INDEX_SHEET_NAME);
+  if (!indexSheet) {
+    indexSheet = ss.insertSheet(URL_INDEX_SHEET_NAME);
+    indexSheet.hideSheet();
+  }
+
+  const counts = new Map();
+  const recordSheet = ss.getSheetByName(SHEET_NAME);
+  if (recordSheet && recordSheet.getLastRow() > 1) {
+    const urls = recordSheet.getRange(2, 6, recordSheet.getLastRow() - 1, 1).getValues();  // URL は 6列目
+    urls.forEach(([url]) => {
+      if (url) counts.set(url, (counts.get(url) || 0) + 1);
+    });
+  }
+
+  const trackingRows = new Map();
+  const trackingSheet = ss.getSheetByName(TRACKING_SHEET_NAME);
+  if (trackingSheet && trackingSheet.getLastRow() > 1) {
+    const data = trackingSheet.getRange(2, 1, trackingSheet.getLastRow() - 1, 10).getValues();
+    data.forEach((row, i) => {
+      if (row[0] && row[9] === '追跡中') trackingRows.set(row[0], i + 2);
+    });
+  }
+
+  const urls = new Set([...counts.keys(), ...trackingRows.keys()]);
+  const rows = [...urls].map(url => [url, counts.get(url) || 0, trackingRows.get(url) || '']);
+
+  indexSheet.clearContents();
+  indexSheet.getRange(1, 1, 1, 3).setValues([['URL', '記録数', 'トラッキング行']]);
+  if (rows.length > 0) {
+    indexSheet.getRange(2, 1, rows.length, 3).setValues(rows);
+  }
+  return indexSheet;
+}
+
+/**
+ * URLインデックスを開く
+ * - URLの検索は TextFinder（シート側の検索）で行い、列全体をスクリプトに読み込まない。
+ *   prefetch() は複数URLを正規表現の TextFinder 1回（URL_INDEX_FIND_CHUNK 件ごと）で探し、
+ *   見つかった行は近いもの同士（URL_INDEX_ROW_GAP 行以内）をまとめて1回で読む
+ * - 1回の実行内で参照したURLはメモリにキャッシュし、save() でまとめて書き戻す。
+ *   既存行の書き戻しは読み込み済みの行が続く範囲ごとに setValues 1回
+ */
+const URL_INDEX_FIND_CHUNK = 50;
+const URL_INDEX_ROW_GAP = 200;
+
+function openUrlIndex_() {
+  const sheet = getUrlIndexSheet_();
+  const entries = new Map();  // url -> { row, count, trackingRow, dirty }（インデックスに無ければ null）
+  const byRow = new Map();    // row -> entry（読み込み済み・追記済みの行）
+  const appended = [];
+
+  const escapeRegExp = (text) => text.replace(/[.*+?^${}()|[\]\\\/]/g, '\\$&');
+
+  // 行番号の昇順の配列を、間が gap 行以内のものごとの [開始行, 終了行] に分ける
+  const toRuns = (rows, gap) => {
+    const runs = [];
+    rows.forEach(row => {
+      const last = runs[runs.length - 1];
+      if (last && row - last[1] <= gap) {
+        last[1] = row;
+      } else {
+        runs.push([row, row]);
+      }
+    });
+    return runs;
+  };
+
+  const readRows = (rows) => {
+    toRuns(rows.filter(row => !byRow.has(row)).sort((a, b) => a - b), URL_INDEX_ROW_GAP).forEach(([first, last]) => {
+      const values = sheet.getRange(first, 1, last - first + 1, 3).getValues();
+      values.forEach((value, i) => {
+        const url = value[0];
+        const entry = { row: first + i, count: Number(value[1]) || 0, trackingRow: Number(value[2]) || 0, dirty: false };
+        byRow.set(entry.row, entry);
+        if (url && !entries.get(url)) entries.set(url, entry);
+      });
+    });
+  };
+
+  const prefetch = (urls) => {
+    const unknown = [...new Set(urls.filter(url => url && !entries.has(url)).map(String))];
+    if (unknown.length === 0) return;
+    const lastRow = sheet.getLastRow();
+    if (lastRow <= 1) {
+      unknown.forEach(url => entries.set(url, null));
+      return;
+    }
+    const found = [];
+    for (let start = 0; start < unknown.length; start += URL_INDEX_FIND_CHUNK) {
+      const chunk = unknown.slice(start, start + URL_INDEX_FIND_CHUNK);
+      const cells = sheet.getRange(2, 1, lastRow - 1, 1)
+        .createTextFinder('^(?:' + chunk.map(escapeRegExp).join('|') + ')$')
+        .useRegularExpression(true)
+        .matchCase(true)
+        .findAll();
+      cells.forEach(cell => found.push(cell.getRow()));
+    }
+    readRows(found);
+    unknown.forEach(url => {
+      if (!entries.has(url)) entries.set(url, null);
+    });
+  };
+
+  const lookup = (url) => {
+    prefetch([url]);
+    return entries.get(url) || null;
+  };
+
+  const ensure = (url) => {
+    let entry = lookup(url);
+    if (!entry) {
+      entry = { row: 0, count: 0, trackingRow: 0, dirty: true };
+      entries.set(url, entry);
+      appended.push(url);
+    }
+    return entry;
+  };
+
+  return {
+    /** 複数URLをまとめて読み込む（以降の incrementCount / getTrackingRow はシートを読まない） */
+    prefetch: prefetch,
+
+    /** 記録数を1増やし、増やした後の記録数を返す */
+    incrementCount(url) {
+      const entry = ensure(url);
+      entry.count += 1;
+      entry.dirty = true;
+      return entry.count;
+    },
+
+    getTrackingRow(url) {
+      const entry = lookup(url);
+      return entry ? entry.trackingRow : 0;
+    },
+
+    setTrackingRow(url, row) {
+      const entry = ensure(url);
+      entry.trackingRow = row;
+      entry.dirty = true;
+    },
+
+    /** 変更をシートへ書き戻す（既存行は続いている範囲ごとに一括、新規URLは末尾に一括追記） */
+    save() {
+      const dirtyRows = [];
+      byRow.forEach((entry, row) => {
+        if (entry.dirty) dirtyRows.push(row);
+      });
+      dirtyRows.sort((a, b) => a - b);
+      // 間の行も読み込み済みなら同じ setValues に含める（値はそのまま書き戻す）
+      const runs = [];
+      dirtyRows.forEach(row => {
+        const last = runs[runs.length - 1];
+        let joinable = last && row - last[1] <= URL_INDEX_ROW_GAP;
+        for (let r = last ? last[1] + 1 : row; joinable && r < row; r++) {
+          if (!byRow.has(r)) joinable = false;
+        }
+        if (joinable) {
+          last[1] = row;
+        } else {
+          runs.push([row, row]);
+        }
+      });
+      runs.forEach(([first, last]) => {
+        const values = [];
+        for (let row = first; row <= last; row++) {
+          const entry = byRow.get(row);
+          values.push([entry.count, entry.trackingRow || '']);
+          entry.dirty = false;
+        }
+        sheet.getRange(first, 2, values.length, 2).setValues(values);
+      });
+      if (appended.length > 0) {
+        const startRow = Math.max(sheet.getLastRow(), 1) + 1;
+        const rows = appended.map(url => {
+          const entry = entries.get(url);
+          return [url, entry.count, entry.trackingRow || ''];
+        });
+        sheet.getRange(startRow, 1, rows.length, 3).setValues(rows);
+        appended.forEach((url, i) => {
+          const entry = entries.get(url);
+          entry.row = startRow + i;
+          entry.dirty = false;
+          byRow.set(entry.row, entry);
+        });
+        appended.length = 0;
+      }
+    }
+  };
+}
+
 /**
  * 追跡中のURLリストを取得（APIエンドポイント用）
  * @return {Object} 追跡中URLリスト
@@ -809,10 +1192,13 @@ function getTrackingList() {
 
 /**
  * トラッキング結果を更新（APIエンドポイント用）
+ * トラッカーはタイムアウト後や再開時に同じ結果を送り直すため、runId が同じ行は更新しない
+ * （最終チェックID列に記録。runId が無い場合は従来通り毎回加算）
  * @param {Object} results チェック結果 { url: boolean, ... }
+ * @param {string} runId トラッカーの実行ID（再送・再開しても同じ）
  * @return {Object} 更新結果
  */
-function updateTrackingResults(results) {
+function updateTrackingResults(results, runId) {
   const sheet = initializeTrackingSheet();
   const lastRow = sheet.getLastRow();
 
@@ -820,12 +1206,13 @@ function updateTrackingResults(results) {
     return { success: false, error: 'トラッキングデータがありません' };
   }
 
-  const data = sheet.getRange(2, 1, lastRow - 1, 11).getValues();
+  const data = sheet.getRange(2, 1, lastRow - 1, 12).getValues();
   const today = new Date();
   const formatDate = (date) => Utilities.formatDate(date, 'Asia/Tokyo', 'yyyy/MM/dd');
 
   let updatedCount = 0;
   let completedCount = 0;
+  let skippedCount = 0;
 
   data.forEach((row, index) => {
     const url = row[0];
@@ -836,6 +1223,11 @@ function updateTrackingResults(results) {
 
     // 結果があれば更新
     if (url in results) {
+      // 同じ実行の結果は適用済み（送信のタイムアウト後の再送・再開）
+      if (runId && row[11] === runId) {
+        skippedCount++;
+        return;
+      }
       const actualRow = index + 2;
       const checkCount = (row[6] || 0) + 1;
       const hitCount = (row[7] || 0) + (results[url] ? 1 : 0);
@@ -846,11 +1238,9 @@ function updateTrackingResults(results) {
       const isExpired = today >= endDate;
       const newStatus = isExpired ? '完了' : '追跡中';
 
-      sheet.getRange(actualRow, 7).setValue(checkCount);      // チェック回数
-      sheet.getRange(actualRow, 8).setValue(hitCount);        // ヒット回数
-      sheet.getRange(actualRow, 9).setValue(formatDate(today)); // 最終チェック日
-      sheet.getRange(actualRow, 10).setValue(newStatus);      // ステータス
-      sheet.getRange(actualRow, 11).setValue(hitRate);        // ヒット率
+      // チェック回数・ヒット回数・最終チェック日・ステータス・ヒット率・最終チェックID（G〜L列）を1回で書き込む
+      // トラッカーは結果を分割して送るため、呼び出しごとの書き込み回数を抑える
+      sheet.getRange(actualRow, 7, 1, 6).setValues([[checkCount, hitCount, formatDate(today), newStatus, hitRate, runId || '']]);
 
       updatedCount++;
       if (isExpired) completedCount++;
@@ -860,7 +1250,8 @@ function updateTrackingResults(results) {
   return {
     success: true,
     updated: updatedCount,
-    completed: completedCount
+    completed: completedCount,
+    skipped: skippedCount
   };
 }
 
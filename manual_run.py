@@ -5,19 +5,23 @@
 使い方:
   python manual_run.py config.yaml メイク 転職 キャリア
   python manual_run.py config.yaml 占い タロット 星座
+  python manual_run.py config.yaml --resume    # 中断した実行を再開（キーワードは前回のもの）
 """
 import sys
 from src.main import run
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    resume = "--resume" in sys.argv[2:]
+    args = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    if len(args) < 1 or (len(args) < 2 and not resume):
         print("Usage: python manual_run.py <config.yaml> <keyword1> [keyword2] [keyword3] ...")
+        print("       python manual_run.py <config.yaml> --resume")
         print("\nExample:")
         print("  python manual_run.py config.yaml メイク 転職 キャリア")
         sys.exit(1)
 
-    config_path = sys.argv[1]
-    specified_keywords = sys.argv[2:]
+    config_path = args[0]
+    specified_keywords = args[1:]
 
-    # 指定されたキーワードで実行
-    run(config_path, keywords_override=specified_keywords)
+    # 指定されたキーワードで実行（--resume のみなら前回のキーワードで再開）
+    run(config_path, keywords_override=specified_keywords or None, resume=resume)
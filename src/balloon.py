@@ -0,0 +1,128 @@
+"""24h購入バルーンの早期判定
+
+バルーン（.m-purchasedWithinLast24HoursBalloon）が出るまで timeout_ms 待つのではなく、
+ページの状態を短い間隔で確認し、次のどちらかで判定する。
+
+- バルーンが出た → 購入あり
+- 購入エリア／スキボタンの描画と読み込み完了（＝バルーンが出るはずのタイミング）から
+  grace_ms 経ってもバルーンが無い → 購入なし
+
+timeout_ms は上限としてだけ残す。判定ごとの理由と所要時間を BalloonStats に集計する。
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.metrics import percentile
+
+PURCHASED_SELECTOR = ".m-purchasedWithinLast24HoursBalloon"
+
+# 描画されていれば「バルーンを出すかどうかが決まった」とみなす要素
+SETTLED_SELECTORS = [
+    ".o-noteContentHeader__status",
+    ".o-paywall",
+    ".o-singlePaywall",
+    ".o-accordionPaywall",
+    ".o-noteLikeV3",
+]
+
+PAGE_STATE_SCRIPT = """
+({ balloon, settled }) => ({
+  balloon: document.querySelector(balloon) !== null,
+  settled: document.readyState === 'complete' && settled.some(s => document.querySelector(s) !== null),
+})
+"""
+
+
+@dataclass
+class BalloonDecision:
+    hit: bool
+    # balloon: バルーン検出 / settled: 描画完了後にバルーン無し / timeout: 上限到達
+    reason: str
+    elapsed_ms: float
+
+
+class BalloonDecider:
+    """ページ状態の観測列から判定する（ブラウザ非依存）"""
+
+    def __init__(self, grace_ms: float):
+        self.grace_ms = grace_ms
+        self._settled_at: Optional[float] = None
+
+    def observe(self, state: Dict, elapsed_ms: float) -> Optional[BalloonDecision]:
+        if state.get("balloon"):
+            return BalloonDecision(True, "balloon", elapsed_ms)
+        if not state.get("settled"):
+            # 再描画などで一度消えたら数え直す
+            self._settled_at = None
+            return None
+        if self._settled_at is None:
+            self._settled_at = elapsed_ms
+        if elapsed_ms - self._settled_at >= self.grace_ms:
+            return BalloonDecision(False, "settled", elapsed_ms)
+        return None
+
+
+class BalloonStats:
+    """判定理由ごとの件数と所要時間（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.elapsed: Dict[str, List[float]] = {"balloon": [], "settled": [], "timeout": []}
+
+    def add(self, decision: BalloonDecision) -> None:
+        with self._lock:
+            self.elapsed.setdefault(decision.reason, []).append(decision.elapsed_ms)
+
+    def merge(self, elapsed: Dict[str, List[float]]) -> None:
+        """別プロセスのワーカーの elapsed を合算する"""
+        with self._lock:
+            for reason, values in elapsed.items():
+                self.elapsed.setdefault(reason, []).extend(values)
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = []
+            for reason, values in self.elapsed.items():
+                if values:
+                    parts.append(
+                        f"{reason} {len(values)}件"
+                        f"(p50 {percentile(values, 0.5):.0f}ms / p95 {percentile(values, 0.95):.0f}ms)"
+                    )
+        return ", ".join(parts) if parts else "判定なし"
+
+
+class BalloonDetector:
+    """page.goto 後に呼び出し、24h購入バルーンの有無を判定する"""
+
+    def __init__(
+        self,
+        timeout_ms: float,
+        grace_ms: float = 300,
+        poll_ms: float = 100,
+        stats: Optional[BalloonStats] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.timeout_ms = timeout_ms
+        self.grace_ms = grace_ms
+        self.poll_ms = poll_ms
+        self.stats = stats
+        self._clock = clock
+        self._sleep = sleep
+
+    def detect(self, page) -> BalloonDecision:
+        decider = BalloonDecider(self.grace_ms)
+        arg = {"balloon": PURCHASED_SELECTOR, "settled": SETTLED_SELECTORS}
+        start = self._clock()
+        while True:
+            elapsed_ms = (self._clock() - start) * 1000
+            decision = decider.observe(page.evaluate(PAGE_STATE_SCRIPT, arg), elapsed_ms)
+            if decision is None and elapsed_ms >= self.timeout_ms:
+                decision = BalloonDecision(False, "timeout", elapsed_ms)
+            if decision is not None:
+                if self.stats:
+                    self.stats.add(decision)
+                return decision
+            self._sleep(min(self.poll_ms, self.timeout_ms - elapsed_ms) / 1000)
@@ -0,0 +1,297 @@
+"""HAR再生によるスループット計測
+
+note.com の検索・記事ページの通信を一度 HAR に記録し、以降はその HAR とローカルの GAS 代替だけで
+collect_article_urls → scrape_article（GAS送信込み）→ check_purchased_24h を再生して計測する。
+ネットワークの揺らぎやサイト側の変化を除いて、変更前後の性能を比べるためのもの。
+
+計測値:
+- 記事/分・チェック/分（検索・記事取得・トラッカーの各フェーズの所要秒数から）
+- 記事・チェック・キーワードあたりの Playwright API 呼び出し回数（ドライバーとの往復）
+- ピークRSS（本プロセスと子プロセス＝ドライバー・ブラウザの合計）
+
+1ブラウザ・1ページで順番に処理し、検索ページ間・記事間の待機とレート上限は入れない。
+それ以外（fetch_mode・balloon_early_exit・harvest_search_api・gas_batch_size など）は設定ファイルに従う。
+
+使い方:
+  python -m src.bench record config.yaml 副業 --articles 30   # note.com にアクセスして HAR に記録
+  python -m src.bench run config.yaml                         # HAR を再生して計測
+  python -m src.bench run config.yaml --save-baseline         # 結果を基準値として保存
+  python -m src.bench run config.yaml --compare               # 基準値と比較（悪化していれば終了コード1）
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from src.balloon import BalloonStats
+from src.frontier import UrlFrontier
+from src.gas_client import BackgroundUploader, BatchSender
+from src.main import Config, collect_article_urls, load_config, make_balloon_detector, scrape_article
+from src.memory import PeakRss
+from src.network import NetworkDiet
+from src.replay import CallCounter, HarFetcher, LocalGas, record_context, replay_context
+from src.search_harvest import SearchHarvester
+from src.selector_stats import SelectorRegistry
+from src.tracker import check_purchased_24h, get_tracking_list, update_tracking_results
+
+DEFAULT_HAR_PATH = "data/har/note.har"
+DEFAULT_BASELINE_PATH = "data/bench_baseline.json"
+
+# 比較する指標と、値が大きいほど良いか
+COMPARED = {
+    "articles_per_minute": True,
+    "checks_per_minute": True,
+    "calls_per_article": False,
+    "calls_per_check": False,
+    "peak_rss_mb": False,
+}
+
+
+def manifest_path(har_path: str) -> str:
+    return os.path.splitext(har_path)[0] + ".manifest.json"
+
+
+def record(config: Config, har_path: str, keywords: List[str], articles: int) -> Dict:
+    """note.com にアクセスし、検索と記事ページの通信を HAR に記録する"""
+    frontier = UrlFrontier()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=config.headless)
+        context = record_context(browser, har_path, NetworkDiet(config.network_diet))
+        page = context.new_page()
+        for keyword in keywords:
+            print(f"[record] Collecting: {keyword}")
+            collect_article_urls(
+                page,
+                keyword,
+                config.results_per_keyword,
+                config.scroll_timeout_ms,
+                frontier=frontier,
+                stagnant_rounds_limit=config.scroll_stagnant_rounds,
+            )
+        urls = frontier.urls()[:articles]
+        for index, url in enumerate(urls, start=1):
+            print(f"[record] {index}/{len(urls)} {url}")
+            try:
+                # 判定と抽出まで行い、バルーンや遅れて描画される要素の通信も記録する
+                scrape_article(page, url, config.article_wait_ms, 0)
+            except Exception as exc:
+                print(f"[record] Failed: {exc}")
+            time.sleep(config.between_articles_ms[0] / 1000.0)
+        # HAR は context.close() で書き出される
+        context.close()
+        browser.close()
+
+    manifest = {
+        "keywords": keywords,
+        "urls": urls,
+        "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(manifest_path(har_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"[record] Saved {har_path} ({len(keywords)} keywords, {len(urls)} articles)")
+    return manifest
+
+
+def run_benchmark(config: Config, har_path: str) -> Dict:
+    """HAR とローカルGASだけで検索・記事取得・トラッカーを再生して計測する"""
+    with open(manifest_path(har_path), encoding="utf-8") as f:
+        manifest = json.load(f)
+    keywords, urls = manifest["keywords"], manifest["urls"]
+
+    gas = LocalGas(tracking_urls=urls).start()
+    rss = PeakRss().start()
+    fetcher = HarFetcher(har_path) if config.fetch_mode == "hybrid" else None
+    detector = make_balloon_detector(config, BalloonStats())
+    # 保存済みの集計の並び順で抽出する（計測では集計を保存しない）
+    registry = SelectorRegistry(config.selector_stats_path).load() if config.selector_stats_path else None
+    errors = 0
+    check_errors = 0
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            context = replay_context(browser, har_path, NetworkDiet(config.network_diet))
+            raw_page = context.new_page()
+            harvester = SearchHarvester()
+            if config.harvest_search_api:
+                harvester.attach(raw_page)
+
+            # 検索（待機なし）
+            search_page = CallCounter(raw_page)
+            started = time.monotonic()
+            frontier = UrlFrontier()
+            for keyword in keywords:
+                collect_article_urls(
+                    search_page,
+                    keyword,
+                    config.results_per_keyword,
+                    config.scroll_timeout_ms,
+                    frontier,
+                    stagnant_rounds_limit=config.scroll_stagnant_rounds,
+                )
+            search_seconds = time.monotonic() - started
+
+            # 記事取得 → ローカルGASへ送信
+            article_page = CallCounter(raw_page)
+            # 本番と同じ送信方式（background はスプールを使わない）
+            if config.gas_upload.background:
+                sender = BackgroundUploader(
+                    gas.url,
+                    lambda payload, result, error: None,
+                    max_records=config.gas_batch_size,
+                    max_age_seconds=config.gas_batch_max_age_seconds,
+                    config=replace(config.gas_upload, spool_path=""),
+                ).start()
+            else:
+                sender = BatchSender(
+                    gas.url,
+                    lambda payload, result, error: None,
+                    max_records=config.gas_batch_size,
+                    max_age_seconds=config.gas_batch_max_age_seconds,
+                )
+            started = time.monotonic()
+            for url in urls:
+                try:
+                    payload = scrape_article(
+                        article_page,
+                        url,
+                        config.article_wait_ms,
+                        config.max_retries,
+                        fetcher,
+                        known=harvester.get(url),
+                        detector=detector,
+                        registry=registry,
+                    )
+                except Exception as exc:
+                    print(f"[bench] {exc}")
+                    errors += 1
+                    continue
+                sender.add(payload)
+            sender.close()
+            scrape_seconds = time.monotonic() - started
+
+            # トラッカー（一覧取得 → チェック → 結果送信）
+            check_page = CallCounter(raw_page)
+            started = time.monotonic()
+            tracking = get_tracking_list(gas.url)
+            results: Dict[str, bool] = {}
+            chunk: Dict[str, bool] = {}
+            for item in tracking:
+                try:
+                    hit = check_purchased_24h(check_page, item["url"], config.article_wait_ms, detector)
+                except Exception as exc:
+                    print(f"[bench] {exc}")
+                    check_errors += 1
+                    continue
+                results[item["url"]] = chunk[item["url"]] = hit
+                if config.tracker_upload_chunk and len(chunk) >= config.tracker_upload_chunk:
+                    update_tracking_results(gas.url, chunk)
+                    chunk = {}
+            if chunk:
+                update_tracking_results(gas.url, chunk)
+            tracker_seconds = time.monotonic() - started
+
+            context.close()
+            browser.close()
+    finally:
+        peak_rss_mb = rss.stop()
+        gas.close()
+
+    scraped = len(urls) - errors
+    return {
+        "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "har": har_path,
+        "keywords": len(keywords),
+        "found": len(frontier),
+        "articles": scraped,
+        "errors": errors,
+        "checks": len(results),
+        "check_errors": check_errors,
+        "hits": sum(1 for hit in results.values() if hit),
+        "gas_records": len(gas.records),
+        "gas_requests": gas.requests,
+        "search_seconds": round(search_seconds, 2),
+        "scrape_seconds": round(scrape_seconds, 2),
+        "tracker_seconds": round(tracker_seconds, 2),
+        "articles_per_minute": round(scraped / scrape_seconds * 60, 2) if scrape_seconds else 0.0,
+        "checks_per_minute": round(len(results) / tracker_seconds * 60, 2) if tracker_seconds else 0.0,
+        "calls_per_keyword": round(search_page.total / len(keywords), 1) if keywords else 0.0,
+        "calls_per_article": round(article_page.total / scraped, 1) if scraped else 0.0,
+        "calls_per_check": round(check_page.total / len(results), 1) if results else 0.0,
+        "article_calls": dict(sorted(article_page.counts.items(), key=lambda item: -item[1])),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "settings": {
+            "fetch_mode": config.fetch_mode,
+            "balloon_early_exit": config.balloon_early_exit,
+            "harvest_search_api": config.harvest_search_api,
+            "gas_batch_size": config.gas_batch_size,
+        },
+    }
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """基準値より tolerance（割合）を超えて悪化した指標を返す（表も出力する）"""
+    regressions = []
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, higher_is_better in COMPARED.items():
+        before, after = baseline.get(name), result.get(name)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        mark = "  <- worse" if worse > tolerance else ""
+        print(f"{name:<22}{before:>12}{after:>12}{change:>+10.1%}{mark}")
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.bench", description="HAR再生によるスループット計測")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="note.com にアクセスして HAR に記録")
+    record_parser.add_argument("config")
+    record_parser.add_argument("keywords", nargs="+")
+    record_parser.add_argument("--articles", type=int, default=30, help="記録する記事数")
+    record_parser.add_argument("--har", default=DEFAULT_HAR_PATH)
+
+    run_parser = commands.add_parser("run", help="HAR を再生して計測")
+    run_parser.add_argument("config")
+    run_parser.add_argument("--har", default=DEFAULT_HAR_PATH)
+    run_parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    run_parser.add_argument("--save-baseline", action="store_true", help="結果を基準値として保存")
+    run_parser.add_argument("--compare", action="store_true", help="基準値と比較し、悪化していれば終了コード1")
+    run_parser.add_argument("--tolerance", type=float, default=0.1, help="悪化とみなす変化の割合")
+
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+
+    if args.command == "record":
+        record(config, args.har, args.keywords, args.articles)
+        return 0
+
+    result = run_benchmark(config, args.har)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.save_baseline:
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[bench] Saved baseline: {args.baseline}")
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"[bench] Regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""ブラウザ起動・コンテキスト生成の共通処理
+
+常駐ブラウザ（src/browser_service.py）が動いていればそこへ接続し、
+動いていなければこれまで通りプロセス内で起動する（acquire_browser）。
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from src.browser_service import BrowserServiceConfig
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+# Bot検出回避のための設定（スクレイパー・トラッカー共通）
+CONTEXT_OPTIONS: Dict = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": USER_AGENT,
+    "locale": "ja-JP",
+    "timezone_id": "Asia/Tokyo",
+}
+
+
+def new_context(browser, diet=None):
+    """共通設定でブラウザコンテキストを作成（diet指定時は不要リソースを遮断）"""
+    context = browser.new_context(**CONTEXT_OPTIONS)
+    if diet is not None:
+        diet.attach(context)
+    return context
+
+
+class BrowserLease:
+    """ジョブが使うブラウザとコンテキスト
+
+    shared=True は常駐ブラウザのコンテキスト（Cookie・キャッシュを他のジョブと共有）。
+    close() では自分が開いたページだけを閉じ、ブラウザとコンテキストは残す。
+    """
+
+    def __init__(self, browser, context, shared: bool):
+        self.browser = browser
+        self.context = context
+        self.shared = shared
+        self._pages: List = []
+
+    def new_page(self, diet=None):
+        """ページを開く（diet指定時はページ単位で不要リソースを遮断）"""
+        page = self.context.new_page()
+        if diet is not None:
+            diet.attach(page)
+        self._pages.append(page)
+        return page
+
+    def reopen(self, page, diet=None, renew_context: bool = False):
+        """page を閉じて新しいページを開く（renew_context なら自前のコンテキストごと作り直す）"""
+        if renew_context and not self.shared:
+            self.context.close()
+            self._pages = []
+            self.context = new_context(self.browser)
+        else:
+            try:
+                page.close()
+            except Exception:
+                pass
+            if page in self._pages:
+                self._pages.remove(page)
+        return self.new_page(diet)
+
+    def close(self) -> None:
+        if not self.shared:
+            self.browser.close()
+            return
+        for page in self._pages:
+            try:
+                if not page.is_closed():
+                    page.close()
+            except Exception:
+                pass
+        self._pages = []
+        # 接続は sync_playwright の終了（ドライバーの停止）で切れる。browser.close() は呼ばない
+
+
+def read_service_endpoint(path: str) -> Optional[str]:
+    """常駐ブラウザの接続先（停止済み・未起動なら None）"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        os.kill(int(data["pid"]), 0)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return data.get("endpoint")
+
+
+def acquire_browser(playwright, headless: bool, service: Optional["BrowserServiceConfig"] = None) -> BrowserLease:
+    """常駐ブラウザに接続する。無効・未起動・接続失敗ならプロセス内で起動する"""
+    if service is not None and service.enabled:
+        endpoint = read_service_endpoint(service.endpoint_path)
+        if endpoint:
+            try:
+                browser = playwright.chromium.connect_over_cdp(endpoint, timeout=service.connect_timeout_ms)
+                print(f"[browser] Connected to browser service at {endpoint}")
+                return BrowserLease(browser, browser.contexts[0], shared=True)
+            except Exception as exc:
+                print(f"[browser] Browser service at {endpoint} is not reachable ({exc}), launching in-process")
+        else:
+            print("[browser] Browser service is not running, launching in-process")
+    browser = playwright.chromium.launch(headless=headless)
+    return BrowserLease(browser, new_context(browser), shared=False)
@@ -0,0 +1,148 @@
+"""常駐ブラウザ（スクレイパー・トラッカー共通）
+
+Chromium を永続プロファイル（profile_dir）で起動したまま残し、CDP の接続先を endpoint_path に書き出す。
+各ジョブは acquire_browser（src/browser.py）でこのブラウザのコンテキストに接続してページを開くため、
+毎回の起動時間がかからず、Cookie と静的アセットのキャッシュをジョブ間で使い回せる。
+起動時に warm_url を一度開いてキャッシュを温める。
+
+UA・ロケール・ビューポート・タイムゾーンは他のクライアントが開いたページにも効くよう、
+CONTEXT_OPTIONS と同じ値を起動オプション（と TZ 環境変数）でも指定する。
+
+使い方:
+  python -m src.browser_service config.yaml          # 起動（SIGTERM / Ctrl+C で終了）
+  python -m src.browser_service config.yaml stop     # 停止
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+import yaml
+
+from src.browser import CONTEXT_OPTIONS, USER_AGENT, read_service_endpoint
+
+
+@dataclass
+class BrowserServiceConfig:
+    enabled: bool = False
+    # 接続先（endpoint・pid）を書き出すファイル。ジョブはここを読んで接続する
+    endpoint_path: str = "data/browser_service.json"
+    # Cookie・キャッシュを保持するプロファイル
+    profile_dir: str = "data/browser_profile"
+    port: int = 9222
+    connect_timeout_ms: int = 5000
+    # 起動時にキャッシュを温めるページ（空で無効）
+    warm_url: str = "https://note.com/"
+
+
+def load_browser_service(raw: Dict) -> BrowserServiceConfig:
+    data = raw.get("browser_service", {}) or {}
+    defaults = BrowserServiceConfig()
+    return BrowserServiceConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        endpoint_path=str(data.get("endpoint_path", defaults.endpoint_path) or ""),
+        profile_dir=str(data.get("profile_dir", defaults.profile_dir) or defaults.profile_dir),
+        port=int(data.get("port", defaults.port)),
+        connect_timeout_ms=int(data.get("connect_timeout_ms", defaults.connect_timeout_ms)),
+        warm_url=str(data.get("warm_url", defaults.warm_url) or ""),
+    )
+
+
+def _write_endpoint(path: str, endpoint: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"endpoint": endpoint, "pid": os.getpid(), "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+            f,
+        )
+    os.replace(temp_path, path)
+
+
+def serve(config: BrowserServiceConfig, headless: bool = True) -> None:
+    """常駐ブラウザを起動し、終了シグナルまで待つ"""
+    from playwright.sync_api import sync_playwright
+
+    if not config.endpoint_path:
+        raise RuntimeError("browser_service.endpoint_path is empty")
+    if read_service_endpoint(config.endpoint_path):
+        raise RuntimeError(f"Browser service is already running ({config.endpoint_path})")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    viewport = CONTEXT_OPTIONS["viewport"]
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(
+            config.profile_dir,
+            headless=headless,
+            args=[
+                f"--remote-debugging-port={config.port}",
+                f"--user-agent={USER_AGENT}",
+                f"--lang={CONTEXT_OPTIONS['locale']}",
+                f"--window-size={viewport['width']},{viewport['height']}",
+            ],
+            env={**os.environ, "TZ": CONTEXT_OPTIONS["timezone_id"]},
+            **CONTEXT_OPTIONS,
+        )
+        closed = threading.Event()
+        context.on("close", lambda _: closed.set())
+        try:
+            # 永続コンテキストの最初のページを常駐用に残す（ジョブは自分で開いたページだけを閉じる）
+            keeper = context.pages[0] if context.pages else context.new_page()
+            if config.warm_url:
+                started = time.monotonic()
+                try:
+                    keeper.goto(config.warm_url, wait_until="load")
+                    print(f"[browser-service] Warmed {config.warm_url} in {time.monotonic() - started:.1f}s")
+                except Exception as exc:
+                    print(f"[browser-service] Warm-up failed: {exc}")
+                keeper.goto("about:blank")
+
+            endpoint = f"http://127.0.0.1:{config.port}"
+            _write_endpoint(config.endpoint_path, endpoint)
+            print(f"[browser-service] Listening on {endpoint} (profile: {config.profile_dir})")
+            # sync API はスレッドをまたげないので、終了シグナル待ちの間もここでイベントを処理する
+            while not stop.is_set() and not closed.is_set():
+                if keeper.is_closed():
+                    keeper = context.new_page()
+                keeper.wait_for_timeout(1000)
+            if closed.is_set():
+                print("[browser-service] Browser exited unexpectedly")
+        finally:
+            if os.path.exists(config.endpoint_path):
+                os.remove(config.endpoint_path)
+            if not closed.is_set():
+                context.close()
+    print("[browser-service] Stopped")
+
+
+def stop_service(config: BrowserServiceConfig) -> bool:
+    """起動中の常駐ブラウザに終了シグナルを送る"""
+    if not read_service_endpoint(config.endpoint_path):
+        print("[browser-service] Not running")
+        return False
+    with open(config.endpoint_path, encoding="utf-8") as f:
+        pid = int(json.load(f)["pid"])
+    os.kill(pid, signal.SIGTERM)
+    print(f"[browser-service] Sent SIGTERM to {pid}")
+    return True
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    config_path = args[0] if args and args[0] != "stop" else "config.yaml"
+    with open(config_path, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f) or {}
+    service = load_browser_service(raw)
+    if "stop" in args:
+        stop_service(service)
+    else:
+        serve(service, headless=bool(raw.get("headless", True)))
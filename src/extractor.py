@@ -0,0 +1,297 @@
+"""記事ページのページ内一括抽出
+
+extract_* の各セレクタ優先順位をJavaScriptで再現し、
+page.evaluate 1回で記事データ（24h購入確認以外）をまとめて取得する。
+セレクタ定義は src/main.py の extract_* と共有する。
+
+各候補リスト（ADAPTIVE_FIELDS）でどのセレクタが値を返したかも一緒に返し、
+SelectorRegistry（src/selector_stats.py）を渡すとその集計にもとづく順序で試す。
+"""
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from src.selector_stats import SelectorRegistry
+
+TITLE_SELECTORS = [
+    "h1.o-noteContentText__title",
+    "h1.note-title",
+    ".p-note__title h1",
+    "h1",
+    'meta[property="og:title"]',
+]
+
+AUTHOR_SELECTORS = [
+    ".o-noteContentHeader__name a",
+    ".o-noteContentHeader__author a",
+    ".o-noteContentHeader__author",
+    ".p-noteHeader__author",
+    ".note-author-name",
+    'meta[name="author"]',
+]
+
+AUTHOR_URL_SELECTORS = [
+    ".o-noteContentHeader__name a",
+    ".o-noteContentHeader__author a",
+    ".p-noteHeader__author a",
+    ".note-author-link",
+]
+
+LIKE_SELECTORS = [
+    ".o-noteLikeV3__count",
+    "[data-like-count]",
+    ".note-like-count",
+    ".js-like-count",
+]
+
+HIGH_RATING_SELECTORS = [
+    ".m-contentRaters__label",
+    "[class*='contentRaters'] button",
+    "[class*='Raters']",
+]
+
+# 優先順位0: ヘッダー内のステータスボタン（¥0~ など）
+PRICE_STATUS_SELECTOR = ".o-noteContentHeader__status .a-button__inner"
+
+# 優先順位1: ヘッダー付近の価格表示
+PRICE_HEADER_SELECTORS = [
+    ".o-noteContentHeader__price",
+    ".p-article__price",
+    "[class*='ContentHeader'] [class*='price']",
+]
+
+# 優先順位2: 売り切れ時のペイウォール内の価格表示
+PRICE_PAYWALL_SELECTORS = [
+    ".o-accordionPaywall .text-xl",
+    ".o-paywall .text-2xl",
+    ".o-singlePaywall .text-2xl",
+    "section.o-paywall span.text-2xl",
+]
+
+# 優先順位3: 購入ボタン周辺
+PRICE_BUTTON_SELECTORS = [
+    "button.a-button span",
+    "button[class*='button'] span",
+    ".a-button__inner span",
+    "[class*='price']",
+]
+
+# 優先順位4: ページ全体から価格キーワード付きの¥を探す
+PRICE_KEYWORDS = ["返金可", "購入", "買う", "この記事は"]
+PRICE_FALLBACK_SELECTOR = "p, div, span, button"
+
+TAG_SELECTORS = [
+    ".m-tagList__item a",
+    ".o-noteHashtag a",
+    'a[href*="/hashtag/"]',
+    ".note-hashtag",
+    "[class*='hashtag'] a",
+]
+
+# 本文中の「○部完売」などの販売主張
+SALES_CLAIM_PATTERNS = [
+    r"\d+部完売",
+    r"\d+部販売",
+    r"\d+部突破",
+    r"\d+部売れ",
+    r"\d+部達成",
+    r"\d+冊完売",
+    r"\d+冊販売",
+    r"\d+冊突破",
+]
+
+SELECTORS: Dict = {
+    "title": TITLE_SELECTORS,
+    "author": AUTHOR_SELECTORS,
+    "authorUrl": AUTHOR_URL_SELECTORS,
+    "likes": LIKE_SELECTORS,
+    "highRating": HIGH_RATING_SELECTORS,
+    "priceStatus": PRICE_STATUS_SELECTOR,
+    "priceHeader": PRICE_HEADER_SELECTORS,
+    "pricePaywall": PRICE_PAYWALL_SELECTORS,
+    "priceButton": PRICE_BUTTON_SELECTORS,
+    "priceKeywords": PRICE_KEYWORDS,
+    "priceFallback": PRICE_FALLBACK_SELECTOR,
+    "tags": TAG_SELECTORS,
+    "salesClaim": "(?:" + "|".join(SALES_CLAIM_PATTERNS) + ")",
+}
+
+# 広く当たるフォールバック（より具体的なセレクタが無いページ以外でも当たり、別の値を返し得る）。
+# 並べ替えではこれらを元の位置に固定し、その間にある具体的なセレクタ同士だけを入れ替える
+FALLBACK_SELECTORS: Dict = {
+    "title": ["h1", 'meta[property="og:title"]'],
+    "author": [".o-noteContentHeader__author", 'meta[name="author"]'],
+    "highRating": ["[class*='Raters']"],
+    "priceHeader": ["[class*='ContentHeader'] [class*='price']"],
+    # 購入ボタン周辺はどれもボタン・価格表示全般に当たるため入れ替えない
+    "priceButton": PRICE_BUTTON_SELECTORS,
+    "tags": ['a[href*="/hashtag/"]', "[class*='hashtag'] a"],
+}
+
+# 順序を入れ替えてよい候補リスト（価格は段階の順序を保ち、各段階の中だけ入れ替える）
+ADAPTIVE_FIELDS = [
+    "title",
+    "author",
+    "authorUrl",
+    "likes",
+    "highRating",
+    "priceHeader",
+    "pricePaywall",
+    "priceButton",
+    "tags",
+]
+
+EXTRACT_SCRIPT = r"""
+(sel) => {
+  const text = (el) => (el.innerText || '').trim();
+  const toInt = (s) => {
+    const n = parseInt(String(s).replace(/,/g, ''), 10);
+    return Number.isNaN(n) ? null : n;
+  };
+
+  // 候補リストごとに値を返したセレクタ（全候補が外れたら null、試していなければキー無し）
+  const hits = {};
+
+  const textFromSelectors = (field) => {
+    hits[field] = null;
+    for (const selector of sel[field]) {
+      const el = document.querySelector(selector);
+      if (!el) continue;
+      const value = selector.startsWith('meta')
+        ? (el.getAttribute('content') || '').trim()
+        : text(el);
+      if (value) { hits[field] = selector; return value; }
+    }
+    return '';
+  };
+
+  const title = textFromSelectors('title')
+    || document.title.replace(' | note', '').trim();
+
+  const author = textFromSelectors('author');
+
+  let authorUrl = '';
+  hits.authorUrl = null;
+  for (const selector of sel.authorUrl) {
+    const el = document.querySelector(selector);
+    if (!el) continue;
+    const href = el.getAttribute('href') || '';
+    if (href && !href.startsWith('/')) { authorUrl = href; hits.authorUrl = selector; break; }
+    if (href.startsWith('/')) { authorUrl = 'https://note.com' + href; hits.authorUrl = selector; break; }
+  }
+
+  let likes = 0;
+  hits.likes = null;
+  for (const selector of sel.likes) {
+    const el = document.querySelector(selector);
+    if (!el) continue;
+    const m = text(el).match(/([0-9,]+)/);
+    likes = m ? (toInt(m[1]) || 0) : 0;
+    hits.likes = selector;
+    break;
+  }
+
+  let highRating = 0;
+  hits.highRating = null;
+  for (const selector of sel.highRating) {
+    const el = document.querySelector(selector);
+    if (!el) continue;
+    const m = text(el).match(/(\d+)人が高評価/);
+    if (m) { highRating = parseInt(m[1], 10); hits.highRating = selector; break; }
+  }
+
+  const headerPrice = (el) => {
+    const t = text(el);
+    if (/¥\s*0\s*[〜~]/.test(t)) return 0;
+    const m = t.match(/¥\s*([\d,]+)/);
+    return m ? toInt(m[1]) : null;
+  };
+
+  const findPrice = () => {
+    const status = document.querySelector(sel.priceStatus);
+    if (status) {
+      const p = headerPrice(status);
+      if (p !== null) return p;
+    }
+    hits.priceHeader = null;
+    for (const selector of sel.priceHeader) {
+      const el = document.querySelector(selector);
+      if (!el) continue;
+      const p = headerPrice(el);
+      if (p !== null) { hits.priceHeader = selector; return p; }
+    }
+    hits.pricePaywall = null;
+    for (const selector of sel.pricePaywall) {
+      const el = document.querySelector(selector);
+      if (!el) continue;
+      const m = text(el).match(/([\d,]+)/);
+      const p = m ? toInt(m[1]) : null;
+      if (p) { hits.pricePaywall = selector; return p; }
+    }
+    hits.priceButton = null;
+    for (const selector of sel.priceButton) {
+      for (const el of document.querySelectorAll(selector)) {
+        const m = text(el).match(/¥([\d,]+)/);
+        const p = m ? toInt(m[1]) : null;
+        if (p) { hits.priceButton = selector; return p; }
+      }
+    }
+    for (const el of document.querySelectorAll(sel.priceFallback)) {
+      const t = text(el);
+      if (!sel.priceKeywords.some((kw) => t.includes(kw))) continue;
+      const m = t.match(/¥([\d,]+)/);
+      const p = m ? toInt(m[1]) : null;
+      if (p) return p;
+    }
+    return 0;
+  };
+  const price = findPrice();
+
+  const tags = [];
+  hits.tags = null;
+  for (const selector of sel.tags) {
+    const elements = document.querySelectorAll(selector);
+    for (const el of elements) {
+      const tag = text(el).replace(/^#+/, '');
+      if (tag && !tags.includes(tag)) tags.push(tag);
+    }
+    if (tags.length) { hits.tags = selector; break; }
+  }
+
+  let createdAt = '';
+  const published = document.querySelector('meta[property="article:published_time"]');
+  if (published && published.getAttribute('content')) {
+    createdAt = published.getAttribute('content');
+  } else {
+    const timeEl = document.querySelector('time');
+    if (timeEl) createdAt = timeEl.getAttribute('datetime') || text(timeEl);
+  }
+
+  const salesClaim = new RegExp(sel.salesClaim).test(document.body.innerText) ? '○' : '';
+
+  return {
+    title,
+    author,
+    authorUrl,
+    likes,
+    highRating,
+    price,
+    tags: tags.join(','),
+    createdAt,
+    salesClaim,
+    selectorHits: hits,
+  };
+}
+"""
+
+
+def extract_fields(page, registry: Optional["SelectorRegistry"] = None) -> Dict:
+    """記事ページから24h購入確認以外の項目を1回のevaluateで抽出
+
+    registry を渡すと、その時点で値を返している率の高いセレクタから試し、結果を集計する。
+    """
+    selectors = registry.ordered() if registry else SELECTORS
+    fields = page.evaluate(EXTRACT_SCRIPT, selectors)
+    hits = fields.pop("selectorHits", None)
+    if registry and hits is not None:
+        registry.record(hits, selectors)
+    return fields
@@ -0,0 +1,106 @@
+"""再巡回ポリシー（最近取得した記事をスキップする）
+
+ローカル記事ストアの最終取得日時・前回の高評価数/24h購入確認・
+記事の公開からの経過日数から、今回ブラウザで開く価値があるかを判定する。
+取得してもGASに届かなかった（送信失敗の）記事はスキップしない（最終取得日時は送信済みの取得のもの）。
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from src.store import ArticleStore
+
+
+@dataclass
+class RecrawlConfig:
+    enabled: bool = False
+    # 前回24h購入確認あり（売れている記事）
+    hot_interval_hours: float = 12
+    # 公開から young_days 日以内の記事
+    young_days: float = 7
+    young_interval_hours: float = 24
+    # 高評価が付いている記事
+    rated_interval_hours: float = 72
+    # それ以外（古く、評価も動きもない記事）
+    cold_interval_hours: float = 168
+
+
+def load_recrawl(raw: Dict) -> RecrawlConfig:
+    data = raw.get("recrawl", {}) or {}
+    defaults = RecrawlConfig()
+    return RecrawlConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        hot_interval_hours=float(data.get("hot_interval_hours", defaults.hot_interval_hours)),
+        young_days=float(data.get("young_days", defaults.young_days)),
+        young_interval_hours=float(data.get("young_interval_hours", defaults.young_interval_hours)),
+        rated_interval_hours=float(data.get("rated_interval_hours", defaults.rated_interval_hours)),
+        cold_interval_hours=float(data.get("cold_interval_hours", defaults.cold_interval_hours)),
+    )
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class RecrawlPolicy:
+    """URLごとに今回巡回するかを判定する"""
+
+    def __init__(self, config: RecrawlConfig, store: Optional[ArticleStore]):
+        self.config = config
+        self.store = store
+        self.enabled = config.enabled and store is not None
+
+    def interval_hours(self, article: Dict, now: datetime) -> Tuple[float, str]:
+        if article["last_purchased_24h"]:
+            return self.config.hot_interval_hours, "hot"
+        created_at = _parse_time(article["created_at"])
+        if created_at and (now - created_at).total_seconds() < self.config.young_days * 86400:
+            return self.config.young_interval_hours, "young"
+        if (article["last_high_rating"] or 0) > 0:
+            return self.config.rated_interval_hours, "rated"
+        return self.config.cold_interval_hours, "cold"
+
+    def known_hits(self, keys: List[str]) -> Dict[str, bool]:
+        """ストアの前回の結果が収穫あり（24h購入確認あり、または高評価あり）か（keys は normalize_url済み）"""
+        if not self.enabled or not keys:
+            return {}
+        articles = self.store.get_articles(keys)
+        return {
+            key: bool(article["last_purchased_24h"] or (article["last_high_rating"] or 0) > 0)
+            for key, article in articles.items()
+        }
+
+    def split(self, urls: List[str], keys: List[str]) -> Tuple[List[str], List[str], Dict[str, int]]:
+        """URLを (巡回する, スキップする, スキップ理由ごとの件数) に分ける
+
+        keys は urls と同じ順序のストア用キー（normalize_url済み）
+        """
+        if not self.enabled or not urls:
+            return list(urls), [], {}
+
+        articles = self.store.get_articles(keys)
+        now = datetime.now(timezone.utc)
+        visit: List[str] = []
+        skip: List[str] = []
+        reasons: Dict[str, int] = {}
+        for url, key in zip(urls, keys):
+            article = articles.get(key)
+            last_seen = _parse_time(article["last_delivered_at"]) if article else None
+            if last_seen is None:
+                visit.append(url)
+                continue
+            interval, reason = self.interval_hours(article, now)
+            if (now - last_seen).total_seconds() < interval * 3600:
+                skip.append(url)
+                reasons[reason] = reasons.get(reason, 0) + 1
+            else:
+                visit.append(url)
+        return visit, skip, reasons
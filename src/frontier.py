@@ -0,0 +1,60 @@
+"""実行全体で共有する記事URLフロンティア
+
+キーワード同士の重複（恋愛/マッチング、副業/稼ぐ など）で同じ記事を
+何度も開いてGASへ送らないよう、全キーワードの検索結果を正規化URLで1つにまとめる。
+URLごとに、それを見つけたキーワードとソート順をすべて記録する。
+"""
+from typing import Dict, List, Tuple
+
+from src.urls import normalize_url
+
+
+class UrlFrontier:
+    """正規化URL → (最初に見つかったURL, 見つけた (キーワード, ソート順) の一覧)"""
+
+    def __init__(self):
+        self._urls: Dict[str, str] = {}
+        self._sources: Dict[str, List[Tuple[str, str]]] = {}
+        self.observed = 0
+
+    def add(self, urls: List[str], keyword: str, sort: str) -> int:
+        """検索結果を追加し、新しく増えたURL数を返す"""
+        added = 0
+        for url in urls:
+            key = normalize_url(url)
+            self.observed += 1
+            if key not in self._urls:
+                self._urls[key] = url
+                self._sources[key] = []
+                added += 1
+            if (keyword, sort) not in self._sources[key]:
+                self._sources[key].append((keyword, sort))
+        return added
+
+    def urls(self) -> List[str]:
+        """重複を除いたURL（最初に見つかった順）"""
+        return list(self._urls.values())
+
+    def keywords(self, url: str) -> List[str]:
+        """URLを見つけたキーワード（重複なし、見つかった順）"""
+        return list(dict.fromkeys(keyword for keyword, _ in self._sources.get(normalize_url(url), [])))
+
+    def found_by(self, url: str) -> List[str]:
+        """URLを見つけた "キーワード:ソート順" の一覧"""
+        return [f"{keyword}:{sort}" for keyword, sort in self._sources.get(normalize_url(url), [])]
+
+    def found_for(self, keyword: str) -> List[Tuple[str, str]]:
+        """キーワードが見つけた (URL, ソート順) の一覧（ジャーナルからの復元用）"""
+        return [
+            (self._urls[key], sort)
+            for key, sources in self._sources.items()
+            for source_keyword, sort in sources
+            if source_keyword == keyword
+        ]
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def summary(self) -> str:
+        duplicates = self.observed - len(self._urls)
+        return f"検索結果 {self.observed}件 → 重複除去後 {len(self._urls)}件（重複 {duplicates}件）"
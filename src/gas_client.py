@@ -0,0 +1,521 @@
+"""GAS Web Appへの記事データ送信
+
+- send_to_gas: 1件ずつ送信（従来方式）
+- send_batch_to_gas: 複数件を1リクエストで送信（receiver の recordBatch）
+- BatchSender: 件数または経過時間でバッファをまとめて送信（呼び出し元のスレッドで送信）
+- BackgroundUploader: 送信を別スレッドで行い、一時的な失敗は指数バックオフで再送。
+  終了時に送れなかった記事はスプール（JSONL, 追記のみ）に保存し、次回の実行で最初に再送する
+
+一括記録には batchId を付け、再送・スプールからの再送でも同じIDを使う。receiver は適用済みのIDを
+記録し直さない（行を書いた後に失敗・タイムアウトしても、再送で記事が重複しない）。
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metrics import METRICS
+
+# (payload, GASの記録結果 or None, 送信エラー or None)
+ResultCallback = Callable[[Dict, Optional[Dict], Optional[Exception]], None]
+
+
+@dataclass
+class UploadConfig:
+    # 送信を別スレッドで行う（false で従来通りスクレイプのループ内で送信）
+    background: bool = False
+    # 送信待ちの上限件数（超えるとスクレイプ側が空きを待つ）
+    queue_size: int = 200
+    max_retries: int = 4
+    backoff_seconds: float = 2
+    max_backoff_seconds: float = 60
+    # 送れなかった記事の保存先（空で保存しない）
+    spool_path: str = "data/gas_spool.jsonl"
+    # 終了時に送信待ちを送り切るまで待つ秒数（超えた分はスプールへ）
+    close_timeout_seconds: float = 120
+    # スプールの一括記録が再送できない失敗（4xx・不正な応答など）をこの回数続けたら、
+    # スプールから外して spool_path + ".rejected" に移す（毎回の実行で送り続けない）
+    spool_max_attempts: int = 3
+
+
+def load_upload(raw: Dict) -> UploadConfig:
+    data = raw.get("gas_upload", {}) or {}
+    defaults = UploadConfig()
+    return UploadConfig(
+        background=bool(data.get("background", defaults.background)),
+        queue_size=int(data.get("queue_size", defaults.queue_size)),
+        max_retries=int(data.get("max_retries", defaults.max_retries)),
+        backoff_seconds=float(data.get("backoff_seconds", defaults.backoff_seconds)),
+        max_backoff_seconds=float(data.get("max_backoff_seconds", defaults.max_backoff_seconds)),
+        spool_path=str(data.get("spool_path", defaults.spool_path) or ""),
+        close_timeout_seconds=float(data.get("close_timeout_seconds", defaults.close_timeout_seconds)),
+        spool_max_attempts=int(data.get("spool_max_attempts", defaults.spool_max_attempts)),
+    )
+
+
+def new_session(pool_size: int = 2) -> requests.Session:
+    """接続を使い回す（keep-alive）HTTPセッション"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class GasRejectedError(RuntimeError):
+    """GAS が HTTP 200 で success:false を返した（ロック待ちのタイムアウト・実行時間や割り当ての上限・doPost の例外）
+
+    行を書いた後に失敗していることもあるため、receiver が batchId を返した（＝同じIDの再送を重複させない）
+    場合だけ idempotent とし、再送する。batchId に対応していない receiver・1件ずつの送信では再送しない。
+    """
+
+    def __init__(self, message: str, idempotent: bool = False):
+        super().__init__(message)
+        self.idempotent = idempotent
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def send_to_gas(url: str, payload: Dict, session: Optional[requests.Session] = None) -> Dict:
+    if not url:
+        raise RuntimeError("GAS_WEB_APP_URL is not set")
+    with METRICS.timer("gas_post"):
+        response = (session or requests).post(url, json=payload, timeout=15)
+    response.raise_for_status()
+    try:
+        return response.json()
+    except json.JSONDecodeError:
+        return {"success": False, "error": "Invalid JSON response"}
+
+
+def send_batch_to_gas(
+    url: str,
+    payloads: List[Dict],
+    timeout: float = 60,
+    session: Optional[requests.Session] = None,
+    batch_id: Optional[str] = None,
+) -> List[Dict]:
+    """複数件を一括送信し、入力と同じ順序で記事ごとの記録結果を返す
+
+    batch_id は再送で重複させないための一括記録ID（省略時は新しく作る。再送では同じIDを渡す）
+    """
+    if not url:
+        raise RuntimeError("GAS_WEB_APP_URL is not set")
+    batch_id = batch_id or new_batch_id()
+    with METRICS.timer("gas_post_batch"):
+        response = (session or requests).post(
+            url,
+            json={"action": "recordBatch", "batchId": batch_id, "records": payloads},
+            timeout=timeout,
+        )
+    response.raise_for_status()
+    try:
+        data = response.json()
+    except json.JSONDecodeError:
+        raise RuntimeError("Invalid JSON response")
+    if not data.get("success"):
+        raise GasRejectedError(f"Batch record failed: {data.get('error') or data}", idempotent=data.get("batchId") == batch_id)
+    results = data.get("results")
+    if not isinstance(results, list) or len(results) != len(payloads):
+        raise RuntimeError(f"Batch record failed: {data.get('error') or data}")
+    return results
+
+
+class BatchSender:
+    """記事データをバッファし、件数または経過時間で一括送信する
+
+    max_records が1以下の場合は従来通り1件ずつ send_to_gas で送信する。
+    送信結果は記事ごとに on_result で通知する。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        on_result: ResultCallback,
+        max_records: int = 20,
+        max_age_seconds: float = 60,
+    ):
+        self.url = url
+        self.on_result = on_result
+        self.max_records = max_records
+        self.max_age_seconds = max_age_seconds
+        self._buffer: List[Dict] = []
+        self._oldest_at: Optional[float] = None
+        self._session = new_session()
+
+    def add(self, payload: Dict) -> None:
+        if self.max_records <= 1:
+            try:
+                self.on_result(payload, send_to_gas(self.url, payload, self._session), None)
+            except Exception as exc:
+                self.on_result(payload, None, exc)
+            return
+
+        if not self._buffer:
+            self._oldest_at = time.monotonic()
+        self._buffer.append(payload)
+        if len(self._buffer) >= self.max_records or self._is_stale():
+            self.flush()
+
+    def _is_stale(self) -> bool:
+        return self._oldest_at is not None and time.monotonic() - self._oldest_at >= self.max_age_seconds
+
+    def flush_if_stale(self) -> None:
+        if self._buffer and self._is_stale():
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer, self._oldest_at = self._buffer, [], None
+        try:
+            results = send_batch_to_gas(self.url, batch, session=self._session)
+        except Exception as exc:
+            print(f"[gas] Batch of {len(batch)} failed: {exc}")
+            for payload in batch:
+                self.on_result(payload, None, exc)
+            return
+        print(f"[gas] Batch recorded: {len(batch)} records")
+        for payload, result in zip(batch, results):
+            self.on_result(payload, result, None)
+
+    def close(self) -> None:
+        self.flush()
+        self._session.close()
+
+
+class SpooledError(RuntimeError):
+    """送信できず、次回の実行で再送するためスプールに保存した（データは失われていない）"""
+
+
+def is_retryable(exc: Exception) -> bool:
+    """接続エラー・タイムアウト・429・5xx と、batchId に対応した receiver の success:false は再送で回復し得る"""
+    if isinstance(exc, GasRejectedError):
+        return exc.idempotent
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+# スプールの各行に付ける一括記録ID・再送できなかった回数のキー（送信時には外す）
+SPOOL_META_KEY = "_spool"
+
+
+class UploadSpool:
+    """送れなかった記事の保存先（JSONL, 追記のみ）
+
+    take() はファイルを .replaying に移して中身を返し、再送が終わったら done() で消す。
+    再送の途中で止まった場合は次回の take() で .replaying から読み直す（一括記録IDが同じなので重複しない）。
+    各行には一括記録ID と、再送できない失敗の回数を付けて保存し、batches() で元の一括記録にまとめ直す。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.replaying_path = f"{path}.replaying"
+        self.rejected_path = f"{path}.rejected"
+        self._lock = threading.Lock()
+
+    def append(self, payloads: List[Dict], batch_id: str = "", attempts: int = 0) -> None:
+        self._write(self.path, [dict(payload, **{SPOOL_META_KEY: {"batchId": batch_id, "attempts": attempts}}) for payload in payloads])
+
+    def reject(self, payloads: List[Dict], error: Exception) -> None:
+        """再送しても受け付けられない記事を .rejected に移す（確認・手動での再送用）"""
+        self._write(self.rejected_path, [dict(payload, **{SPOOL_META_KEY: {"error": str(error)}}) for payload in payloads])
+
+    def _write(self, path: str, lines: List[Dict]) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def batches(entries: List[Dict], max_records: int) -> List[Tuple[str, int, List[Dict]]]:
+        """take() の行を (一括記録ID, 失敗回数, 記事) にまとめる（IDの無い古い行は max_records 件ずつ新しいIDで）"""
+        result: List[Tuple[str, int, List[Dict]]] = []
+        for entry in entries:
+            payload = dict(entry)
+            meta = payload.pop(SPOOL_META_KEY, None) or {}
+            batch_id, attempts = meta.get("batchId") or "", int(meta.get("attempts") or 0)
+            last = result[-1] if result else None
+            if last and last[2] and (
+                (batch_id and last[0] == batch_id) or (not batch_id and last[0] == "" and len(last[2]) < max_records)
+            ):
+                last[2].append(payload)
+            else:
+                result.append((batch_id, attempts, [payload]))
+        return [(batch_id or new_batch_id(), attempts, payloads) for batch_id, attempts, payloads in result]
+
+    def take(self) -> List[Dict]:
+        if os.path.exists(self.path):
+            if os.path.exists(self.replaying_path):
+                # 前回の再送が途中で止まっていれば、その残りの後ろに今回の分をつなげる
+                with open(self.path, encoding="utf-8") as src, open(self.replaying_path, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.replaying_path)
+        if not os.path.exists(self.replaying_path):
+            return []
+        payloads = []
+        with open(self.replaying_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    payloads.append(json.loads(line))
+                except ValueError:
+                    # 書き込み途中で止まった最後の行
+                    continue
+        return payloads
+
+    def done(self) -> None:
+        if os.path.exists(self.replaying_path):
+            os.remove(self.replaying_path)
+
+
+_STOP = object()
+
+
+class BackgroundUploader:
+    """BatchSender と同じ add() / close() で、送信を別スレッドの keep-alive セッションで行う
+
+    - add() は上限付きのキューに入れるだけ（満杯ならスクレイプ側が空きを待つ）
+    - 接続エラー・タイムアウト・429・5xx と、batchId に対応した receiver の success:false は
+      指数バックオフ（±50%のゆらぎ付き）で max_retries 回まで同じ一括記録IDで再送
+    - 再送しても届かない記事と、close() の待ち時間内に送れなかった記事は一括記録IDごとスプールに保存し、
+      on_result には SpooledError を渡す。スプールの記事は次回 start() の直後に最初に送る
+    - スプールの一括記録が再送できない失敗を spool_max_attempts 回続けたら .rejected に移してログに残す
+    - on_result は add() / close() を呼んだスレッド（スクレイプのループ）で呼ぶ
+    """
+
+    def __init__(
+        self,
+        url: str,
+        on_result: ResultCallback,
+        max_records: int = 20,
+        max_age_seconds: float = 60,
+        config: Optional[UploadConfig] = None,
+    ):
+        self.url = url
+        self.on_result = on_result
+        self.max_records = max(1, max_records)
+        self.max_age_seconds = max_age_seconds
+        self.config = config or UploadConfig()
+        self.spool = UploadSpool(self.config.spool_path) if self.config.spool_path else None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, self.config.queue_size))
+        self._results: "queue.Queue" = queue.Queue()
+        self._abort = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight: List[Dict] = []
+        self._in_flight_id = ""
+        self._replay: List[Dict] = []
+        self._thread: Optional[threading.Thread] = None
+        self._session = new_session()
+        self.sent = 0
+        self.retries = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.rejected = 0
+
+    def start(self) -> "BackgroundUploader":
+        if self.spool:
+            self._replay = self.spool.take()
+            if self._replay:
+                print(f"[gas] Replaying {len(self._replay)} spooled records first")
+        self._thread = threading.Thread(target=self._run, name="gas-uploader", daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, payload: Dict) -> None:
+        self.drain()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            with METRICS.timer("gas_queue_wait"):
+                self._queue.put(payload)
+
+    def flush(self) -> None:
+        """送信はスレッドが件数・経過時間で行う。ここでは届いた結果を通知するだけ"""
+        self.drain()
+
+    def drain(self) -> None:
+        while True:
+            try:
+                payload, result, error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self.on_result(payload, result, error)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return self._queue.qsize() + in_flight + len(self._replay) - self.replayed
+
+    def close(self) -> None:
+        """送信待ちを送り切る。close_timeout_seconds を超えた分はスプールに保存する"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(self.config.close_timeout_seconds)
+        if self._thread.is_alive():
+            print(f"[gas] {self.pending} records still pending after {self.config.close_timeout_seconds:.0f}s, spooling")
+            # 再送待ちをやめ、残りをスプールへ回す（送信中の1リクエストはタイムアウトまで待つ）
+            self._abort.set()
+            self._thread.join(75)
+        if self._thread.is_alive():
+            # 応答が返らないまま: 送信中の分も含めてこちらで保存する（届いていれば次回は更新扱い）
+            with self._lock:
+                in_flight, in_flight_id, self._in_flight = self._in_flight, self._in_flight_id, []
+            leftover = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftover.append(item)
+            # 送信中の分は届いていれば同じIDで重複しない
+            self._give_up(in_flight, TimeoutError("GAS upload did not finish"), in_flight_id)
+            self._give_up(leftover, TimeoutError("GAS upload did not finish"))
+        self._thread = None
+        self._session.close()
+        self.drain()
+        if self.spool and self.replayed == len(self._replay):
+            self.spool.done()
+        if self.spooled:
+            print(f"[gas] {self.spooled} records spooled to {self.config.spool_path} (sent on the next run)")
+
+    def _run(self) -> None:
+        for batch_id, attempts, batch in UploadSpool.batches(self._replay, self.max_records):
+            self._send(batch, batch_id, replaying_attempts=attempts)
+            self.replayed += len(batch)
+
+        batch: List[Dict] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # 最初の1件から max_age_seconds 経過
+                self._send(batch)
+                batch = []
+                continue
+            if item is _STOP:
+                break
+            if not batch:
+                deadline = time.monotonic() + self.max_age_seconds
+            batch.append(item)
+            if len(batch) >= self.max_records:
+                self._send(batch)
+                batch = []
+        self._send(batch)
+
+    def _post(self, batch: List[Dict], batch_id: str) -> List[Dict]:
+        if self.max_records <= 1 and len(batch) == 1:
+            result = send_to_gas(self.url, batch[0], self._session)
+            if result.get("success") is False:
+                # 1件ずつの送信には一括記録IDが無いので再送しない
+                raise GasRejectedError(f"Record failed: {result.get('error') or result}")
+            return [result]
+        return send_batch_to_gas(self.url, batch, session=self._session, batch_id=batch_id)
+
+    def _send(self, batch: List[Dict], batch_id: str = "", replaying_attempts: Optional[int] = None) -> None:
+        """batch を送る。replaying_attempts はスプールからの再送のときの、これまでの再送できない失敗の回数"""
+        if not batch:
+            return
+        batch_id = batch_id or new_batch_id()
+        with self._lock:
+            self._in_flight, self._in_flight_id = batch, batch_id
+        last_error: Optional[Exception] = None
+        for attempt in range(self.config.max_retries + 1):
+            if self._abort.is_set():
+                break
+            try:
+                results = self._post(batch, batch_id)
+            except Exception as exc:
+                last_error = exc
+                if not is_retryable(exc):
+                    print(f"[gas] Batch of {len(batch)} failed: {exc}")
+                    if replaying_attempts is not None:
+                        attempts = replaying_attempts + 1
+                        if attempts >= self.config.spool_max_attempts and self.spool:
+                            # 何度送っても受け付けられない: スプールから外す（毎回の実行で送り続けない）
+                            self.spool.reject(batch, exc)
+                            self.rejected += len(batch)
+                            print(
+                                f"[gas] Rejected {len(batch)} spooled records after {attempts} attempts: {exc} "
+                                f"(moved to {self.spool.rejected_path})"
+                            )
+                            self._finish(batch, [(payload, None, exc) for payload in batch])
+                            return
+                        # スプールの記事は .replaying ごと消えるため、失敗した分はスプールに戻す
+                        self._give_up(batch, exc, batch_id, attempts)
+                        self._finish(batch, [])
+                        return
+                    self._finish(batch, [(payload, None, exc) for payload in batch])
+                    return
+                if attempt < self.config.max_retries:
+                    wait = min(self.config.max_backoff_seconds, self.config.backoff_seconds * 2**attempt)
+                    wait *= random.uniform(0.5, 1.5)
+                    self.retries += 1
+                    print(f"[gas] Batch of {len(batch)} failed ({exc}), retrying in {wait:.1f}s")
+                    self._abort.wait(wait)
+                continue
+            if len(batch) > 1:
+                print(f"[gas] Batch recorded: {len(batch)} records")
+            self.sent += len(batch)
+            self._finish(batch, [(payload, result, None) for payload, result in zip(batch, results)])
+            return
+        with self._lock:
+            if self._in_flight is not batch:
+                # close() が既にスプールへ回した
+                return
+        self._give_up(batch, last_error or TimeoutError("GAS upload was aborted"), batch_id, replaying_attempts or 0)
+        self._finish(batch, [])
+
+    def _finish(self, batch: List[Dict], results: List) -> None:
+        with self._lock:
+            if self._in_flight is batch:
+                self._in_flight = []
+        for item in results:
+            self._results.put(item)
+
+    def _give_up(self, payloads: List[Dict], error: Exception, batch_id: str = "", attempts: int = 0) -> None:
+        if not payloads:
+            return
+        if self.spool:
+            self.spool.append(payloads, batch_id, attempts)
+            self.spooled += len(payloads)
+            error = SpooledError(f"spooled after {error}")
+        else:
+            print(f"[gas] Dropping {len(payloads)} records: {error}")
+        for payload in payloads:
+            self._results.put((payload, None, error))
+
+    def summary(self) -> str:
+        parts = [f"送信 {self.sent}件"]
+        if self.retries:
+            parts.append(f"再送 {self.retries}回")
+        if self.replayed:
+            parts.append(f"前回のスプールから {self.replayed}件")
+        if self.spooled:
+            parts.append(f"スプール保存 {self.spooled}件（次回送信）")
+        if self.rejected:
+            parts.append(f"受付不可 {self.rejected}件（{self.config.spool_path}.rejected）")
+        return " / ".join(parts)
@@ -0,0 +1,349 @@
+"""記事のジャンル分類（GAS organizer の detectGenre と同じ判定）
+
+ルールは src/genre_rules.json で、GAS 側の gas/organizer/GenreRules.js はここから生成する。
+判定の順序は detectGenre と同じ:
+
+1. 著者名に authors の名前が含まれていればそのジャンル（authors の上から順）
+2. タグに genres のキーワードが含まれていれば、priority の上から順で最初のジャンル
+3. タイトルで 2 と同様
+4. どれにも当たらなければ「その他」
+
+キーワードごとに部分一致を調べる代わりに、全キーワードから Aho-Corasick のオートマトンを作り、
+文字列を1回なぞるだけで「含まれるキーワードのうち最も優先度の高いジャンル」を求める。
+
+使い方:
+  python -m src.genre sync-gas          # gas/organizer/GenreRules.js を再生成
+  python -m src.genre bench [件数]      # 分類の処理速度（既定 10万件）
+"""
+import json
+import random
+import sys
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+RULES_PATH = str(Path(__file__).with_name("genre_rules.json"))
+GAS_RULES_PATH = str(Path(__file__).resolve().parent.parent / "gas" / "organizer" / "GenreRules.js")
+DEFAULT_GENRE = "その他"
+
+# ジャンル名 -> キーワード（またはグループ名 -> キーワード。グループは説明用）
+RuleTable = Dict[str, Union[List[str], Dict[str, List[str]]]]
+
+
+def _flatten(entry: Union[List[str], Dict[str, List[str]]]) -> List[str]:
+    if isinstance(entry, dict):
+        return [word for words in entry.values() for word in words]
+    return list(entry)
+
+
+@dataclass
+class GenreRules:
+    priority: List[str]
+    genres: RuleTable
+    authors: RuleTable
+    description: str = ""
+
+    def keywords(self, genre: str) -> List[str]:
+        return _flatten(self.genres.get(genre, []))
+
+    def author_names(self, genre: str) -> List[str]:
+        return _flatten(self.authors.get(genre, []))
+
+
+def load_genre_rules(path: str = RULES_PATH) -> GenreRules:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return GenreRules(
+        priority=list(data["priority"]),
+        genres=data.get("genres", {}),
+        authors=data.get("authors", {}),
+        description=data.get("description", ""),
+    )
+
+
+def js_string(value: Any) -> str:
+    """GAS の String(value || '') と同じ文字列化（シートの数値・真偽値・空セル対策）"""
+    if not value:
+        return ""
+    if isinstance(value, bool):
+        return "true"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class PatternAutomaton:
+    """パターンごとの値（小さいほど優先）を持つ Aho-Corasick のオートマトン
+
+    best() は text に部分一致するパターンの値の最小（無ければ none）を返す。
+    失敗遷移は構築時に各状態の遷移表へ畳み込む（根に戻る遷移だけは根の表を引く）。
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]], none: int):
+        self.none = none
+        goto: List[Dict[str, int]] = [{}]
+        best: List[int] = [none]
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    best.append(none)
+                state = next_state
+            best[state] = min(best[state], value)
+
+        # 幅優先で失敗遷移を求め、出力（best）と遷移表を失敗先から引き継ぐ
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            parent_fail = fail[state]
+            best[state] = min(best[state], best[parent_fail])
+            delta[state] = {**delta[parent_fail], **goto[state]}
+            for char, child in goto[state].items():
+                # 深さ1の状態の失敗先は根（delta[0] は空なので根の表を引く）
+                fail[child] = delta[parent_fail].get(char, goto[0].get(char, 0))
+                queue.append(child)
+        self._root = goto[0]
+        self._delta = delta
+        self._best = best
+        self._floor = min(best) if best else none
+
+    @property
+    def states(self) -> int:
+        return len(self._best)
+
+    def best(self, text: str) -> int:
+        delta, root, best = self._delta, self._root, self._best
+        result = best[0]
+        if result <= self._floor:
+            return result
+        state = 0
+        for char in text:
+            next_state = delta[state].get(char)
+            state = next_state if next_state is not None else root.get(char, 0)
+            value = best[state]
+            if value < result:
+                result = value
+                if result <= self._floor:
+                    break
+        return result
+
+
+class GenreClassifier:
+    def __init__(self, rules: GenreRules):
+        self.rules = rules
+        # detectGenre と同じく「その他」のキーワードはタグ・タイトルの判定に使わない
+        self._genres = [genre for genre in rules.priority if genre != DEFAULT_GENRE]
+        self._keywords = PatternAutomaton(
+            ((word, rank) for rank, genre in enumerate(self._genres) for word in rules.keywords(genre)),
+            none=len(self._genres),
+        )
+        self._author_genres = list(rules.authors)
+        self._authors = PatternAutomaton(
+            ((name, rank) for rank, genre in enumerate(self._author_genres) for name in rules.author_names(genre)),
+            none=len(self._author_genres),
+        )
+
+    def classify(self, tags: Any, title: Any, author: Any) -> str:
+        author_text = js_string(author)
+        if author_text:
+            rank = self._authors.best(author_text)
+            if rank < self._authors.none:
+                return self._author_genres[rank]
+        for text in (js_string(tags), js_string(title)):
+            rank = self._keywords.best(text)
+            if rank < self._keywords.none:
+                return self._genres[rank]
+        return DEFAULT_GENRE
+
+    def classify_record(self, record: Dict) -> str:
+        """スクレイプの payload（tags / title / author）のジャンル"""
+        return self.classify(record.get("tags"), record.get("title"), record.get("author"))
+
+    def classify_many(self, records: Iterable[Dict]) -> List[str]:
+        """複数件をまとめて分類する（同じタグ・タイトル・著者の組は1回だけ判定）"""
+        cache: Dict[Tuple[str, str, str], str] = {}
+        genres = []
+        for record in records:
+            key = (js_string(record.get("tags")), js_string(record.get("title")), js_string(record.get("author")))
+            genre = cache.get(key)
+            if genre is None:
+                genre = cache[key] = self.classify(*key)
+            genres.append(genre)
+        return genres
+
+
+def detect_genre_reference(rules: GenreRules, tags: Any, title: Any, author: Any) -> str:
+    """detectGenre（gas/organizer/Main.js）をそのまま移した参照実装（テスト・計測の比較用）"""
+    tag_text, title_text, author_text = js_string(tags), js_string(title), js_string(author)
+    if author_text:
+        for genre in rules.authors:
+            for name in rules.author_names(genre):
+                if name in author_text:
+                    return genre
+    for text in (tag_text, title_text):
+        for genre in rules.priority:
+            if genre == DEFAULT_GENRE:
+                continue
+            for keyword in rules.keywords(genre):
+                if keyword in text:
+                    return genre
+    return DEFAULT_GENRE
+
+
+def summarize(genres: Iterable[str], top: int = 5) -> str:
+    counts = Counter(genres)
+    parts = [f"{genre} {count}" for genre, count in counts.most_common(top)]
+    if len(counts) > top:
+        parts.append(f"ほか {len(counts) - top}ジャンル")
+    return ", ".join(parts) if parts else "なし"
+
+
+def _js_literal(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _js_words(words: List[str], indent: str, width: int = 100) -> List[str]:
+    """キーワードを1行 width 文字程度で折り返した JS の配列要素の行"""
+    lines, current = [], ""
+    for word in words:
+        item = _js_literal(word)
+        if current and len(indent) + len(current) + len(item) + 2 > width:
+            lines.append(indent + current + ",")
+            current = item
+        else:
+            current = f"{current}, {item}" if current else item
+    if current:
+        lines.append(indent + current)
+    return lines
+
+
+def _js_table(name: str, table: RuleTable, comment: str) -> List[str]:
+    lines = [f"// {comment}", f"const {name} = {{"]
+    for genre, entry in table.items():
+        words = _flatten(entry)
+        if not words:
+            lines.append(f"  {_js_literal(genre)}: [],")
+            continue
+        lines.append(f"  {_js_literal(genre)}: [")
+        groups = entry if isinstance(entry, dict) else {"": entry}
+        body: List[str] = []
+        for label, group_words in groups.items():
+            if body:
+                body[-1] += ","
+            if label:
+                body.append(f"    // {label}")
+            body.extend(_js_words(group_words, "    "))
+        lines.extend(body)
+        lines.append("  ],")
+    lines.append("};")
+    return lines
+
+
+def render_gas_rules(rules: GenreRules) -> str:
+    """gas/organizer/GenreRules.js の内容（GENRE_RULES / AUTHOR_RULES / GENRE_PRIORITY）"""
+    lines = [
+        "/**",
+        " * ジャンル分類ルール（自動生成。直接編集しない）",
+        " * 元データ: src/genre_rules.json（Python の src/genre.py と共有）",
+        " * 更新: python -m src.genre sync-gas",
+        " */",
+        "",
+    ]
+    lines += _js_table("GENRE_RULES", rules.genres, "ジャンル分類ルール（キーワードの部分一致）")
+    lines.append("")
+    lines += _js_table("AUTHOR_RULES", rules.authors, "著者別の強制分類ルール（タグ・タイトルより優先。上から順にマッチング）")
+    lines.append("")
+    lines.append("// ジャンル判定の優先順序（上から順にマッチング）")
+    lines.append("const GENRE_PRIORITY = [")
+    lines.extend(f"  {_js_literal(genre)}," for genre in rules.priority)
+    lines.append("];")
+    return "\n".join(lines) + "\n"
+
+
+def sync_gas(rules_path: str = RULES_PATH, js_path: str = GAS_RULES_PATH) -> bool:
+    """GenreRules.js を再生成する（変更があれば True）"""
+    content = render_gas_rules(load_genre_rules(rules_path))
+    current = Path(js_path).read_text(encoding="utf-8") if Path(js_path).exists() else None
+    if current == content:
+        return False
+    Path(js_path).write_text(content, encoding="utf-8")
+    return True
+
+
+def sample_records(rules: GenreRules, count: int, seed: int = 0) -> List[Dict]:
+    """計測用の記事（キーワード・著者名を混ぜたタグ・タイトルと、どれにも当たらない行）"""
+    rng = random.Random(seed)
+    words = [word for genre in rules.priority for word in rules.keywords(genre)]
+    names = [name for genre in rules.authors for name in rules.author_names(genre)]
+    filler = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+
+    def noise(length: int) -> str:
+        return "".join(rng.choice(filler) for _ in range(length))
+
+    records = []
+    for n in range(count):
+        roll = rng.random()
+        tags = "" if roll < 0.3 else ",".join(noise(rng.randint(2, 8)) for _ in range(rng.randint(1, 5)))
+        title = f"{noise(rng.randint(10, 30))}{n}"
+        author = f"{noise(rng.randint(3, 8))}{n}"
+        if roll < 0.5:
+            title = f"{title}{rng.choice(words)}{noise(rng.randint(0, 10))}"
+        elif roll < 0.8:
+            tags = f"{tags},{rng.choice(words)}"
+        elif roll < 0.85:
+            author = f"{rng.choice(names)}｜{author}"
+        records.append({"tags": tags, "title": title, "author": author})
+    return records
+
+
+def benchmark(count: int = 100_000, rules_path: str = RULES_PATH) -> Dict[str, float]:
+    rules = load_genre_rules(rules_path)
+    records = sample_records(rules, count)
+
+    started = time.perf_counter()
+    classifier = GenreClassifier(rules)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    genres = classifier.classify_many(records)
+    automaton_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [detect_genre_reference(rules, r["tags"], r["title"], r["author"]) for r in records]
+    reference_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(genres, expected) if a != b)
+    return {
+        "records": count,
+        "build_ms": build_seconds * 1000,
+        "automaton_per_second": count / automaton_seconds,
+        "reference_per_second": count / reference_seconds,
+        "speedup": reference_seconds / automaton_seconds,
+        "mismatches": mismatches,
+        "states": classifier._keywords.states,
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args[0] if args else "bench"
+    if command == "sync-gas":
+        changed = sync_gas()
+        print(f"[genre] {'Updated' if changed else 'Up to date'}: {GAS_RULES_PATH}")
+    elif command == "bench":
+        result = benchmark(int(args[1]) if len(args) > 1 else 100_000)
+        print(
+            f"[genre] {result['records']} records: automaton {result['automaton_per_second']:,.0f}/s, "
+            f"reference {result['reference_per_second']:,.0f}/s (x{result['speedup']:.1f}), "
+            f"build {result['build_ms']:.1f}ms, {result['states']} states, mismatches {result['mismatches']}"
+        )
+    else:
+        raise SystemExit("usage: python -m src.genre [sync-gas | bench [count]]")
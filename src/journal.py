@@ -0,0 +1,97 @@
+"""src.main 実行の追記型ジャーナル（--resume 用）
+
+1行1イベントのJSONLに、キーワードごとの収集URLと完了した記事を追記する。
+記事ごとの書き込みは1行の追記と flush だけなので、記事処理のループを遅くしない。
+（fsync はしない。プロセスのクラッシュ・強制終了には耐えるが、OSごとの停止は対象外）
+
+- start: 実行するキーワード一覧
+- keyword: キーワードの収集結果（URLとソート順）
+- article: 記録が完了した記事URL
+- finish: 正常終了
+
+--resume では最後の start 以降を読み込み、収集済みキーワードの検索と完了済み記事の取得を省略する。
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class RunJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self.keywords: List[str] = []
+        self.collected: Dict[str, List[Tuple[str, str]]] = {}
+        self.completed: Set[str] = set()
+        self.finished = False
+        self._file = None
+
+    @property
+    def resumable(self) -> bool:
+        return bool(self.keywords) and not self.finished
+
+    def load(self) -> "RunJournal":
+        """既存のジャーナルを読み込む（最後の start 以降のみ）"""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で落ちた行は無視
+                    continue
+                kind = entry.get("type")
+                if kind == "start":
+                    self.keywords = entry.get("keywords", [])
+                    self.collected, self.completed, self.finished = {}, set(), False
+                elif kind == "keyword":
+                    self.collected[entry["keyword"]] = [tuple(item) for item in entry.get("urls", [])]
+                elif kind == "article":
+                    self.completed.add(entry["url"])
+                elif kind == "finish":
+                    self.finished = True
+        return self
+
+    def open(self, keywords: Optional[List[str]] = None) -> "RunJournal":
+        """追記用に開く。keywords を渡すと新しい実行として書き直す"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if keywords is not None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self.keywords, self.collected, self.completed, self.finished = list(keywords), {}, set(), False
+            self._write({"type": "start", "keywords": self.keywords})
+        else:
+            self._file = open(self.path, "a", encoding="utf-8")
+            # 前回書き込み途中で落ちた行の続きに書かないよう改行を補う
+            if self._file.tell() > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._file.write("\n")
+        return self
+
+    def _write(self, entry: Dict) -> None:
+        if self._file is None:
+            return
+        entry["at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record_keyword(self, keyword: str, urls: List[Tuple[str, str]]) -> None:
+        self.collected[keyword] = list(urls)
+        self._write({"type": "keyword", "keyword": keyword, "urls": [list(item) for item in urls]})
+
+    def record_article(self, url: str) -> None:
+        self.completed.add(url)
+        self._write({"type": "article", "url": url})
+
+    def finish(self) -> None:
+        self.finished = True
+        self._write({"type": "finish"})
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
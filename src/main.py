@@ -1,4 +1,3 @@
-import json
 import os
 import random
 import re
@@ -7,17 +6,60 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
-import requests
 import yaml
 from dotenv import load_dotenv
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
-from src.notifier import notify_complete, notify_critical, notify_error, notify_start
+from src.balloon import PURCHASED_SELECTOR, BalloonDetector, BalloonStats
+from src.browser import acquire_browser
+from src.browser_service import BrowserServiceConfig, load_browser_service
+from src.extractor import (
+    AUTHOR_SELECTORS,
+    AUTHOR_URL_SELECTORS,
+    HIGH_RATING_SELECTORS,
+    LIKE_SELECTORS,
+    PRICE_BUTTON_SELECTORS,
+    PRICE_FALLBACK_SELECTOR,
+    PRICE_HEADER_SELECTORS,
+    PRICE_KEYWORDS,
+    PRICE_PAYWALL_SELECTORS,
+    PRICE_STATUS_SELECTOR,
+    SALES_CLAIM_PATTERNS,
+    TAG_SELECTORS,
+    TITLE_SELECTORS,
+    extract_fields,
+)
+from src.freshness import RecrawlConfig, RecrawlPolicy, load_recrawl
+from src.frontier import UrlFrontier
+from src.gas_client import BackgroundUploader, BatchSender, SpooledError, UploadConfig, load_upload
+from src.journal import RunJournal
+from src.memory import MemoryConfig, MemoryGovernor, load_memory
+from src.metrics import METRICS, MetricsConfig, load_metrics
+from src.network import NetworkDiet, NetworkDietConfig, load_network_diet
+from src.genre import GenreClassifier, load_genre_rules, summarize as summarize_genres
+from src.notifier import (
+    SLACK,
+    NotifierConfig,
+    RunProgress,
+    load_notifier,
+    notify_complete,
+    notify_critical,
+    notify_error,
+    notify_start,
+)
+from src.pool import InlinePool, PagePool, RateLimiter
+from src.scheduler import KeywordScheduler, SchedulerConfig, attribute_keyword_stats, load_scheduler
+from src.search_harvest import SearchHarvester
+from src.selector_stats import SelectorRegistry
+from src.shard import ProcessPool
+from src.static_fetch import FIELDS, FieldSourceStats, StaticFetcher, merge_fields, missing_fields
+from src.store import open_store
+from src.throttle import AdaptiveThrottle, ThrottleConfig, goto, load_throttle
+from src.urls import normalize_url
 
 SEARCH_URL_PAID_POPULAR = "https://note.com/search?context=note_for_sale&q={keyword}&sort=popular"
 SEARCH_URL_PAID_TREND = "https://note.com/search?context=note_for_sale&q={keyword}&sort=trend"
-PURCHASED_SELECTOR = ".m-purchasedWithinLast24HoursBalloon"
 
 
 @dataclass
@@ -31,6 +73,44 @@ class Config:
     max_retries: int
     dry_run: bool
     split_days: int
+    concurrency: int
+    max_articles_per_minute: float
+    network_diet: NetworkDietConfig
+    fetch_mode: str
+    gas_batch_size: int
+    gas_batch_max_age_seconds: float
+    store_path: str
+    recrawl: RecrawlConfig
+    scroll_timeout_ms: int
+    scroll_stagnant_rounds: int
+    harvest_search_api: bool
+    tracker_upload_chunk: int
+    tracker_checkpoint_path: str
+    balloon_early_exit: bool
+    balloon_grace_ms: int
+    journal_path: str
+    processes: int
+    scheduler: SchedulerConfig
+    metrics: MetricsConfig
+    selector_stats_path: str
+    selector_dead_after: int
+    genre_rules_path: str
+    browser_service: BrowserServiceConfig
+    memory: MemoryConfig
+    throttle: ThrottleConfig
+    gas_upload: UploadConfig
+    slack: NotifierConfig
+
+
+@dataclass
+class RunStats:
+    total_records: int = 0
+    new_records: int = 0
+    error_count: int = 0
+    local_new_records: int = 0
+    skipped: int = 0
+    resumed: int = 0
+    spooled: int = 0
 
 
 def get_keywords_for_today(all_keywords: List[str], split_days: int) -> List[str]:
@@ -61,32 +141,68 @@ def load_config(path: str) -> Config:
         max_retries=int(raw.get("max_retries", 2)),
         dry_run=bool(raw.get("dry_run", False)),
         split_days=int(raw.get("split_days", 1)),
+        concurrency=int(raw.get("concurrency", 1)),
+        max_articles_per_minute=float(raw.get("max_articles_per_minute", 0)),
+        network_diet=load_network_diet(raw),
+        fetch_mode=str(raw.get("fetch_mode", "browser")),
+        gas_batch_size=int(raw.get("gas_batch_size", 1)),
+        gas_batch_max_age_seconds=float(raw.get("gas_batch_max_age_seconds", 60)),
+        store_path=str(raw.get("store_path", "") or ""),
+        recrawl=load_recrawl(raw),
+        scroll_timeout_ms=int(raw.get("scroll_timeout_ms", 8000)),
+        scroll_stagnant_rounds=int(raw.get("scroll_stagnant_rounds", 5)),
+        harvest_search_api=bool(raw.get("harvest_search_api", False)),
+        tracker_upload_chunk=int(raw.get("tracker_upload_chunk", 0)),
+        balloon_early_exit=bool(raw.get("balloon_early_exit", False)),
+        balloon_grace_ms=int(raw.get("balloon_grace_ms", 300)),
+        processes=int(raw.get("processes", 1)),
+        scheduler=load_scheduler(raw),
+        metrics=load_metrics(raw),
+        selector_stats_path=str(raw.get("selector_stats_path", "") or ""),
+        selector_dead_after=int(raw.get("selector_dead_after", 200)),
+        genre_rules_path=str(raw.get("genre_rules_path", "") or ""),
+        browser_service=load_browser_service(raw),
+        memory=load_memory(raw),
+        throttle=load_throttle(raw),
+        gas_upload=load_upload(raw),
+        slack=load_notifier(raw),
+        journal_path=str(raw.get("journal_path", "") or ""),
+        tracker_checkpoint_path=str(raw.get("tracker_checkpoint_path", "") or ""),
     )
 
 
 def rand_sleep(ms_range: Tuple[int, int]) -> None:
     low, high = ms_range
     delay = random.uniform(low / 1000.0, high / 1000.0)
-    time.sleep(delay)
+    with METRICS.timer("sleep_between"):
+        time.sleep(delay)
 
 
-def normalize_url(url: str) -> str:
-    if not url:
-        return ""
-    url = url.split("#", 1)[0]
-    url = url.split("?", 1)[0]
-    return url.rstrip("/")
+# 未処理のアンカーだけを返し、処理済みの印を付ける（スクロールごとの差分抽出）
+NEW_ANCHOR_HREFS_SCRIPT = """
+() => {
+  const hrefs = [];
+  for (const a of document.querySelectorAll('a[href]:not([data-nt-seen])')) {
+    a.setAttribute('data-nt-seen', '1');
+    hrefs.push(a.getAttribute('href'));
+  }
+  return hrefs;
+}
+"""
 
+# 記事リンクが count 件より増えたら true（スクロール後の読み込み完了の合図）
+MORE_ARTICLES_SCRIPT = """
+(count) => document.querySelectorAll('a[href*="/n/"]').length > count
+"""
 
-def extract_article_urls(page) -> List[str]:
-    anchors = page.eval_on_selector_all(
-        "a[href]",
-        """
-        (elements) => elements.map(a => a.getAttribute('href'))
-        """,
-    )
+ARTICLE_LINK_COUNT_SCRIPT = """
+() => document.querySelectorAll('a[href*="/n/"]').length
+"""
+
+
+def filter_article_hrefs(hrefs: List[str]) -> List[str]:
     urls = []
-    for href in anchors:
+    for href in hrefs:
         if not href:
             continue
         if href.startswith("/"):
@@ -95,72 +211,114 @@ def extract_article_urls(page) -> List[str]:
             continue
         if re.search(r"https://note\.com/[^/]+/n/[^/]+", href):
             urls.append(normalize_url(href))
-    deduped = list(dict.fromkeys(urls))
-    return deduped
+    return list(dict.fromkeys(urls))
 
 
-def collect_from_single_sort(page, search_url: str, limit: int, between_pages_ms: Tuple[int, int]) -> List[str]:
-    """単一のソート順で記事URLを収集"""
-    page.goto(search_url, wait_until="networkidle")
-    # 初期読み込み待機
-    time.sleep(random.uniform(3, 4))
+def extract_article_urls(page) -> List[str]:
+    anchors = page.eval_on_selector_all(
+        "a[href]",
+        """
+        (elements) => elements.map(a => a.getAttribute('href'))
+        """,
+    )
+    return filter_article_hrefs(anchors)
+
+
+def collect_from_single_sort(
+    page,
+    search_url: str,
+    limit: int,
+    scroll_timeout_ms: int = 8000,
+    throttle: Optional[AdaptiveThrottle] = None,
+    stagnant_rounds_limit: int = 5,
+) -> List[str]:
+    """単一のソート順で記事URLを収集
+
+    固定の待機ではなく「記事リンクが増えた」ことを合図に次のスクロールへ進む。
+    scroll_timeout_ms 以内に増えなければ停滞とみなし、stagnant_rounds_limit 回続いたら終了する。
+    throttle を渡すと検索ページの遷移も記事と同じアクセス頻度の調整に含める。
+    """
+    # 初期読み込み待機（最初の記事リンクが出るまで）
+    if throttle:
+        throttle.acquire()
+    try:
+        with METRICS.timer("search_goto"):
+            goto(page, search_url, throttle, wait_until="domcontentloaded")
+            page.wait_for_selector('a[href*="/n/"]', timeout=scroll_timeout_ms * 2, state="attached")
+    except PlaywrightTimeoutError:
+        print("  [scroll] No articles rendered")
+        return []
 
     collected: List[str] = []
+    seen = set()
     stagnant_rounds = 0
     max_scrolls = 50  # 最大スクロール回数
 
     for scroll_count in range(max_scrolls):
-        if len(collected) >= limit:
-            break
-
-        current = extract_article_urls(page)
-        before = len(collected)
-        for url in current:
-            if url not in collected:
+        # 前回から増えたアンカーだけを取得
+        with METRICS.timer("scroll_extract"):
+            hrefs = page.evaluate(NEW_ANCHOR_HREFS_SCRIPT)
+        for url in filter_article_hrefs(hrefs):
+            if url not in seen:
+                seen.add(url)
                 collected.append(url)
-            if len(collected) >= limit:
-                break
 
         print(f"  [scroll {scroll_count + 1}] {len(collected)} urls collected")
 
-        if len(collected) == before:
-            stagnant_rounds += 1
-            if stagnant_rounds >= 5:
-                print(f"  [scroll] No new articles after {stagnant_rounds} attempts, stopping")
-                break
-        else:
-            stagnant_rounds = 0
-
         if len(collected) >= limit:
             break
 
-        # ページ最下部までスクロール
+        # ページ最下部までスクロールし、新しい記事リンクが描画されるのを待つ
+        link_count = page.evaluate(ARTICLE_LINK_COUNT_SCRIPT)
         page.evaluate("window.scrollTo(0, document.documentElement.scrollHeight)")
-
-        # スクロール後の待機時間（新しいコンテンツの読み込みを待つ）
-        time.sleep(random.uniform(4, 6))
+        try:
+            with METRICS.timer("scroll_wait"):
+                page.wait_for_function(MORE_ARTICLES_SCRIPT, arg=link_count, timeout=scroll_timeout_ms)
+            stagnant_rounds = 0
+        except PlaywrightTimeoutError:
+            stagnant_rounds += 1
+            if stagnant_rounds >= stagnant_rounds_limit:
+                print(f"  [scroll] No new articles after {stagnant_rounds} attempts, stopping")
+                break
 
     return collected[:limit]
 
 
-def collect_article_urls(page, keyword: str, limit: int, between_pages_ms: Tuple[int, int]) -> List[str]:
-    """人気順と急上昇の両方から記事URLを収集（重複除去）"""
+def collect_article_urls(
+    page,
+    keyword: str,
+    limit: int,
+    scroll_timeout_ms: int = 8000,
+    frontier: Optional[UrlFrontier] = None,
+    throttle: Optional[AdaptiveThrottle] = None,
+    stagnant_rounds_limit: int = 5,
+) -> List[str]:
+    """人気順と急上昇の両方から記事URLを収集（重複除去）
+
+    frontier を渡すと、ソート順ごとの結果をキーワードの記録付きで追加する。
+    """
     all_urls: List[str] = []
 
     # 人気順
     popular_url = SEARCH_URL_PAID_POPULAR.format(keyword=keyword)
     print(f"[search] {popular_url} (popular)")
-    popular_urls = collect_from_single_sort(page, popular_url, limit, between_pages_ms)
+    popular_urls = collect_from_single_sort(page, popular_url, limit, scroll_timeout_ms, throttle, stagnant_rounds_limit)
     print(f"[popular] {len(popular_urls)} urls")
+    if frontier is not None:
+        frontier.add(popular_urls, keyword, "popular")
     all_urls.extend(popular_urls)
 
     # 急上昇
     trend_url = SEARCH_URL_PAID_TREND.format(keyword=keyword)
     print(f"[search] {trend_url} (trend)")
-    trend_urls = collect_from_single_sort(page, trend_url, limit, between_pages_ms)
+    trend_urls = collect_from_single_sort(page, trend_url, limit, scroll_timeout_ms, throttle, stagnant_rounds_limit)
     print(f"[trend] {len(trend_urls)} urls")
+    if frontier is not None:
+        frontier.add(trend_urls, keyword, "trend")
+    seen = set(all_urls)
     for url in trend_urls:
-        if url not in all_urls:
+        if url not in seen:
+            seen.add(url)
             all_urls.append(url)
 
     print(f"[total] {len(all_urls)} unique urls")
@@ -193,36 +351,15 @@ def parse_int(text: str) -> int:
 
 
 def extract_title(page) -> str:
-    selectors = [
-        "h1.o-noteContentText__title",
-        "h1.note-title",
-        ".p-note__title h1",
-        "h1",
-        'meta[property="og:title"]',
-    ]
-    return text_from_selectors(page, selectors) or page.title().replace(" | note", "").strip()
+    return text_from_selectors(page, TITLE_SELECTORS) or page.title().replace(" | note", "").strip()
 
 
 def extract_author(page) -> str:
-    selectors = [
-        ".o-noteContentHeader__name a",
-        ".o-noteContentHeader__author a",
-        ".o-noteContentHeader__author",
-        ".p-noteHeader__author",
-        ".note-author-name",
-        'meta[name="author"]',
-    ]
-    return text_from_selectors(page, selectors)
+    return text_from_selectors(page, AUTHOR_SELECTORS)
 
 
 def extract_author_url(page) -> str:
-    selectors = [
-        ".o-noteContentHeader__name a",
-        ".o-noteContentHeader__author a",
-        ".p-noteHeader__author a",
-        ".note-author-link",
-    ]
-    for selector in selectors:
+    for selector in AUTHOR_URL_SELECTORS:
         el = page.query_selector(selector)
         if el:
             href = el.get_attribute("href") or ""
@@ -234,13 +371,7 @@ def extract_author_url(page) -> str:
 
 
 def extract_like_count(page) -> int:
-    selectors = [
-        ".o-noteLikeV3__count",
-        "[data-like-count]",
-        ".note-like-count",
-        ".js-like-count",
-    ]
-    for selector in selectors:
+    for selector in LIKE_SELECTORS:
         el = page.query_selector(selector)
         if el:
             return parse_int(el.inner_text())
@@ -249,7 +380,7 @@ def extract_like_count(page) -> int:
 
 def extract_price(page) -> int:
     # 優先順位0: ヘッダー内のステータスボタン（¥0~ など）
-    header_status_el = page.query_selector(".o-noteContentHeader__status .a-button__inner")
+    header_status_el = page.query_selector(PRICE_STATUS_SELECTOR)
     if header_status_el:
         text = header_status_el.inner_text().strip()
         if re.search(r"¥\s*0\s*[〜~]", text):
@@ -259,12 +390,7 @@ def extract_price(page) -> int:
             return int(match.group(1).replace(",", ""))
 
     # 優先順位1: ヘッダー付近の価格表示
-    header_selectors = [
-        ".o-noteContentHeader__price",
-        ".p-article__price",
-        "[class*='ContentHeader'] [class*='price']",
-    ]
-    for selector in header_selectors:
+    for selector in PRICE_HEADER_SELECTORS:
         el = page.query_selector(selector)
         if el:
             text = el.inner_text().strip()
@@ -275,13 +401,7 @@ def extract_price(page) -> int:
                 return int(match.group(1).replace(",", ""))
 
     # 優先順位2: 売り切れ時のペイウォール内の価格表示
-    paywall_selectors = [
-        ".o-accordionPaywall .text-xl",
-        ".o-paywall .text-2xl",
-        ".o-singlePaywall .text-2xl",
-        "section.o-paywall span.text-2xl",
-    ]
-    for selector in paywall_selectors:
+    for selector in PRICE_PAYWALL_SELECTORS:
         el = page.query_selector(selector)
         if el:
             text = el.inner_text().strip()
@@ -292,13 +412,7 @@ def extract_price(page) -> int:
                     return price
 
     # 優先順位3: 購入ボタン周辺から価格を探す
-    button_selectors = [
-        "button.a-button span",
-        "button[class*='button'] span",
-        ".a-button__inner span",
-        "[class*='price']",
-    ]
-    for selector in button_selectors:
+    for selector in PRICE_BUTTON_SELECTORS:
         elements = page.query_selector_all(selector)
         for el in elements:
             text = el.inner_text().strip()
@@ -309,12 +423,11 @@ def extract_price(page) -> int:
                     return price
 
     # 優先順位4: ページ全体から価格キーワード付きの¥を探す
-    price_keywords = ["返金可", "購入", "買う", "この記事は"]
-    all_elements = page.query_selector_all("p, div, span, button")
+    all_elements = page.query_selector_all(PRICE_FALLBACK_SELECTOR)
     for el in all_elements:
         try:
             text = el.inner_text().strip()
-            has_keyword = any(kw in text for kw in price_keywords)
+            has_keyword = any(kw in text for kw in PRICE_KEYWORDS)
             if has_keyword:
                 match = re.search(r"¥([\d,]+)", text)
                 if match:
@@ -332,15 +445,7 @@ def extract_tags(page) -> str:
     tags = []
 
     # noteのタグセレクタ（複数パターンに対応）
-    selectors = [
-        ".m-tagList__item a",
-        ".o-noteHashtag a",
-        'a[href*="/hashtag/"]',
-        ".note-hashtag",
-        "[class*='hashtag'] a",
-    ]
-
-    for selector in selectors:
+    for selector in TAG_SELECTORS:
         elements = page.query_selector_all(selector)
         if elements:
             for el in elements:
@@ -374,12 +479,7 @@ def extract_created_at(page) -> str:
 
 def extract_high_rating(page) -> int:
     """高評価数を抽出（購入者のみが付けられる）"""
-    selectors = [
-        ".m-contentRaters__label",
-        "[class*='contentRaters'] button",
-        "[class*='Raters']",
-    ]
-    for selector in selectors:
+    for selector in HIGH_RATING_SELECTORS:
         el = page.query_selector(selector)
         if el:
             text = el.inner_text().strip()
@@ -392,23 +492,16 @@ def extract_high_rating(page) -> int:
 def extract_sales_claim(page) -> str:
     """販売主張テキストを検索（本文中の「○部完売」など）"""
     body_text = page.evaluate("() => document.body.innerText")
-    patterns = [
-        r"\d+部完売",
-        r"\d+部販売",
-        r"\d+部突破",
-        r"\d+部売れ",
-        r"\d+部達成",
-        r"\d+冊完売",
-        r"\d+冊販売",
-        r"\d+冊突破",
-    ]
-    for pattern in patterns:
+    for pattern in SALES_CLAIM_PATTERNS:
         if re.search(pattern, body_text):
             return "○"
     return ""
 
 
-def detect_purchased_24h(page, timeout_ms: int) -> bool:
+def detect_purchased_24h(page, timeout_ms: int, detector: Optional[BalloonDetector] = None) -> bool:
+    if detector:
+        # 描画完了後にバルーンが無ければタイムアウトを待たずに判定
+        return detector.detect(page).hit
     try:
         page.wait_for_selector(PURCHASED_SELECTOR, timeout=timeout_ms, state="attached")
         return True
@@ -416,64 +509,117 @@ def detect_purchased_24h(page, timeout_ms: int) -> bool:
         return False
 
 
-def send_to_gas(url: str, payload: Dict) -> Dict:
-    if not url:
-        raise RuntimeError("GAS_WEB_APP_URL is not set")
-    response = requests.post(url, json=payload, timeout=15)
-    response.raise_for_status()
-    try:
-        return response.json()
-    except json.JSONDecodeError:
-        return {"success": False, "error": "Invalid JSON response"}
-
+def make_balloon_detector(config: Config, stats: Optional[BalloonStats] = None) -> Optional[BalloonDetector]:
+    """balloon_early_exit が有効なら早期判定の検出器を返す（無効なら従来の待機）"""
+    if not config.balloon_early_exit:
+        return None
+    return BalloonDetector(config.article_wait_ms, grace_ms=config.balloon_grace_ms, stats=stats)
+
+
+def scrape_article(
+    page,
+    url: str,
+    timeout_ms: int,
+    max_retries: int,
+    fetcher: Optional[StaticFetcher] = None,
+    known: Optional[Dict] = None,
+    detector: Optional[BalloonDetector] = None,
+    registry: Optional[SelectorRegistry] = None,
+    throttle: Optional[AdaptiveThrottle] = None,
+) -> Dict:
+    """記事ページを開いて24h購入表示と各項目を取得
+
+    known は検索APIレスポンスから分かっている項目（SearchHarvester）。
+    HTML（HTTP優先モード）と known で足りる場合はページ内抽出を省略する。
+    registry を渡すとページ内抽出のセレクタを的中率の高い順に試し、結果を集計する。
+    throttle を渡すと記事ページの応答ステータス・所要時間をアクセス頻度の調整に反映する。
+    """
+    known = known or {}
+    # HTTP優先モード: サーバー描画済みHTMLから取れる項目を先に取得
+    static = {}
+    if fetcher:
+        with METRICS.timer("static_fetch"):
+            static = fetcher.fetch(url)
+    if fetcher:
+        need_browser_fields = bool(missing_fields({**known, **static}))
+    else:
+        # ブラウザモードでは salesClaim などHTMLでしか判定できない項目もページから取る
+        need_browser_fields = any(field not in known for field in FIELDS)
 
-def scrape_article(page, url: str, timeout_ms: int, max_retries: int) -> Dict:
     last_error: Optional[Exception] = None
     for attempt in range(max_retries + 1):
+        if attempt and throttle is not None and throttle.enabled:
+            # 再試行も1回の遷移としてトークンを取る（減速後のレート・Retry-After に従う）
+            throttle.acquire()
         try:
-            page.goto(url, wait_until="domcontentloaded")
-            purchased_24h = detect_purchased_24h(page, timeout_ms)
-            title = extract_title(page)
-            author = extract_author(page)
-            author_url = extract_author_url(page)
-            likes = extract_like_count(page)
-            high_rating = extract_high_rating(page)
-            price = extract_price(page)
-            tags = extract_tags(page)
-            created_at = extract_created_at(page)
-            sales_claim = extract_sales_claim(page)
+            with METRICS.timer("article_goto"):
+                goto(page, url, throttle, wait_until="domcontentloaded")
+            with METRICS.timer("balloon_wait"):
+                purchased_24h = detect_purchased_24h(page, timeout_ms, detector)
+            # extract_* と同じ優先順位で、ページ内で1回のevaluateで抽出（HTMLで足りない場合のみ）
+            browser_fields = {}
+            if need_browser_fields:
+                with METRICS.timer("extract_fields"):
+                    browser_fields = extract_fields(page, registry)
+            fields, sources = merge_fields(static, browser_fields, known)
 
             # note-sales-tracker Chrome拡張と同じ形式
             payload = {
                 "url": url,
-                "title": title,
-                "author": author,
-                "authorUrl": author_url,
-                "likes": likes,
-                "highRating": high_rating,
-                "price": price,
-                "tags": tags,
-                "createdAt": created_at,
-                "salesClaim": sales_claim,
+                "title": fields["title"],
+                "author": fields["author"],
+                "authorUrl": fields["authorUrl"],
+                "likes": fields["likes"],
+                "highRating": fields["highRating"],
+                "price": fields["price"],
+                "tags": fields["tags"],
+                "createdAt": fields["createdAt"],
+                "salesClaim": fields["salesClaim"],
                 "hasSalesInfo": purchased_24h,
                 "salesMessage": "買われています 過去24時間" if purchased_24h else None,
                 "purchased24h": purchased_24h,
                 "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "fieldSources": sources,
             }
             return payload
         except Exception as exc:
             last_error = exc
-            time.sleep(1)
+            METRICS.count("article_retries")
+            if throttle is None or not throttle.enabled:
+                with METRICS.timer("sleep_retry"):
+                    time.sleep(1)
     raise RuntimeError(f"Failed to scrape {url}: {last_error}")
 
 
-def run(config_path: str = "config.yaml", keywords_override: Optional[List[str]] = None) -> None:
+def print_dry_run(payload: Dict) -> None:
+    purchased_mark = "[24h]" if payload.get("purchased24h") else ""
+    title = payload.get('title', '')[:40].encode('ascii', 'replace').decode('ascii')
+    author = payload.get('author', '').encode('ascii', 'replace').decode('ascii')
+    hr = payload.get('highRating', 0)
+    hr_mark = f" HR:{hr}" if hr > 0 else ""
+    sc_mark = " [claim]" if payload.get('salesClaim') else ""
+    tags = payload.get('tags', '').encode('ascii', 'replace').decode('ascii')[:30]
+    tags_mark = f" [{tags}]" if tags else ""
+    print(f"[dry] {purchased_mark}{sc_mark} {title} by {author} {payload.get('price', 0)}yen{hr_mark}{tags_mark}")
+
+
+def run(
+    config_path: str = "config.yaml",
+    keywords_override: Optional[List[str]] = None,
+    resume: bool = False,
+) -> None:
+    """キーワードごとに記事URLを収集し、各記事を取得してGASへ送信
+
+    resume=True なら journal_path の中断した実行を再開する
+    （キーワードは前回のもの、収集済みキーワードの検索と送信済みの記事は省略）。
+    """
     load_dotenv()
     gas_url = os.getenv("GAS_WEB_APP_URL", "").strip()
 
     config = load_config(config_path)
     if not config.keywords:
         raise RuntimeError("keywords is empty in config.yaml")
+    METRICS.configure(config.metrics.enabled)
 
     # キーワードが外部から指定されている場合はそれを使用
     day_names_ja = ["月", "火", "水", "木", "金", "土", "日"]
@@ -482,13 +628,34 @@ def run(config_path: str = "config.yaml", keywords_override: Optional[List[str]]
     # 手動実行判定: keywords_override あり、または split_days=1（全キーワード一括）、または別設定ファイル
     is_manual = keywords_override is not None or config.split_days == 1 or config_path != "config.yaml"
 
+    # ローカル記事ストア（DRY RUNでは記録しない）
+    store = None if config.dry_run else open_store(config.store_path)
+    # 収穫量と時間予算でキーワードを選ぶスケジューラ（ストア必須）
+    scheduler = KeywordScheduler(config.scheduler, store)
+    start_details: List[str] = []
+
     if keywords_override:
         keywords = keywords_override
         print(f"[manual] {len(keywords)} keywords specified: {', '.join(keywords)}")
+    elif scheduler.enabled:
+        selected, deferred = scheduler.plan(config.keywords)
+        keywords = [plan.keyword for plan in selected]
+        summary = scheduler.summary(selected, deferred)
+        print(f"[schedule] {summary}")
+        for plan in selected:
+            print(f"  [schedule] {plan.explain()}")
+        # 開始通知には要約と上位の選定理由だけを載せる
+        start_details = [summary] + [plan.explain() for plan in selected[:10]]
+        if len(selected) > 10:
+            start_details.append(f"ほか {len(selected) - 10} キーワード")
     else:
+        if config.scheduler.enabled:
+            print("[schedule] Disabled: store_path is not set (or DRY RUN)")
         keywords = get_keywords_for_today(config.keywords, config.split_days)
         if not keywords:
             print("[skip] No keywords for today")
+            if store:
+                store.close()
             return
 
         day_name = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][datetime.now().weekday()]
@@ -497,84 +664,389 @@ def run(config_path: str = "config.yaml", keywords_override: Optional[List[str]]
     if config.dry_run:
         print("[mode] DRY RUN - GAS will be skipped")
 
+    # 実行ジャーナル（DRY RUNでは記録しない）
+    journal = RunJournal(config.journal_path) if config.journal_path and not config.dry_run else None
+    if resume and not journal:
+        print("[resume] Disabled: journal_path is not set (or DRY RUN)")
+    if journal and resume and journal.load().resumable:
+        keywords = journal.keywords
+        journal.open()
+        print(
+            f"[resume] {len(journal.collected)}/{len(keywords)} keywords collected, "
+            f"{len(journal.completed)} articles done"
+        )
+    elif journal:
+        if resume:
+            print("[resume] No interrupted run found, starting over")
+        journal.open(keywords)
+
     # 統計情報
     start_time = time.time()
-    total_records = 0
-    new_records = 0
-    error_count = 0
+    stats = RunStats()
+    source_stats = FieldSourceStats()
+
+    def on_gas_result(payload: Dict, gas_result: Optional[Dict], error: Optional[Exception]) -> None:
+        if isinstance(error, SpooledError):
+            # 次回の実行で最初に再送する（取得済みのデータなので取得エラーにはしない）
+            stats.spooled += 1
+            if journal:
+                journal.record_article(normalize_url(payload["url"]))
+            if store:
+                store.mark_delivered(normalize_url(payload["url"]))
+            return
+        if error is not None:
+            print(f"[error] Failed to record {payload['url']}: {error}")
+            stats.error_count += 1
+            return
+        print(f"[gas] {gas_result}")
+        stats.total_records += 1
+        if gas_result.get("isUpdate") is False:
+            stats.new_records += 1
+        if journal:
+            journal.record_article(normalize_url(payload["url"]))
+        # 再巡回ポリシーは送信できた取得だけを新しいとみなす（失敗した記事は次回も取得する）
+        if store:
+            store.mark_delivered(normalize_url(payload["url"]))
+
+    # 件数または経過時間でまとめてGASへ送信（background では別スレッドで送り、前回のスプールを先に再送）
+    if config.gas_upload.background and not config.dry_run:
+        sender = BackgroundUploader(
+            gas_url,
+            on_gas_result,
+            max_records=config.gas_batch_size,
+            max_age_seconds=config.gas_batch_max_age_seconds,
+            config=config.gas_upload,
+        ).start()
+    else:
+        sender = BatchSender(
+            gas_url,
+            on_gas_result,
+            max_records=config.gas_batch_size,
+            max_age_seconds=config.gas_batch_max_age_seconds,
+        )
+
+    run_id = store.start_run("scrape", len(keywords)) if store else None
+    # 最近取得した記事をスキップする再巡回ポリシー（ストア必須）
+    recrawl = RecrawlPolicy(config.recrawl, store)
+    if config.recrawl.enabled and not recrawl.enabled:
+        print("[recrawl] Disabled: store_path is not set (or DRY RUN)")
+
+    # ページ内抽出のセレクタの的中率（前回までの集計で並べ替え、実行後に保存）
+    registry = None
+    if config.selector_stats_path:
+        registry = SelectorRegistry(config.selector_stats_path, config.selector_dead_after).load()
+
+    # ジャンル分類（GAS organizer と同じルール）。送信前に payload の genre に入れる
+    classifier = GenreClassifier(load_genre_rules(config.genre_rules_path)) if config.genre_rules_path else None
+    genres: List[str] = []
+
+    # 通知は別スレッドで送り、進捗を定期的に通知する
+    progress = RunProgress(len(keywords))
+    if not config.dry_run:
+        SLACK.configure(config.slack)
+        SLACK.start_heartbeat(progress.summary)
 
     # 開始通知
     if not config.dry_run:
-        notify_start(len(keywords), day_name_ja, len(config.keywords), is_manual=is_manual)
+        notify_start(len(keywords), day_name_ja, len(config.keywords), is_manual=is_manual, details=start_details)
 
     try:
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=config.headless)
-            # Bot検出回避のための設定
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                locale="ja-JP",
-                timezone_id="Asia/Tokyo",
-            )
-            search_page = context.new_page()
-            article_page = context.new_page()
-
-            for keyword in keywords:
-                urls = collect_article_urls(
-                    search_page,
-                    keyword,
-                    config.results_per_keyword,
-                    config.between_pages_ms,
+            # processes > 1 ではワーカープロセスがそれぞれブラウザを起動する（ここでは起動しない）
+            sharded = config.processes > 1
+            lease = None
+            # 検索APIのレスポンスから記事の部分レコードを収集
+            harvester = SearchHarvester()
+            frontier = UrlFrontier()
+            # 遷移回数・メモリ上限でのページの作り直しと、フェーズごとのピークRSS
+            governor = MemoryGovernor(config.memory)
+
+            def open_search_page(old=None):
+                page = lease.reopen(old, renew_context=governor.renew_context) if old else lease.new_page()
+                if config.harvest_search_api:
+                    harvester.attach(page)
+                return page
+
+            if not sharded:
+                # 常駐ブラウザが動いていれば接続（無ければプロセス内で起動）
+                lease = acquire_browser(p, config.headless, config.browser_service)
+                search_page = open_search_page()
+
+            # 記事ページのワーカープール（全ワーカー共通のレート上限付き）
+            # throttle 有効時は応答に合わせて調整するトークンバケットが固定の待機の代わりになる
+            throttle = AdaptiveThrottle(config.throttle, config.max_articles_per_minute)
+            limiter = throttle if throttle.enabled else RateLimiter(config.max_articles_per_minute)
+            pause_ms = None if throttle.enabled else config.between_articles_ms
+            diet = NetworkDiet(config.network_diet)
+            fetcher = None
+            if config.fetch_mode == "hybrid":
+                fetcher = StaticFetcher(pool_size=max(1, config.concurrency), throttle=throttle if throttle.enabled else None)
+            balloon_stats = BalloonStats()
+            detector = make_balloon_detector(config, balloon_stats)
+
+            def scrape_task(page, url: str) -> Dict:
+                return scrape_article(
+                    page,
+                    url,
+                    config.article_wait_ms,
+                    config.max_retries,
+                    fetcher,
+                    known=harvester.get(url),
+                    detector=detector,
+                    registry=registry,
+                    throttle=throttle,
+                )
+
+            def start_article_pool():
+                if sharded:
+                    return ProcessPool(
+                        config.processes,
+                        config_path,
+                        "scrape",
+                        prepare=lambda url: (url, harvester.get(url)),
+                    ).start()
+                if config.concurrency > 1:
+                    return PagePool(
+                        config.concurrency,
+                        config.headless,
+                        scrape_task,
+                        limiter=limiter,
+                        pause_ms=pause_ms,
+                        diet=diet,
+                        service=config.browser_service,
+                        governor=governor,
+                    ).start()
+                article_page = lease.new_page(diet)
+                return InlinePool(
+                    article_page,
+                    scrape_task,
+                    limiter=limiter,
+                    pause_ms=pause_ms,
+                    governor=governor,
+                    reopen=lambda old: lease.reopen(old, diet, governor.renew_context),
                 )
-                print(f"[search] keyword='{keyword}' urls={len(urls)}")
-
-                for idx, url in enumerate(urls, start=1):
-                    print(f"[article] {idx}/{len(urls)} {url}")
-                    try:
-                        payload = scrape_article(
-                            article_page,
-                            url,
-                            config.article_wait_ms,
-                            config.max_retries,
-                        )
-                        if config.dry_run:
-                            purchased_mark = "[24h]" if payload.get("purchased24h") else ""
-                            title = payload.get('title', '')[:40].encode('ascii', 'replace').decode('ascii')
-                            author = payload.get('author', '').encode('ascii', 'replace').decode('ascii')
-                            hr = payload.get('highRating', 0)
-                            hr_mark = f" HR:{hr}" if hr > 0 else ""
-                            sc_mark = " [claim]" if payload.get('salesClaim') else ""
-                            tags = payload.get('tags', '').encode('ascii', 'replace').decode('ascii')[:30]
-                            tags_mark = f" [{tags}]" if tags else ""
-                            print(f"[dry] {purchased_mark}{sc_mark} {title} by {author} {payload.get('price', 0)}yen{hr_mark}{tags_mark}")
-                            total_records += 1
-                        else:
-                            result = send_to_gas(gas_url, payload)
-                            print(f"[gas] {result}")
-                            total_records += 1
-                            if result.get("isUpdate") is False:
-                                new_records += 1
-                    except Exception as e:
-                        print(f"[error] Skipping {url}: {e}")
-                        error_count += 1
-                    rand_sleep(config.between_articles_ms)
-
-            browser.close()
+
+            collect_pool = None
+            article_pool = None
+            # キーワードごとの所要時間と収穫（スケジューラ用の実績）
+            search_minutes: Dict[str, float] = {}
+            scraped: List[Tuple[List[str], bool]] = []
+            skipped_known: List[Tuple[List[str], bool]] = []
+            article_started = time.monotonic()
+            try:
+                # 検索はキーワード単位でワーカープロセスに分配（結果はキーワード順に受け取る）
+                if sharded:
+                    pending_keywords = [k for k in keywords if not (journal and k in journal.collected)]
+                    collect_pool = ProcessPool(config.processes, config_path, "collect").start()
+                    search_results = collect_pool.imap(pending_keywords)
+
+                # 全キーワードの検索結果を1つのフロンティアにまとめてから記事を取得
+                governor.set_phase("search")
+                for keyword in keywords:
+                    before = len(frontier)
+                    if journal and keyword in journal.collected:
+                        # 前回収集済み（--resume）
+                        for url, sort in journal.collected[keyword]:
+                            frontier.add([url], keyword, sort)
+                        print(f"[resume] keyword='{keyword}' restored new={len(frontier) - before}")
+                        progress.keywords_done += 1
+                        continue
+                    search_started = time.monotonic()
+                    if sharded:
+                        result = next(search_results)
+                        if result.error is not None:
+                            raise RuntimeError(f"Search failed for '{keyword}': {result.error}")
+                        for url, sort in result.value["found"]:
+                            frontier.add([url], keyword, sort)
+                        harvester.add(result.value["records"], responses=result.value["responses"])
+                        found = len(result.value["found"])
+                        search_minutes[keyword] = result.value["seconds"] / 60
+                    else:
+                        found = len(collect_article_urls(
+                            search_page,
+                            keyword,
+                            config.results_per_keyword,
+                            config.scroll_timeout_ms,
+                            frontier=frontier,
+                            throttle=throttle,
+                            stagnant_rounds_limit=config.scroll_stagnant_rounds,
+                        ))
+                        search_minutes[keyword] = (time.monotonic() - search_started) / 60
+                        # 人気順・急上昇の2回の遷移（とスクロール）ごとに作り直しを判定
+                        search_page = governor.after_navigation(search_page, open_search_page, count=2)
+                    print(f"[search] keyword='{keyword}' urls={found} new={len(frontier) - before}")
+                    progress.keywords_done += 1
+                    if journal:
+                        journal.record_keyword(keyword, frontier.found_for(keyword))
+                print(f"[frontier] {frontier.summary()}")
+                if collect_pool:
+                    collect_pool.close()
+                    for worker_stats in collect_pool.worker_stats:
+                        METRICS.merge(worker_stats.get("metrics", {}))
+                        governor.merge(worker_stats.get("memory", {}))
+                        throttle.merge(worker_stats.get("throttle", {}))
+                    collect_pool = None
+                if not sharded:
+                    # スクロールで膨らんだ検索ページは記事取得中に残さない
+                    search_page.close()
+
+                urls = frontier.urls()
+                if journal and journal.completed:
+                    done = [u for u in urls if normalize_url(u) in journal.completed]
+                    urls = [u for u in urls if normalize_url(u) not in journal.completed]
+                    stats.resumed = len(done)
+                    print(f"[resume] skip {len(done)} articles already recorded, visit {len(urls)}")
+                urls, skipped, reasons = recrawl.split(urls, [normalize_url(u) for u in urls])
+                if skipped:
+                    stats.skipped += len(skipped)
+                    print(f"[recrawl] skip {len(skipped)} recently scraped {reasons}, visit {len(urls)}")
+                    # スキップした記事も、前回収穫ありなら見つけたキーワードの収穫に数える
+                    known_hits = recrawl.known_hits([normalize_url(u) for u in skipped])
+                    skipped_known = [(frontier.keywords(u), known_hits.get(normalize_url(u), False)) for u in skipped]
+
+                # 並列で取得した結果を投入順に処理
+                article_started = time.monotonic()
+                governor.set_phase("articles")
+                progress.start_articles(len(urls))
+                article_pool = start_article_pool()
+                for result in article_pool.imap(urls):
+                    url = result.item
+                    print(f"[article] {result.index + 1}/{len(urls)} {url}")
+                    progress.articles_done += 1
+                    if result.error is not None:
+                        print(f"[error] Skipping {url}: {result.error}")
+                        stats.error_count += 1
+                        progress.errors += 1
+                        continue
+                    payload = result.value
+                    METRICS.count("articles")
+                    # この記事を見つけたキーワード（とソート順）
+                    payload["keywords"] = frontier.keywords(url)
+                    payload["foundBy"] = frontier.found_by(url)
+                    scraped.append((payload["keywords"], bool(payload["purchased24h"] or payload["highRating"])))
+                    source_stats.add(payload["fieldSources"])
+                    if classifier:
+                        payload["genre"] = classifier.classify_record(payload)
+                        genres.append(payload["genre"])
+                    if store and store.record_article(normalize_url(url), payload, run_id):
+                        stats.local_new_records += 1
+                    if config.dry_run:
+                        print_dry_run(payload)
+                        stats.total_records += 1
+                    else:
+                        sender.add(payload)
+            finally:
+                if collect_pool:
+                    collect_pool.close()
+                if article_pool:
+                    article_pool.close()
+                    # ワーカープロセスの集計（遮断件数・24h判定の所要時間）を合算
+                    for worker_stats in getattr(article_pool, "worker_stats", []):
+                        diet.merge(worker_stats.get("network", {}))
+                        balloon_stats.merge(worker_stats.get("balloon", {}))
+                        METRICS.merge(worker_stats.get("metrics", {}))
+                        if registry:
+                            registry.merge(worker_stats.get("selectors", []))
+                        governor.merge(worker_stats.get("memory", {}))
+                        throttle.merge(worker_stats.get("throttle", {}))
+                governor.set_phase(None)
+                sender.close()
+                article_minutes = (time.monotonic() - article_started) / 60
+
+            if lease:
+                lease.close()
+
+        # 送信失敗が無ければ完了扱い（失敗があれば --resume で未送信分だけ再実行できる）
+        if journal and not stats.error_count:
+            journal.finish()
 
         # 完了通知
         elapsed_minutes = (time.time() - start_time) / 60
+        details = [f"URLフロンティア: {frontier.summary()}"]
+        if stats.resumed:
+            details.append(f"再開: 前回記録済み {stats.resumed}件をスキップ")
+        if isinstance(sender, BackgroundUploader):
+            details.append(f"GAS送信: {sender.summary()}")
+            print(f"[gas] {sender.summary()}")
+        if config.network_diet.enabled:
+            details.append(f"通信節約: {diet.summary()}")
+            print(f"[network] {diet.summary()}")
+        if store:
+            store.finish_run(run_id, stats.total_records, stats.new_records, stats.error_count, elapsed_minutes)
+            details.append(f"ローカルDB: 初回観測 {stats.local_new_records}件")
+            store.record_keyword_stats(run_id, attribute_keyword_stats(scraped, search_minutes, article_minutes, skipped_known))
+        if detector:
+            details.append(f"24h判定: {balloon_stats.summary()}")
+            print(f"[balloon] {balloon_stats.summary()}")
+        if config.harvest_search_api:
+            details.append(f"検索API収集: {harvester.summary()}")
+            print(f"[harvest] {harvester.summary()}")
+        if config.fetch_mode == "hybrid" or config.harvest_search_api:
+            label = "HTTP優先取得" if config.fetch_mode == "hybrid" else "項目の取得元"
+            details.append(f"{label}: {source_stats.summary()}")
+            print(f"[static] {source_stats.summary()}")
+        if throttle.enabled:
+            details.append(f"アクセス頻度: {throttle.summary()}")
+            print(f"[throttle] {throttle.summary()}")
+        if classifier:
+            details.append(f"ジャンル: {summarize_genres(genres)}")
+            print(f"[genre] {summarize_genres(genres)}")
+        if governor.enabled:
+            details.append(f"メモリ: {governor.summary()}")
+            print(f"[memory] {governor.summary()}")
+        if registry:
+            registry.save()
+            print(f"[selectors] {registry.summary()}")
+            for field, selector in registry.never_hit():
+                print(f"[selectors] Never matched: {field} {selector}")
+            dead = registry.dead()
+            for field, selector, since in dead:
+                print(f"[selectors] Stopped matching: {field} {selector} (last hit {since} attempts ago)")
+            if dead:
+                details.append(
+                    "セレクタ停止の疑い: " + ", ".join(f"{field} `{selector}`（{since}回）" for field, selector, since in dead)
+                )
+            shifted = registry.shifted()
+            for field, usual, current in shifted:
+                print(f"[selectors] Winner changed: {field} {usual} -> {current}")
+            if shifted:
+                details.append(
+                    "セレクタ入れ替わり: " + ", ".join(f"{field} `{usual}` → `{current}`" for field, usual, current in shifted)
+                )
+        if METRICS.enabled:
+            METRICS.export(config.metrics, "scrape", run_id)
+            timing = METRICS.summary()
+            details.extend(f"処理時間 {line}" for line in timing)
+            for line in timing:
+                print(f"[metrics] {line}")
         if not config.dry_run:
-            notify_complete(len(keywords), total_records, new_records, error_count, elapsed_minutes)
+            notify_complete(
+                len(keywords),
+                stats.total_records,
+                stats.new_records,
+                stats.error_count,
+                elapsed_minutes,
+                details,
+                skipped=stats.skipped,
+            )
 
     except Exception as e:
         # 重大エラー通知
         if not config.dry_run:
             notify_critical(str(e))
         raise
+    finally:
+        # 完了・重大エラーの通知を送り切ってから終了する
+        SLACK.close()
+        if journal:
+            journal.close()
+        if store:
+            store.close()
 
 
 if __name__ == "__main__":
     import sys
-    config_path = sys.argv[1] if len(sys.argv) > 1 else "config.yaml"
-    run(config_path)
+    # 使い方: python -m src.main [config.yaml] [--resume]
+    args = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    config_path = args[0] if args else "config.yaml"
+    run(config_path, resume="--resume" in sys.argv[1:])
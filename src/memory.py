@@ -0,0 +1,185 @@
+"""長時間実行のメモリ管理（ページ・コンテキストの作り直しとRSSの上限）
+
+同じページで何百回も遷移すると、レンダラーとドライバーのメモリが増え続けて小さなVPSではスワップが始まる。
+MemoryGovernor はページごとの遷移回数と、本プロセス＋子プロセス（ドライバー・ブラウザ）の RSS を見て、
+
+- page_max_navigations 回遷移したページ
+- RSS 合計が max_rss_mb を超えたときのページ（直前の作り直しから MIN_NAVIGATIONS_FOR_MEMORY 回以上遷移したもの）
+
+を閉じて開き直す（renew_context ならコンテキストごと）。フェーズ（検索・記事・トラッカー）ごとのピークRSSも集計する。
+常駐ブラウザ（browser_service）に接続している場合、ブラウザ側のメモリは RSS に含まれない。
+"""
+import os
+import resource
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# メモリ上限による作り直しの最小間隔（遷移回数）。Python側のメモリで上限を超えている場合の作り直し続きを防ぐ
+MIN_NAVIGATIONS_FOR_MEMORY = 10
+
+
+@dataclass
+class MemoryConfig:
+    enabled: bool = False
+    # 1ページで遷移する回数の上限（0で無制限）
+    page_max_navigations: int = 100
+    # 本プロセス＋子プロセスの RSS 合計の上限（MB、0で無制限）
+    max_rss_mb: float = 0
+    # ページだけでなくコンテキストごと作り直す（常駐ブラウザ接続時はページのみ）
+    renew_context: bool = False
+
+
+def load_memory(raw: Dict) -> MemoryConfig:
+    data = raw.get("memory", {}) or {}
+    defaults = MemoryConfig()
+    return MemoryConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        page_max_navigations=int(data.get("page_max_navigations", defaults.page_max_navigations)),
+        max_rss_mb=float(data.get("max_rss_mb", defaults.max_rss_mb)),
+        renew_context=bool(data.get("renew_context", defaults.renew_context)),
+    )
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss_mb() -> float:
+    """本プロセスと全子孫プロセスの RSS 合計（Linux の /proc。それ以外は本プロセスのピーク）"""
+    if not os.path.isdir("/proc/self"):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / (1024 if sys.platform == "darwin" else 1)
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", encoding="utf-8") as f:
+                # "pid (comm) state ppid ..." の comm に空白が入り得るので ")" 以降を読む
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    total_kb = 0
+    stack = [os.getpid()]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        total_kb += _rss_kb(pid)
+    return total_kb / 1024
+
+
+class PeakRss:
+    """バックグラウンドで RSS を定期的に測り、最大値を保持する"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PeakRss":
+        self._thread = threading.Thread(target=self._run, name="peak-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+            self._stop.wait(self.interval)
+
+    def stop(self) -> float:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+        return self.peak_mb
+
+
+class MemoryGovernor:
+    """遷移ごとに呼び出し、必要ならページを作り直す（スレッドセーフ）
+
+    無効時も after_navigation は呼び出してよい（何もしない）。
+    """
+
+    def __init__(self, config: MemoryConfig, measure: Callable[[], float] = process_tree_rss_mb):
+        self.config = config
+        self.enabled = config.enabled
+        self.renew_context = config.renew_context
+        self._measure = measure
+        self._lock = threading.Lock()
+        self._navigations: Dict[int, int] = {}
+        self._phase: Optional[str] = None
+        # フェーズ名 → ピークRSS（MB）
+        self.peaks: Dict[str, float] = {}
+        # 作り直しの理由（navigations / memory）→ 回数
+        self.recycled: Dict[str, int] = {}
+
+    def sample(self) -> float:
+        rss = self._measure()
+        with self._lock:
+            if self._phase:
+                self.peaks[self._phase] = max(self.peaks.get(self._phase, 0.0), rss)
+        return rss
+
+    def set_phase(self, name: Optional[str]) -> None:
+        """以降に測った RSS を name のピークとして集計する（前のフェーズの最後の値も測る）"""
+        if not self.enabled:
+            return
+        self.sample()
+        with self._lock:
+            self._phase = name
+        if name:
+            self.sample()
+
+    def after_navigation(self, page, reopen: Callable[[object], object], count: int = 1):
+        """page で count 回遷移した後に呼び出す。作り直した場合は reopen(page) の新しいページを返す"""
+        if not self.enabled:
+            return page
+        key = id(page)
+        with self._lock:
+            navigations = self._navigations.get(key, 0) + count
+            self._navigations[key] = navigations
+        rss = self.sample()
+
+        reason = None
+        if self.config.page_max_navigations > 0 and navigations >= self.config.page_max_navigations:
+            reason = "navigations"
+        elif self.config.max_rss_mb > 0 and rss >= self.config.max_rss_mb and navigations >= MIN_NAVIGATIONS_FOR_MEMORY:
+            reason = "memory"
+        if reason is None:
+            return page
+
+        with self._lock:
+            self._navigations.pop(key, None)
+            self.recycled[reason] = self.recycled.get(reason, 0) + 1
+        print(f"[memory] Recycling page after {navigations} navigations ({reason}, RSS {rss:.0f}MB)")
+        return reopen(page)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"peaks": dict(self.peaks), "recycled": dict(self.recycled)}
+
+    def merge(self, snapshot: Dict) -> None:
+        """別プロセスのワーカーの snapshot() を合算する（ピークは最大値）"""
+        with self._lock:
+            for name, peak in snapshot.get("peaks", {}).items():
+                self.peaks[name] = max(self.peaks.get(name, 0.0), peak)
+            for reason, count in snapshot.get("recycled", {}).items():
+                self.recycled[reason] = self.recycled.get(reason, 0) + count
+
+    def summary(self) -> str:
+        with self._lock:
+            peaks = ", ".join(f"{name} {peak:.0f}MB" for name, peak in self.peaks.items())
+            total = sum(self.recycled.values())
+            reasons = ", ".join(f"{reason} {count}" for reason, count in sorted(self.recycled.items()))
+        return f"ピークRSS {peaks or '-'} / ページ作り直し {total}回" + (f"（{reasons}）" if reasons else "")
@@ -0,0 +1,219 @@
+"""処理フェーズごとの所要時間メトリクス
+
+検索ページの遷移・スクロール待ち・記事の goto・各抽出・24h判定・GAS送信・意図的な待機などを
+フェーズ名ごとのヒストグラムに集計し、JSONL と Prometheus textfile 形式で書き出す。
+
+    from src.metrics import METRICS
+    with METRICS.timer("article_goto"):
+        page.goto(url)
+
+無効時の timer() は共有の空コンテキストを返すだけなので、計測箇所のオーバーヘッドはほぼ無い。
+ワーカープロセスの値は snapshot() / merge() で親プロセスに集約する。
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# ヒストグラムのバケット上限（ミリ秒）
+BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+    jsonl_path: str = "data/metrics.jsonl"
+    # {job} はジョブ名（scrape / tracker）に置き換える
+    prometheus_path: str = "data/metrics_{job}.prom"
+
+
+def load_metrics(raw: Dict) -> MetricsConfig:
+    data = raw.get("metrics", {}) or {}
+    defaults = MetricsConfig()
+    return MetricsConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        jsonl_path=str(data.get("jsonl_path", defaults.jsonl_path) or ""),
+        prometheus_path=str(data.get("prometheus_path", defaults.prometheus_path) or ""),
+    )
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    """値の ratio 分位（0〜1。最近傍の値を返す。balloon の所要時間の集計でも使う）"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class Metrics:
+    """フェーズ名 → 所要時間（ミリ秒）の一覧とカウンタ（スレッドセーフ）"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+
+    def configure(self, enabled: bool) -> None:
+        self.enabled = enabled
+
+    def timer(self, name: str):
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self, name)
+
+    def observe(self, name: str, elapsed_ms: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples.setdefault(name, []).append(elapsed_ms)
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    # --- 集約 ---
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "samples": {name: list(values) for name, values in self._samples.items()},
+                "counters": dict(self._counters),
+            }
+
+    def merge(self, snapshot: Dict) -> None:
+        with self._lock:
+            for name, values in snapshot.get("samples", {}).items():
+                self._samples.setdefault(name, []).extend(values)
+            for name, value in snapshot.get("counters", {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def phases(self) -> Dict[str, Dict]:
+        """フェーズごとの count / sum / p50 / p95 / max / バケット別件数"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        result = {}
+        for name, values in samples.items():
+            if not values:
+                continue
+            buckets = [0] * (len(BUCKETS_MS) + 1)
+            for value in values:
+                buckets[bisect.bisect_left(BUCKETS_MS, value)] += 1
+            result[name] = {
+                "count": len(values),
+                "sum_ms": sum(values),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "max_ms": max(values),
+                "buckets": buckets,
+            }
+        return result
+
+    # --- 出力 ---
+
+    def summary(self, limit: int = 6) -> List[str]:
+        """合計時間の大きい順に「フェーズ: p50 / p95 (件数, 合計)」"""
+        phases = sorted(self.phases().items(), key=lambda item: -item[1]["sum_ms"])
+        return [
+            f"{name}: p50 {stats['p50_ms']:.0f}ms / p95 {stats['p95_ms']:.0f}ms"
+            f"（{stats['count']}回, 計{stats['sum_ms'] / 60000:.1f}分）"
+            for name, stats in phases[:limit]
+        ]
+
+    def write_jsonl(self, path: str, job: str, run_id: Optional[str] = None) -> None:
+        """フェーズごとに1行追記"""
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        recorded_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with self._lock:
+            counters = dict(self._counters)
+        with open(path, "a", encoding="utf-8") as f:
+            for name, stats in self.phases().items():
+                entry = {"recordedAt": recorded_at, "job": job, "runId": run_id, "phase": name}
+                entry.update(stats)
+                entry["bucketsMs"] = BUCKETS_MS
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if counters:
+                f.write(json.dumps(
+                    {"recordedAt": recorded_at, "job": job, "runId": run_id, "counters": counters},
+                    ensure_ascii=False,
+                ) + "\n")
+
+    def write_prometheus(self, path: str, job: str) -> None:
+        """node_exporter の textfile collector 向け（一時ファイルに書いて置き換え）"""
+        if not path:
+            return
+        path = path.format(job=job)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = [
+            "# HELP note_tracker_phase_seconds Time spent per phase",
+            "# TYPE note_tracker_phase_seconds histogram",
+        ]
+        for name, stats in sorted(self.phases().items()):
+            labels = f'job="{job}",phase="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, stats["buckets"]):
+                cumulative += count
+                lines.append(f'note_tracker_phase_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'note_tracker_phase_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f"note_tracker_phase_seconds_sum{{{labels}}} {stats['sum_ms'] / 1000:.3f}")
+            lines.append(f"note_tracker_phase_seconds_count{{{labels}}} {stats['count']}")
+        with self._lock:
+            counters = sorted(self._counters.items())
+        if counters:
+            lines.append("# TYPE note_tracker_events_total counter")
+            for name, value in counters:
+                lines.append(f'note_tracker_events_total{{job="{job}",event="{name}"}} {value:g}')
+        lines.append("# TYPE note_tracker_last_run_timestamp_seconds gauge")
+        lines.append(f'note_tracker_last_run_timestamp_seconds{{job="{job}"}} {time.time():.0f}')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+    def export(self, config: MetricsConfig, job: str, run_id: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        self.write_jsonl(config.jsonl_path, job, run_id)
+        self.write_prometheus(config.prometheus_path, job)
+
+
+# プロセス全体で共有する計測先
+METRICS = Metrics()
@@ -0,0 +1,120 @@
+"""ネットワーク節約モード（記事・トラッカー巡回時の不要リソース遮断）
+
+DOMと24h購入ポップアップの検知に不要な画像・フォント・動画・
+外部ドメイン（解析タグなど）のリクエストを route で遮断し、
+遮断した件数と推定バイト数を集計する。
+
+- route を設定したページ・コンテキストではブラウザのHTTPキャッシュが無効になる（Playwright の仕様。
+  対象URLを絞っても同じ）。遮断の判定にはリソース種別が要るため全リクエストを route で受ける。
+  そのため常駐ブラウザ（browser_service）でキャッシュを使い回す場合は、スクリプト・スタイルシートを
+  毎回取り直すことになり、遮断で減る分より増えることがある。enabled: auto（初期値）は
+  browser_service が有効なら無効、そうでなければ有効にする
+- 削減バイト数は遮断したリクエストの種類ごとの平均サイズ（ESTIMATED_BYTES）による概算（実測ではない）
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+# 遮断したリクエストの推定サイズ（バイト）。実際には取得しないため平均値で概算する
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+@dataclass
+class NetworkDietConfig:
+    enabled: bool = False
+    allow_resource_types: List[str] = field(
+        default_factory=lambda: ["document", "script", "xhr", "fetch", "stylesheet"]
+    )
+    # サフィックス一致（"note.com" は "assets.note.com" も許可）
+    allow_domains: List[str] = field(default_factory=lambda: ["note.com", "st-note.com"])
+
+
+def load_network_diet(raw: Dict) -> NetworkDietConfig:
+    data = raw.get("network_diet", {}) or {}
+    defaults = NetworkDietConfig()
+    enabled = data.get("enabled", defaults.enabled)
+    if enabled == "auto":
+        # 常駐ブラウザのキャッシュを活かすため、browser_service が有効なら遮断しない
+        enabled = not (raw.get("browser_service", {}) or {}).get("enabled", False)
+    return NetworkDietConfig(
+        enabled=bool(enabled),
+        allow_resource_types=list(data.get("allow_resource_types", defaults.allow_resource_types)),
+        allow_domains=list(data.get("allow_domains", defaults.allow_domains)),
+    )
+
+
+class NetworkDiet:
+    """許可リスト外のリクエストを遮断し、実行単位で遮断数を集計する"""
+
+    def __init__(self, config: NetworkDietConfig):
+        self.config = config
+        self._allow_types = set(config.allow_resource_types)
+        self._allow_domains = [d.lower().lstrip(".") for d in config.allow_domains]
+        self._lock = threading.Lock()
+        self.blocked_requests = 0
+        self.blocked_bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.allowed_requests = 0
+
+    def is_allowed(self, resource_type: str, url: str) -> bool:
+        if resource_type not in self._allow_types:
+            return False
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            # data: / blob: などはブラウザ内で完結する
+            return True
+        return any(host == d or host.endswith("." + d) for d in self._allow_domains)
+
+    def attach(self, target) -> None:
+        """ページまたはコンテキストに遮断ルールを設定（無効時は何もしない）"""
+        if self.config.enabled:
+            target.route("**/*", self._handle)
+
+    def _handle(self, route) -> None:
+        request = route.request
+        resource_type = request.resource_type
+        if self.is_allowed(resource_type, request.url):
+            with self._lock:
+                self.allowed_requests += 1
+            route.continue_()
+            return
+        with self._lock:
+            self.blocked_requests += 1
+            self.blocked_bytes += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        route.abort()
+
+    def counters(self) -> Dict:
+        """別プロセスのワーカーから集計を送るための値"""
+        with self._lock:
+            return {
+                "blocked_requests": self.blocked_requests,
+                "blocked_bytes": self.blocked_bytes,
+                "blocked_by_type": dict(self.blocked_by_type),
+                "allowed_requests": self.allowed_requests,
+            }
+
+    def merge(self, counters: Dict) -> None:
+        """counters() の値を合算する"""
+        with self._lock:
+            self.blocked_requests += counters.get("blocked_requests", 0)
+            self.blocked_bytes += counters.get("blocked_bytes", 0)
+            self.allowed_requests += counters.get("allowed_requests", 0)
+            for resource_type, count in counters.get("blocked_by_type", {}).items():
+                self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + count
+
+    def summary(self) -> str:
+        by_type = ", ".join(f"{k}={v}" for k, v in sorted(self.blocked_by_type.items()))
+        return (
+            f"遮断 {self.blocked_requests}件"
+            f"（削減量は推定 約{self.blocked_bytes / 1_000_000:.1f}MB: 種類ごとの平均サイズによる概算）"
+            + (f" [{by_type}]" if by_type else "")
+        )
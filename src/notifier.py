@@ -1,10 +1,247 @@
-"""Slack通知モジュール"""
+"""Slack通知モジュール
+
+SLACK.configure() の後は notify_* がキューに入れるだけになり、送信は別スレッドで行う
+（Webhookが遅い・落ちていてもスクレイプは止まらない）。
+
+- 続けて届いたメッセージは coalesce_seconds の間まとめて1回で送る
+- 送信の間隔は min_interval_seconds 以上空ける（429 は Retry-After だけ待って1回再送）
+- heartbeat_minutes ごとに進捗（RunProgress.summary）を送る。未送信の古い進捗は新しいもので置き換える
+- 未設定・DRY RUN・configure 前は従来通り呼び出し元で同期送信する
+"""
 import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import requests
 
+EMOJI_MAP = {
+    "info": "ℹ️",
+    "success": "✅",
+    "error": "🚨",
+    "warning": "⚠️",
+    "progress": "⏳",
+}
+
+
+@dataclass
+class NotifierConfig:
+    # 別スレッドで送信する（false で従来通り同期送信）
+    background: bool = False
+    min_interval_seconds: float = 1.0
+    coalesce_seconds: float = 3.0
+    # 進捗の定期通知の間隔（分、0で無効）
+    heartbeat_minutes: float = 0
+    # 終了時に未送信のメッセージを送り切るまで待つ秒数
+    close_timeout_seconds: float = 20
+    queue_size: int = 100
+
+
+def load_notifier(raw: Dict) -> NotifierConfig:
+    data = raw.get("slack", {}) or {}
+    defaults = NotifierConfig()
+    return NotifierConfig(
+        background=bool(data.get("background", defaults.background)),
+        min_interval_seconds=float(data.get("min_interval_seconds", defaults.min_interval_seconds)),
+        coalesce_seconds=float(data.get("coalesce_seconds", defaults.coalesce_seconds)),
+        heartbeat_minutes=float(data.get("heartbeat_minutes", defaults.heartbeat_minutes)),
+        close_timeout_seconds=float(data.get("close_timeout_seconds", defaults.close_timeout_seconds)),
+        queue_size=int(data.get("queue_size", defaults.queue_size)),
+    )
+
+
+def _webhook_url() -> str:
+    return os.getenv("SLACK_WEBHOOK_URL", "").strip()
+
+
+def format_message(message: str, level: str) -> str:
+    return f"{EMOJI_MAP.get(level, '📝')} {message}"
+
+
+def post_slack(webhook_url: str, text: str, session=None) -> Tuple[bool, float]:
+    """Webhookに送信し、(成功したか, 429 の Retry-After 秒) を返す"""
+    try:
+        response = (session or requests).post(webhook_url, json={"text": text}, timeout=10)
+    except Exception as e:
+        print(f"[slack] Failed to send notification: {e}")
+        return False, 0.0
+    if response.status_code == 429:
+        try:
+            return False, float(response.headers.get("Retry-After") or 1)
+        except ValueError:
+            return False, 1.0
+    if response.status_code != 200:
+        print(f"[slack] Failed to send notification: HTTP {response.status_code}")
+    return response.status_code == 200, 0.0
+
+
+_STOP = object()
+
+
+class SlackNotifier:
+    """notify_slack のメッセージを別スレッドで送る（まとめ送り・送信間隔・進捗の定期通知）"""
+
+    def __init__(self):
+        self.config = NotifierConfig(background=False)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat: Optional[Callable[[], Optional[str]]] = None
+        self._last_post_at = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def configure(self, config: NotifierConfig, webhook_url: Optional[str] = None) -> None:
+        """background かつ Webhook が設定されていれば送信スレッドを起動する"""
+        self.close()
+        self.config = config
+        self.webhook_url = _webhook_url() if webhook_url is None else webhook_url
+        if not config.background or not self.webhook_url:
+            return
+        self._queue = queue.Queue(maxsize=max(1, config.queue_size))
+        self._stop = threading.Event()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="slack-notifier", daemon=True)
+        self._thread.start()
+
+    def start_heartbeat(self, progress: Callable[[], Optional[str]]) -> None:
+        """heartbeat_minutes ごとに progress() の文字列を送る（None なら送らない）"""
+        if self.config.heartbeat_minutes > 0:
+            self._heartbeat = progress
+
+    def stop_heartbeat(self) -> None:
+        self._heartbeat = None
+
+    def post(self, message: str, level: str = "info") -> bool:
+        """キューに入れるだけで戻る（満杯なら捨てる）"""
+        try:
+            self._queue.put_nowait(format_message(message, level))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"[slack] Queue is full, dropped: {message.splitlines()[0]}")
+            return False
+
+    def close(self) -> None:
+        """未送信のメッセージを close_timeout_seconds まで送り切ってスレッドを止める"""
+        if self._thread is None:
+            return
+        self._heartbeat = None
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(self.config.close_timeout_seconds)
+        if self._thread.is_alive():
+            print(f"[slack] Gave up on {self._queue.qsize()} pending notifications")
+        self._thread = None
+        self._session.close()
+
+    def _run(self) -> None:
+        interval = self.config.heartbeat_minutes * 60
+        next_beat = time.monotonic() + interval
+        while True:
+            timeout = max(0.0, next_beat - time.monotonic()) if self._heartbeat else 1.0
+            try:
+                item = self._queue.get(timeout=min(timeout, 1.0))
+            except queue.Empty:
+                item = None
+            messages: List[str] = []
+            stopping = item is _STOP
+            if isinstance(item, str):
+                messages.append(item)
+                stopping = self._gather(messages)
+            if self._heartbeat and time.monotonic() >= next_beat:
+                next_beat = time.monotonic() + interval
+                beat = self._progress()
+                if beat:
+                    messages.append(format_message(beat, "progress"))
+            if messages:
+                self._send("\n\n".join(messages))
+            if stopping or (self._stop.is_set() and self._queue.empty()):
+                return
+
+    def _gather(self, messages: List[str]) -> bool:
+        """coalesce_seconds の間に届いたメッセージを messages に追加する（終了の合図なら True）"""
+        deadline = time.monotonic() + (0 if self._stop.is_set() else self.config.coalesce_seconds)
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return False
+            if item is _STOP:
+                # 終了時は残りをまとめて送る
+                while True:
+                    try:
+                        rest = self._queue.get_nowait()
+                    except queue.Empty:
+                        return True
+                    if isinstance(rest, str):
+                        messages.append(rest)
+            messages.append(item)
+
+    def _progress(self) -> Optional[str]:
+        try:
+            return self._heartbeat()
+        except Exception as exc:
+            print(f"[slack] Failed to build progress: {exc}")
+            return None
+
+    def _send(self, text: str) -> None:
+        wait = self._last_post_at + self.config.min_interval_seconds - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        ok, retry_after = post_slack(self.webhook_url, text, self._session)
+        if retry_after and not self._stop.is_set():
+            time.sleep(min(retry_after, 30))
+            ok, _ = post_slack(self.webhook_url, text, self._session)
+        self._last_post_at = time.monotonic()
+        if ok:
+            self.sent += 1
+
+
+SLACK = SlackNotifier()
+
+
+class RunProgress:
+    """進捗の定期通知の内容（スクレイプのループが数を更新し、送信スレッドが読む）"""
+
+    def __init__(self, total_keywords: int):
+        self.total_keywords = total_keywords
+        self.keywords_done = 0
+        self.total_articles: Optional[int] = None
+        self.articles_done = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+        self._articles_started_at: Optional[float] = None
+
+    def start_articles(self, total: int) -> None:
+        self.total_articles = total
+        self._articles_started_at = time.monotonic()
+
+    def summary(self) -> str:
+        elapsed = (time.monotonic() - self.started_at) / 60
+        lines = [f"進捗（開始から {elapsed:.0f}分）", f"• キーワード: {self.keywords_done}/{self.total_keywords}"]
+        if self.total_articles is not None and self._articles_started_at is not None:
+            minutes = (time.monotonic() - self._articles_started_at) / 60
+            done = self.articles_done
+            line = f"• 記事: {done}/{self.total_articles}"
+            if done and minutes > 0:
+                rate = done / minutes
+                line += f"（{rate:.1f}件/分、残り約{(self.total_articles - done) / rate:.0f}分）"
+            lines.append(line)
+            if done:
+                lines.append(f"• エラー率: {self.errors / done:.1%}（{self.errors}件）")
+        return "\n".join(lines)
+
 
 def notify_slack(message: str, level: str = "info") -> bool:
     """
@@ -12,42 +249,38 @@ def notify_slack(message: str, level: str = "info") -> bool:
 
     Args:
         message: 通知メッセージ
-        level: 通知レベル ("info", "success", "error", "warning")
+        level: 通知レベル ("info", "success", "error", "warning", "progress")
 
     Returns:
-        成功した場合True
+        成功した場合True（送信スレッドの起動中はキューに入れた時点でTrue）
     """
-    webhook_url = os.getenv("SLACK_WEBHOOK_URL", "").strip()
-    if not webhook_url:
-        return False
-
-    emoji_map = {
-        "info": "ℹ️",
-        "success": "✅",
-        "error": "🚨",
-        "warning": "⚠️",
-    }
-    emoji = emoji_map.get(level, "📝")
+    if SLACK.running:
+        return SLACK.post(message, level)
 
-    try:
-        response = requests.post(
-            webhook_url,
-            json={"text": f"{emoji} {message}"},
-            timeout=10,
-        )
-        return response.status_code == 200
-    except Exception as e:
-        print(f"[slack] Failed to send notification: {e}")
+    webhook_url = _webhook_url()
+    if not webhook_url:
         return False
+    ok, _ = post_slack(webhook_url, format_message(message, level))
+    return ok
 
 
-def notify_start(keywords_count: int, day_name: str, total_keywords: int, is_manual: bool = False) -> bool:
+def notify_start(
+    keywords_count: int,
+    day_name: str,
+    total_keywords: int,
+    is_manual: bool = False,
+    details: Optional[List[str]] = None,
+) -> bool:
     """スクレイピング開始通知"""
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
     if is_manual:
         message = f"スクレイピング開始（手動実行）\n• 日時: {now}\n• キーワード数: {keywords_count}"
+    elif details:
+        message = f"スクレイピング開始\n• 日時: {now}\n• キーワード: {keywords_count}/{total_keywords}"
     else:
         message = f"スクレイピング開始\n• 日時: {now}\n• {day_name}曜日分: {keywords_count}/{total_keywords} キーワード"
+    for detail in details or []:
+        message += f"\n• {detail}"
     return notify_slack(message, "info")
 
 
@@ -57,6 +290,8 @@ def notify_complete(
     new_records: int,
     errors: int,
     elapsed_minutes: float,
+    details: Optional[List[str]] = None,
+    skipped: int = 0,
 ) -> bool:
     """スクレイピング完了通知"""
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -70,8 +305,12 @@ def notify_complete(
         f"• 新規記録: {new_records}",
         f"• 所要時間: {elapsed_minutes:.1f}分",
     ]
+    if skipped > 0:
+        lines.append(f"• スキップ（最近取得済み）: {skipped}")
     if errors > 0:
         lines.append(f"• エラー数: {errors}")
+    for detail in details or []:
+        lines.append(f"• {detail}")
 
     return notify_slack("\n".join(lines), status)
 
@@ -0,0 +1,213 @@
+"""複数ページで記事を並列処理するワーカープール
+
+- ワーカーごとに専用のブラウザ（スレッド単位のPlaywright）を持つ
+- 全ワーカー共通のレート上限（RateLimiter）でアクセス頻度を制御
+- 結果は投入順に返す
+"""
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from playwright.sync_api import sync_playwright
+
+from src.browser import acquire_browser
+from src.memory import MemoryGovernor
+from src.metrics import METRICS
+from src.network import NetworkDiet
+
+Task = Callable[[Any, Any], Any]
+
+
+class RateLimiter:
+    """全ワーカー共通のリクエストレート上限（1分あたりの回数、0以下で無制限）"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+        wait = start_at - now
+        if wait > 0:
+            METRICS.observe("sleep_rate_limit", wait * 1000)
+            time.sleep(wait)
+
+
+@dataclass
+class PoolResult:
+    index: int
+    item: Any
+    value: Any = None
+    error: Optional[Exception] = None
+
+
+def _pause(ms_range: Optional[Tuple[int, int]]) -> None:
+    if not ms_range:
+        return
+    low, high = ms_range
+    with METRICS.timer("sleep_between"):
+        time.sleep(random.uniform(low / 1000.0, high / 1000.0))
+
+
+class InlinePool:
+    """並列数1用：呼び出し元スレッドの1ページで順番に処理する"""
+
+    def __init__(
+        self,
+        page,
+        task: Task,
+        limiter: Optional[RateLimiter] = None,
+        pause_ms: Optional[Tuple[int, int]] = None,
+        governor: Optional[MemoryGovernor] = None,
+        reopen: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.page = page
+        self.task = task
+        self.limiter = limiter
+        self.pause_ms = pause_ms
+        # 遷移回数・メモリ上限でページを作り直す（reopen(古いページ) -> 新しいページ）
+        self.governor = governor
+        self.reopen = reopen
+
+    def imap(self, items: Iterable[Any]) -> Iterator[PoolResult]:
+        for index, item in enumerate(items):
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                yield PoolResult(index, item, value=self.task(self.page, item))
+            except Exception as exc:
+                yield PoolResult(index, item, error=exc)
+            if self.governor and self.reopen:
+                self.page = self.governor.after_navigation(self.page, self.reopen)
+            _pause(self.pause_ms)
+
+    def close(self) -> None:
+        pass
+
+
+class PagePool:
+    """N個のワーカースレッドがそれぞれ1ブラウザ・1ページで処理する"""
+
+    def __init__(
+        self,
+        size: int,
+        headless: bool,
+        task: Task,
+        limiter: Optional[RateLimiter] = None,
+        pause_ms: Optional[Tuple[int, int]] = None,
+        diet: Optional[NetworkDiet] = None,
+        service=None,
+        governor: Optional[MemoryGovernor] = None,
+    ):
+        self.size = max(1, size)
+        self.headless = headless
+        # 常駐ブラウザの設定（BrowserServiceConfig）。動いていれば各ワーカーが接続する
+        self.service = service
+        self.governor = governor
+        self.task = task
+        self.limiter = limiter
+        self.pause_ms = pause_ms
+        self.diet = diet
+        self._jobs: "queue.Queue[Optional[Tuple[int, Any, queue.Queue]]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._startup_errors: List[Exception] = []
+        self._alive = 0
+        self._alive_lock = threading.Lock()
+
+    def start(self) -> "PagePool":
+        ready = threading.Barrier(self.size + 1)
+        for worker_id in range(self.size):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(worker_id, ready),
+                name=f"page-pool-{worker_id}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        ready.wait()
+        if self._alive == 0:
+            raise RuntimeError(f"No pool worker could start: {self._startup_errors}")
+        if self._startup_errors:
+            print(f"[pool] {len(self._startup_errors)} worker(s) failed to start: {self._startup_errors[0]}")
+        print(f"[pool] {self._alive} workers ready")
+        return self
+
+    def _worker(self, worker_id: int, ready: threading.Barrier) -> None:
+        try:
+            playwright = sync_playwright().start()
+            lease = acquire_browser(playwright, self.headless, self.service)
+            page = lease.new_page(self.diet)
+        except Exception as exc:
+            self._startup_errors.append(exc)
+            ready.wait()
+            return
+
+        with self._alive_lock:
+            self._alive += 1
+        ready.wait()
+
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                index, item, results = job
+                if self.limiter:
+                    self.limiter.acquire()
+                try:
+                    results.put(PoolResult(index, item, value=self.task(page, item)))
+                except Exception as exc:
+                    results.put(PoolResult(index, item, error=exc))
+                    # クラッシュしたページは作り直して次のジョブへ
+                    if page.is_closed():
+                        page = lease.new_page(self.diet)
+                if self.governor:
+                    page = self.governor.after_navigation(
+                        page, lambda old: lease.reopen(old, self.diet, self.governor.renew_context)
+                    )
+                _pause(self.pause_ms)
+        finally:
+            with self._alive_lock:
+                self._alive -= 1
+            try:
+                lease.close()
+            finally:
+                playwright.stop()
+
+    def imap(self, items: Iterable[Any]) -> Iterator[PoolResult]:
+        """全アイテムを投入し、完了したものから投入順に返す"""
+        results: "queue.Queue[PoolResult]" = queue.Queue()
+        count = 0
+        for index, item in enumerate(items):
+            self._jobs.put((index, item, results))
+            count += 1
+
+        pending: Dict[int, PoolResult] = {}
+        next_index = 0
+        while next_index < count:
+            try:
+                result = results.get(timeout=5)
+            except queue.Empty:
+                if self._alive == 0:
+                    raise RuntimeError("All pool workers have stopped")
+                continue
+            pending[result.index] = result
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
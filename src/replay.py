@@ -0,0 +1,258 @@
+"""HARの記録・再生とGAS Web Appのローカル代替（オフラインでの再現・計測用）
+
+- record_context / replay_context: note.com への通信を HAR に記録する／HAR から返すコンテキスト
+  （再生時は HAR に無いリクエストを中断し、外部へは一切アクセスしない）
+- HarFetcher: StaticFetcher の代わりに、HAR に記録された記事HTMLを解析する
+- LocalGas: GAS Web App と同じ action を受け付けるローカルHTTPサーバー
+- CallCounter: Page を包み、Playwright API の呼び出し回数（＝ドライバーとの往復）を数える
+"""
+import base64
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.browser import new_context
+from src.static_fetch import parse_article_html
+from src.urls import normalize_url
+
+# 記録・再生の対象（画像CDNなど st-note.com も含む）
+NOTE_URL_GLOB = "**/*note.com/**"
+
+
+def record_context(browser, har_path: str, diet=None):
+    """note.com への通信を har_path に記録するコンテキスト（context.close() で書き出される）"""
+    directory = os.path.dirname(har_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    context = new_context(browser, diet)
+    context.route_from_har(har_path, url=NOTE_URL_GLOB, update=True, update_content="embed", update_mode="full")
+    return context
+
+
+def replay_context(browser, har_path: str, diet=None):
+    """HAR から応答するコンテキスト（記録に無いリクエストは中断）"""
+    context = new_context(browser, diet)
+    # diet より後に登録した route が先に呼ばれるので、全リクエストが先に HAR を通る
+    context.route_from_har(har_path, not_found="abort")
+    return context
+
+
+def _entry_text(entry: Dict) -> Optional[str]:
+    content = entry.get("response", {}).get("content", {})
+    text = content.get("text")
+    if text is None:
+        return None
+    if content.get("encoding") == "base64":
+        return base64.b64decode(text).decode("utf-8", errors="replace")
+    return text
+
+
+def load_har_documents(har_path: str) -> Dict[str, str]:
+    """HAR から記事ページのHTML（正規化URL → HTML）を取り出す"""
+    with open(har_path, encoding="utf-8") as f:
+        har = json.load(f)
+    documents: Dict[str, str] = {}
+    for entry in har.get("log", {}).get("entries", []):
+        response = entry.get("response", {})
+        if response.get("status") != 200 or "/n/" not in entry.get("request", {}).get("url", ""):
+            continue
+        if "text/html" not in response.get("content", {}).get("mimeType", ""):
+            continue
+        text = _entry_text(entry)
+        if text:
+            documents[normalize_url(entry["request"]["url"])] = text
+    return documents
+
+
+class HarFetcher:
+    """StaticFetcher と同じ fetch(url) を HAR の記事HTMLで返す"""
+
+    def __init__(self, har_path: str):
+        self.documents = load_har_documents(har_path)
+
+    def fetch(self, url: str) -> Dict:
+        html = self.documents.get(normalize_url(url))
+        if html is None:
+            print(f"[replay] Not in HAR: {url}")
+            return {}
+        return parse_article_html(url, html)
+
+
+class LocalGas:
+    """GAS Web App（receiver）のローカル代替
+
+    record / recordBatch / getTrackingList / updateTrackingResults に receiver と同じ形で応答し、
+    受け取った内容を records / tracking_updates に保持する。
+    fail_posts を設定すると、その回数だけ POST に 503 を返す（再送の確認用）。
+    reject_posts は HTTP 200 で success:false を返す（ロック待ちのタイムアウトなど GAS 内の失敗）。
+    fail_after_apply は一括記録を適用した後に success:false を返す（行を書いた後の失敗）。
+    short_results を設定すると一括記録の応答の results をその件数だけ削る（古い receiver・壊れた応答の確認用）。
+    一括記録の batchId は receiver と同じく1回だけ適用し、応答に返す。legacy_receiver を True にすると
+    batchId に対応していない receiver として振る舞う（適用済みのIDも記録し直し、応答に batchId を返さない）。
+    """
+
+    def __init__(self, tracking_urls: Optional[List[str]] = None):
+        self.tracking_urls = list(tracking_urls or [])
+        self.records: List[Dict] = []
+        self.tracking_updates: Dict[str, bool] = {}
+        # URLごとの加算回数（receiver のチェック回数）
+        self.tracking_checks: Dict[str, int] = {}
+        self._tracking_runs: Dict[str, Optional[str]] = {}
+        self.requests = 0
+        self.fail_posts = 0
+        self.reject_posts = 0
+        self.short_results = 0
+        self.fail_after_apply = 0
+        self.legacy_receiver = False
+        self._batches: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/exec"
+
+    def start(self) -> "LocalGas":
+        gas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                self._reply(gas.handle_get(query.get("action", [""])[0]))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with gas._lock:
+                    failing = gas.fail_posts > 0
+                    if failing:
+                        gas.fail_posts -= 1
+                    rejecting = not failing and gas.reject_posts > 0
+                    if rejecting:
+                        gas.reject_posts -= 1
+                if failing:
+                    self._reply({"success": False, "error": "Service unavailable"}, status=503)
+                    return
+                if rejecting:
+                    error = {"success": False, "error": "Lock timeout: another process was holding the lock"}
+                    if isinstance(body, dict) and body.get("batchId") and not gas.legacy_receiver:
+                        error["batchId"] = body["batchId"]
+                    self._reply(error)
+                    return
+                self._reply(gas.handle_post(body))
+
+            def _reply(self, body: Dict, status: int = 200) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, name="local-gas", daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _record(self, data: Dict) -> Dict:
+        url = normalize_url(data.get("url", ""))
+        self.records.append(data)
+        self._counts[url] = self._counts.get(url, 0) + 1
+        count = self._counts[url]
+        return {
+            "success": True,
+            "message": f"更新として記録しました（{count}回目）" if count > 1 else "新規記録しました",
+            "row": len(self.records) + 1,
+            "isUpdate": count > 1,
+            "recordCount": count,
+        }
+
+    def handle_get(self, action: str) -> Dict:
+        with self._lock:
+            self.requests += 1
+            if action == "getTrackingList":
+                urls = [{"row": index + 2, "url": url, "title": ""} for index, url in enumerate(self.tracking_urls)]
+                return {"success": True, "urls": urls, "count": len(urls)}
+        return {"success": False, "error": f"Unsupported action: {action}"}
+
+    def handle_post(self, data: Any) -> Dict:
+        with self._lock:
+            self.requests += 1
+            if isinstance(data, dict) and data.get("action") == "updateTrackingResults":
+                # receiver と同じく、同じ runId の結果は1回だけ数える
+                run_id = data.get("runId")
+                updated = skipped = 0
+                for url, hit in (data.get("results") or {}).items():
+                    if run_id and self._tracking_runs.get(url) == run_id:
+                        skipped += 1
+                        continue
+                    self._tracking_runs[url] = run_id
+                    self.tracking_updates[url] = hit
+                    self.tracking_checks[url] = self.tracking_checks.get(url, 0) + 1
+                    updated += 1
+                return {"success": True, "updated": updated, "completed": 0, "skipped": skipped}
+            if isinstance(data, list) or (isinstance(data, dict) and data.get("action") == "recordBatch"):
+                records = data if isinstance(data, list) else data.get("records", [])
+                batch_id = None if isinstance(data, list) or self.legacy_receiver else data.get("batchId")
+                if batch_id and batch_id in self._batches:
+                    results = [dict(result, duplicate=True) for result in self._batches[batch_id]]
+                else:
+                    results = [self._record(record) for record in records]
+                    if batch_id:
+                        self._batches[batch_id] = results
+                if self.fail_after_apply:
+                    self.fail_after_apply -= 1
+                    error = {"success": False, "error": "Exceeded maximum execution time"}
+                    if batch_id:
+                        error["batchId"] = batch_id
+                    return error
+                if self.short_results:
+                    results = results[: max(0, len(results) - self.short_results)]
+                return {"success": True, "count": len(results), "results": results, "batchId": batch_id}
+            return self._record(data)
+
+
+# ドライバーとの往復を伴わない（クライアント内で完結する）メソッド
+_LOCAL_METHODS = {"on", "once", "remove_listener", "is_closed"}
+
+
+class CallCounter:
+    """Page などを包み、Playwright API の呼び出し回数を数える
+
+    page.locator(...) などが返す Playwright オブジェクトも包むので、その先の呼び出しも数える。
+    """
+
+    def __init__(self, target, counts: Optional[Dict[str, int]] = None):
+        self._target = target
+        self.counts = counts if counts is not None else {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name in _LOCAL_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            result = attr(*args, **kwargs)
+            if type(result).__module__.startswith("playwright."):
+                return CallCounter(result, self.counts)
+            return result
+
+        return call
@@ -0,0 +1,143 @@
+"""収穫量と時間予算にもとづくキーワードスケジューラ
+
+曜日での均等分割（get_keywords_for_today）の代わりに、ローカル記事ストアの
+キーワードごとの実績（かかった分数・収穫件数）から今回のキーワードを選ぶ。
+
+1. 前回から min_revisit_days 日以上空いたキーワード（未実行を含む）を先に入れる（間隔が長い順）
+2. 残りは「収穫件数 / 分」の高い順
+3. 実績の平均所要時間で見積もり、budget_minutes に収まるところまで。
+   1 の期限超過のキーワードも予算に収まらなければ見送る（次回も間隔が長い順で先頭に来る）。
+   1件も入らない場合だけ、予算を超えても先頭の1件は実行する
+
+収穫件数は24h購入確認あり、または高評価ありの記事数。再巡回の間隔内でスキップした記事も、
+ストアの前回の結果が収穫ありなら見つけたキーワードの件数に数える（記事取得の時間は割り振らない）。
+記事が複数キーワードで見つかった場合は時間・件数ともキーワード間で等分する。
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from src.freshness import _parse_time
+from src.store import ArticleStore
+
+
+@dataclass
+class SchedulerConfig:
+    enabled: bool = False
+    # 1回の実行で使う時間（Actionsの120分上限から余裕を引いた値）
+    budget_minutes: float = 100
+    # どのキーワードも最低この日数ごとには実行する
+    min_revisit_days: float = 7
+    # 実績が無いキーワードの見積もり所要時間
+    default_keyword_minutes: float = 5
+    # 見積もり・収穫率に使う直近の実行回数
+    history_runs: int = 5
+
+
+def load_scheduler(raw: Dict) -> SchedulerConfig:
+    data = raw.get("scheduler", {}) or {}
+    defaults = SchedulerConfig()
+    return SchedulerConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        budget_minutes=float(data.get("budget_minutes", defaults.budget_minutes)),
+        min_revisit_days=float(data.get("min_revisit_days", defaults.min_revisit_days)),
+        default_keyword_minutes=float(data.get("default_keyword_minutes", defaults.default_keyword_minutes)),
+        history_runs=int(data.get("history_runs", defaults.history_runs)),
+    )
+
+
+@dataclass
+class KeywordPlan:
+    keyword: str
+    estimated_minutes: float
+    yield_per_minute: Optional[float]
+    days_since: Optional[float]
+    # due: 再訪間隔を超過（未実行含む） / yield: 収穫率順 / budget: 予算超過で見送り
+    reason: str
+
+    def explain(self) -> str:
+        rate = f"{self.yield_per_minute:.2f}件/分" if self.yield_per_minute is not None else "実績なし"
+        if self.reason == "due":
+            since = f"前回から{self.days_since:.0f}日" if self.days_since is not None else "未実行"
+            return f"{self.keyword}: 期限超過（{since}, {rate}, 見積{self.estimated_minutes:.0f}分）"
+        return f"{self.keyword}: 収穫率 {rate}（見積{self.estimated_minutes:.0f}分）"
+
+
+class KeywordScheduler:
+    def __init__(self, config: SchedulerConfig, store: Optional[ArticleStore]):
+        self.config = config
+        self.store = store
+        self.enabled = config.enabled and store is not None
+
+    def plan(self, keywords: List[str], now: Optional[datetime] = None) -> Tuple[List[KeywordPlan], List[KeywordPlan]]:
+        """(今回実行するキーワード, 予算外で見送るキーワード) を返す"""
+        now = now or datetime.now(timezone.utc)
+        history = self.store.keyword_history(keywords, self.config.history_runs)
+
+        due: List[KeywordPlan] = []
+        ranked: List[KeywordPlan] = []
+        for keyword in keywords:
+            entry = history.get(keyword)
+            if not entry or not entry["runs"]:
+                due.append(KeywordPlan(keyword, self.config.default_keyword_minutes, None, None, "due"))
+                continue
+            estimated = entry["minutes"] / entry["runs"] or self.config.default_keyword_minutes
+            rate = entry["hits"] / entry["minutes"] if entry["minutes"] > 0 else 0.0
+            last_run = _parse_time(entry["last_run_at"])
+            days_since = (now - last_run).total_seconds() / 86400 if last_run else None
+            if days_since is None or days_since >= self.config.min_revisit_days:
+                due.append(KeywordPlan(keyword, estimated, rate, days_since, "due"))
+            else:
+                ranked.append(KeywordPlan(keyword, estimated, rate, days_since, "yield"))
+
+        # 必須は間隔が長い順（未実行が先頭）、残りは収穫率の高い順
+        due.sort(key=lambda plan: -(plan.days_since if plan.days_since is not None else float("inf")))
+        ranked.sort(key=lambda plan: -(plan.yield_per_minute or 0.0))
+
+        selected: List[KeywordPlan] = []
+        deferred: List[KeywordPlan] = []
+        used = 0.0
+        for plan in due + ranked:
+            if used + plan.estimated_minutes <= self.config.budget_minutes or not selected:
+                selected.append(plan)
+                used += plan.estimated_minutes
+            else:
+                plan.reason = "budget"
+                deferred.append(plan)
+        return selected, deferred
+
+    def summary(self, selected: List[KeywordPlan], deferred: List[KeywordPlan]) -> str:
+        used = sum(plan.estimated_minutes for plan in selected)
+        due = sum(1 for plan in selected if plan.reason == "due")
+        return (
+            f"予算 {self.config.budget_minutes:.0f}分 / 見積 {used:.0f}分 / "
+            f"{len(selected)}/{len(selected) + len(deferred)} キーワード（期限超過 {due}・収穫率順 {len(selected) - due}）"
+        )
+
+
+def attribute_keyword_stats(
+    articles: List[Tuple[List[str], bool]],
+    search_minutes: Dict[str, float],
+    article_minutes: float,
+    skipped: Optional[List[Tuple[List[str], bool]]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """実行結果をキーワードごとの (分, 記事数, 収穫件数) に振り分ける
+
+    articles は記事ごとの (見つけたキーワード, 収穫ありか)。
+    記事取得にかかった時間は記事数で等分し、各記事の分・件数はキーワード間で等分する。
+    skipped は再巡回の間隔内でスキップした記事の (見つけたキーワード, 前回収穫ありか)。件数だけ数える
+    """
+    result = {keyword: {"minutes": minutes, "articles": 0.0, "hits": 0.0} for keyword, minutes in search_minutes.items()}
+    per_article = article_minutes / len(articles) if articles else 0.0
+    visited = [(keywords, hit, per_article) for keywords, hit in articles]
+    for keywords, hit, minutes in visited + [(keywords, hit, 0.0) for keywords, hit in skipped or []]:
+        if not keywords:
+            continue
+        share = 1.0 / len(keywords)
+        for keyword in keywords:
+            entry = result.setdefault(keyword, {"minutes": 0.0, "articles": 0.0, "hits": 0.0})
+            entry["minutes"] += minutes * share
+            entry["articles"] += share
+            if hit:
+                entry["hits"] += share
+    return result
@@ -0,0 +1,146 @@
+"""検索APIレスポンスからの記事メタデータ収集
+
+検索ページはスクロールのたびに検索API（/api/v3/searches など）からJSONを取得して描画する。
+そのレスポンスを横取りし、タイトル・著者・価格・スキ数・公開日時などを
+正規化URLをキーにした部分レコードとして保持する。
+scrape_article はここで分かっている項目の抽出を省略できる。
+"""
+import re
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.urls import normalize_url
+
+SEARCH_API_RE = re.compile(r"^https://note\.com/api/v\d+/search")
+NOTE_URL_RE = re.compile(r"^https://note\.com/[^/]+/n/[^/?#]+")
+
+
+def _iter_dicts(data) -> Iterator[Dict]:
+    """JSON全体から dict を深さ優先で列挙（レスポンス構造の変化に備えて位置に依存しない）"""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+
+
+def _note_url(item: Dict) -> str:
+    url = item.get("note_url") or item.get("noteUrl") or ""
+    if not url:
+        user = item.get("user") or {}
+        key = item.get("key") or ""
+        urlname = user.get("urlname") if isinstance(user, dict) else ""
+        if key and urlname:
+            url = f"https://note.com/{urlname}/n/{key}"
+    return normalize_url(url) if NOTE_URL_RE.match(url or "") else ""
+
+
+def _int(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.replace(",", "").isdigit():
+        return int(value.replace(",", ""))
+    return None
+
+
+def note_to_record(item: Dict) -> Optional[Tuple[str, Dict]]:
+    """検索APIの記事オブジェクトを (正規化URL, 部分レコード) に変換
+
+    部分レコードのキーは extract_fields と同じ。値が無い項目はキー自体を含めない。
+    """
+    url = _note_url(item)
+    if not url or not (item.get("name") or item.get("title")):
+        return None
+
+    record: Dict = {"title": (item.get("name") or item.get("title")).strip()}
+    user = item.get("user") if isinstance(item.get("user"), dict) else {}
+    author = user.get("nickname") or user.get("name") or ""
+    if author:
+        record["author"] = author
+    urlname = user.get("urlname") or url.split("/")[3]
+    record["authorUrl"] = f"https://note.com/{urlname}"
+
+    price = _int(item.get("price"))
+    if price is not None:
+        record["price"] = price
+    likes = _int(item.get("like_count", item.get("likeCount")))
+    if likes is not None:
+        record["likes"] = likes
+    created_at = item.get("publish_at") or item.get("publishAt") or ""
+    if created_at:
+        record["createdAt"] = created_at
+
+    tags = []
+    for entry in item.get("hashtags") or []:
+        name = ""
+        if isinstance(entry, dict):
+            hashtag = entry.get("hashtag")
+            name = hashtag.get("name", "") if isinstance(hashtag, dict) else entry.get("name", "")
+        elif isinstance(entry, str):
+            name = entry
+        name = name.strip().lstrip("#")
+        if name and name not in tags:
+            tags.append(name)
+    if tags:
+        record["tags"] = ",".join(tags)
+
+    return url, record
+
+
+def parse_search_response(data) -> Dict[str, Dict]:
+    """検索APIのJSONから記事ごとの部分レコードを取り出す"""
+    records: Dict[str, Dict] = {}
+    for item in _iter_dicts(data):
+        converted = note_to_record(item)
+        if converted:
+            url, record = converted
+            records.setdefault(url, {}).update(record)
+    return records
+
+
+class SearchHarvester:
+    """検索ページのレスポンスを監視し、記事の部分レコードを蓄積する"""
+
+    def __init__(self):
+        self.records: Dict[str, Dict] = {}
+        self.responses = 0
+        self._lock = threading.Lock()
+
+    def attach(self, page) -> None:
+        page.on("response", self._on_response)
+
+    def _on_response(self, response) -> None:
+        if not SEARCH_API_RE.match(response.url):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            records = parse_search_response(response.json())
+        except Exception as exc:
+            print(f"[harvest] Failed to parse {response.url}: {exc}")
+            return
+        self.add(records)
+
+    def add(self, records: Dict[str, Dict], responses: int = 1) -> None:
+        with self._lock:
+            self.responses += responses
+            for url, record in records.items():
+                self.records.setdefault(url, {}).update(record)
+
+    def take(self) -> Dict[str, Dict]:
+        """蓄積したレコードを返して空にする（別プロセスのワーカーから送る用）"""
+        with self._lock:
+            records, self.records = self.records, {}
+            return records
+
+    def get(self, url: str) -> Dict:
+        with self._lock:
+            return dict(self.records.get(normalize_url(url), {}))
+
+    def summary(self) -> str:
+        return f"レスポンス {self.responses}件 / 記事 {len(self.records)}件"
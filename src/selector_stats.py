@@ -0,0 +1,193 @@
+"""抽出セレクタの的中率の集計と並べ替え
+
+extract_fields の候補リスト（ADAPTIVE_FIELDS）ごとに、どのセレクタが値を返したかを集計して
+JSONに保存し、次の実行では直近で値を返しているセレクタから試す。
+
+- score: 候補リストを試すたびに decay 倍し、値を返したセレクタに1を足す（直近ほど重い的中率）
+- 並び順は score の高い順（同点は元の順序）。実績が無ければ元の順序のまま。
+  広く当たるフォールバック（FALLBACK_SELECTORS）は元の位置に固定し、その間の具体的なセレクタ同士だけを
+  入れ替える（フォールバックが先頭に来て、具体的なセレクタと違う値を返し続けるのを防ぐ）
+- 以前は値を返していたのに、最後に値を返してから dead_after 回試しても値を返していないセレクタを
+  「止まった」として報告する（noteのマークアップ変更の早期検知）。先に別のセレクタが値を返して
+  試されなかった回は数えない。高評価・タグのように記事によって
+  元々無い項目で誤検知しないよう、過去の的中率から見て DEAD_EXPECTED_HITS 回以上は当たっているはずの場合に限る
+- 後ろの候補が先頭に来ると元のセレクタは試されなくなるため、累計で最も値を返してきたセレクタと
+  直近の先頭（score 最大）が入れ替わったことも「入れ替わり」として報告する
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.extractor import ADAPTIVE_FIELDS, FALLBACK_SELECTORS, SELECTORS
+
+DECAY = 0.98
+# 「止まった」とみなすのに必要な、最後の的中以降の期待的中回数
+DEAD_EXPECTED_HITS = 5
+
+
+class SelectorRegistry:
+    def __init__(self, path: str = "", dead_after: int = 200, decay: float = DECAY, keep_recorded: bool = False):
+        self.path = path
+        self.dead_after = dead_after
+        self.decay = decay
+        self.keep_recorded = keep_recorded
+        self._lock = threading.Lock()
+        # field -> {"attempts": 試行回数, "misses": 全候補外れ, "selectors": {selector -> 集計}}
+        self.fields: Dict[str, Dict] = {}
+        # 別プロセスのワーカーで記録した結果と、そのとき試した順序（親プロセスで record し直す）
+        self._recorded: List[Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]] = []
+
+    def load(self) -> "SelectorRegistry":
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.fields = json.load(f).get("fields", {})
+            except (OSError, ValueError) as exc:
+                print(f"[selectors] Ignoring unreadable stats {self.path}: {exc}")
+        return self
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {"updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "fields": self.fields}
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def _order(self, field: str) -> List[str]:
+        defaults = SELECTORS[field]
+        stats = self.fields.get(field, {}).get("selectors", {})
+        if not stats:
+            return list(defaults)
+        pinned = FALLBACK_SELECTORS.get(field, [])
+
+        def by_score(segment: List[str]) -> List[str]:
+            return sorted(
+                segment,
+                key=lambda selector: (-stats.get(selector, {}).get("score", 0.0), defaults.index(selector)),
+            )
+
+        # フォールバックで区切った区間ごとに並べ替える（フォールバック自体は動かさない）
+        order: List[str] = []
+        segment: List[str] = []
+        for selector in defaults:
+            if selector in pinned:
+                order += by_score(segment) + [selector]
+                segment = []
+            else:
+                segment.append(selector)
+        return order + by_score(segment)
+
+    def ordered(self) -> Dict:
+        """SELECTORS と同じ形で、候補リストを score の高い順に並べたもの"""
+        ordered = dict(SELECTORS)
+        with self._lock:
+            for field in ADAPTIVE_FIELDS:
+                ordered[field] = self._order(field)
+        return ordered
+
+    def record(self, hits: Dict[str, Optional[str]], orders: Optional[Dict] = None) -> None:
+        """1記事分の結果（field -> 値を返したセレクタ or None。試していない候補リストはキー無し）
+
+        orders は抽出に使った ordered()（省略時は現在の順序で試したものとみなす）
+        """
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with self._lock:
+            if self.keep_recorded:
+                used = orders or {field: self._order(field) for field in hits if field in ADAPTIVE_FIELDS}
+                self._recorded.append((hits, {field: list(used[field]) for field in hits if field in used}))
+            for field, winner in hits.items():
+                if field not in ADAPTIVE_FIELDS:
+                    continue
+                # 値を返したセレクタより前（全て外れなら全部）が実際に試されたセレクタ
+                order = list(orders[field]) if orders and field in orders else self._order(field)
+                tried = order[: order.index(winner) + 1] if winner in order else order
+                entry = self.fields.setdefault(field, {"attempts": 0, "misses": 0, "selectors": {}})
+                entry["attempts"] += 1
+                if winner is None:
+                    entry["misses"] += 1
+                selectors = entry["selectors"]
+                for selector in order:
+                    stats = selectors.setdefault(selector, {"hits": 0, "tries": 0, "score": 0.0, "lastHitTry": 0, "lastHitAt": None})
+                    stats["score"] = stats["score"] * self.decay
+                    if selector not in tried:
+                        continue
+                    stats["tries"] += 1
+                    if selector == winner:
+                        stats["score"] += 1
+                        stats["hits"] += 1
+                        stats["lastHitTry"] = stats["tries"]
+                        stats["lastHitAt"] = now
+
+    def take_recorded(self) -> List[Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]]:
+        with self._lock:
+            recorded, self._recorded = self._recorded, []
+        return recorded
+
+    def merge(self, recorded: List[Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]]) -> None:
+        """別プロセスのワーカーの take_recorded() を取り込む（試した回数はワーカーが使った順序で数える）"""
+        for hits, orders in recorded:
+            self.record(hits, orders)
+
+    def dead(self) -> List[Tuple[str, str, int]]:
+        """値を返さなくなったセレクタ（field, selector, 最後に値を返してから試した回数）"""
+        result = []
+        with self._lock:
+            for field, entry in self.fields.items():
+                stats_by_selector = entry.get("selectors", {})
+                # 定義から削除済みのセレクタは対象外
+                for selector in SELECTORS.get(field, []):
+                    stats = stats_by_selector.get(selector)
+                    if not stats:
+                        continue
+                    if not stats["hits"]:
+                        continue
+                    since = stats["tries"] - stats["lastHitTry"]
+                    expected = stats["hits"] / stats["lastHitTry"] * since
+                    if since >= self.dead_after and expected >= DEAD_EXPECTED_HITS:
+                        result.append((field, selector, since))
+        return result
+
+    def shifted(self) -> List[Tuple[str, str, str]]:
+        """累計の最多的中と直近の先頭が入れ替わった候補リスト（field, 累計の最多, 直近の先頭）"""
+        result = []
+        with self._lock:
+            for field, entry in self.fields.items():
+                stats = {s: v for s, v in entry.get("selectors", {}).items() if s in SELECTORS.get(field, [])}
+                if not stats:
+                    continue
+                usual = max(stats, key=lambda selector: stats[selector]["hits"])
+                current = max(stats, key=lambda selector: stats[selector]["score"])
+                if usual != current and stats[usual]["hits"] >= self.dead_after and stats[current]["hits"]:
+                    result.append((field, usual, current))
+        return result
+
+    def never_hit(self) -> List[Tuple[str, str]]:
+        """dead_after 回以上試して一度も値を返していないセレクタ"""
+        with self._lock:
+            result = []
+            for field, entry in self.fields.items():
+                for selector in SELECTORS.get(field, []):
+                    stats = entry.get("selectors", {}).get(selector)
+                    if stats and not stats["hits"] and stats["tries"] >= self.dead_after:
+                        result.append((field, selector))
+            return result
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = []
+            for field in ADAPTIVE_FIELDS:
+                entry = self.fields.get(field)
+                if not entry or not entry["attempts"]:
+                    continue
+                best = max(entry["selectors"].items(), key=lambda item: item[1]["score"], default=None)
+                rate = 1 - entry["misses"] / entry["attempts"]
+                parts.append(f"{field} {rate:.0%}" + (f" [{best[0]}]" if best and best[1]["hits"] else ""))
+        return ", ".join(parts) if parts else "集計なし"
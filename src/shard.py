@@ -0,0 +1,344 @@
+"""複数プロセスでの分割実行（1プロセス1ブラウザ）
+
+PagePool と同じ imap インターフェースで、キーワードの検索（collect）または
+記事の取得（scrape）を N 個のワーカープロセスに分配する。
+GAS送信・ローカルストア・ジャーナル・完了通知は呼び出し元（コーディネーター）だけが行う。
+
+- collect: キーワード → {"found": [(URL, ソート順)], "records": 検索APIの部分レコード, "seconds": 所要秒数}
+- scrape: URL → scrape_article の payload
+"""
+import multiprocessing
+import queue
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.pool import PoolResult, RateLimiter, _pause
+
+
+def _build_task(kind: str, config, lease, state: Dict) -> Callable[[Any, Any], Any]:
+    """ワーカープロセス内で (page, item) -> 結果 のタスクを組み立てる
+
+    作成したページ・集計オブジェクトと、ページを作り直す関数（reopen）は state に入れて返す
+    """
+    # src.main は src.shard を読み込むため、ワーカー側で遅延インポートする
+    from src.balloon import BalloonStats
+    from src.frontier import UrlFrontier
+    from src.main import collect_article_urls, make_balloon_detector, scrape_article
+    from src.network import NetworkDiet
+    from src.search_harvest import SearchHarvester
+    from src.selector_stats import SelectorRegistry
+    from src.static_fetch import StaticFetcher
+
+    if kind == "collect":
+        harvester = SearchHarvester()
+
+        def open_search_page(old=None):
+            page = lease.reopen(old, renew_context=config.memory.renew_context) if old else lease.new_page()
+            if config.harvest_search_api:
+                harvester.attach(page)
+            return page
+
+        state["page"] = open_search_page()
+        state["reopen"] = open_search_page
+        throttle = state["throttle"]
+
+        def collect_task(page, keyword: str) -> Dict:
+            frontier = UrlFrontier()
+            responses = harvester.responses
+            started = time.monotonic()
+            collect_article_urls(
+                page,
+                keyword,
+                config.results_per_keyword,
+                config.scroll_timeout_ms,
+                frontier=frontier,
+                throttle=throttle,
+                stagnant_rounds_limit=config.scroll_stagnant_rounds,
+            )
+            return {
+                "found": frontier.found_for(keyword),
+                "records": harvester.take(),
+                "responses": harvester.responses - responses,
+                "seconds": time.monotonic() - started,
+            }
+
+        return collect_task
+
+    diet = NetworkDiet(config.network_diet)
+    balloon_stats = BalloonStats()
+    state["diet"], state["balloon"] = diet, balloon_stats
+    state["page"] = lease.new_page(diet)
+    state["reopen"] = lambda old: lease.reopen(old, diet, config.memory.renew_context)
+    throttle = state["throttle"]
+    fetcher = None
+    if config.fetch_mode == "hybrid":
+        fetcher = StaticFetcher(pool_size=1, throttle=throttle if throttle.enabled else None)
+    detector = make_balloon_detector(config, balloon_stats)
+    # 並び順は保存済みの集計から。記録した結果は親プロセスで集計・保存する
+    registry = None
+    if config.selector_stats_path:
+        registry = SelectorRegistry(config.selector_stats_path, config.selector_dead_after, keep_recorded=True).load()
+        state["selectors"] = registry
+
+    def scrape_task(page, item) -> Dict:
+        url, known = item
+        return scrape_article(
+            page,
+            url,
+            config.article_wait_ms,
+            config.max_retries,
+            fetcher,
+            known=known,
+            detector=detector,
+            registry=registry,
+            throttle=throttle,
+        )
+
+    return scrape_task
+
+
+def _worker(worker_id: int, size: int, config_path: str, kind: str, jobs, results) -> None:
+    from playwright.sync_api import sync_playwright
+
+    from src.browser import acquire_browser
+    from src.main import load_config
+    from src.memory import MemoryGovernor
+    from src.metrics import METRICS
+    from src.throttle import AdaptiveThrottle
+
+    config = load_config(config_path)
+    METRICS.configure(config.metrics.enabled)
+    # アクセス頻度の調整はプロセスごと（範囲・上限はプロセス数で等分）
+    throttle = AdaptiveThrottle(config.throttle, config.max_articles_per_minute, share=size)
+    state: Dict = {"throttle": throttle}
+    playwright = lease = None
+    try:
+        playwright = sync_playwright().start()
+        lease = acquire_browser(playwright, config.headless, config.browser_service)
+        task = _build_task(kind, config, lease, state)
+    except Exception as exc:
+        results.put(("failed", worker_id, repr(exc)))
+        # 起動できなかったプロセスでもドライバー・ブラウザを残さない
+        try:
+            if lease:
+                lease.close()
+        finally:
+            if playwright:
+                playwright.stop()
+        return
+    results.put(("ready", worker_id, None))
+
+    # 遷移回数・メモリ上限でのページの作り直し（このプロセスのピークRSSを親に送る）
+    governor = MemoryGovernor(config.memory)
+    governor.set_phase("search" if kind == "collect" else "articles")
+
+    # アクセス上限はプロセス数で等分（全体で max_articles_per_minute）
+    # throttle 有効時は記事の固定の待機の代わりに使う（検索は collect_article_urls 内で調整する）
+    if throttle.enabled:
+        limiter = throttle if kind == "scrape" else RateLimiter(0)
+        pause_ms = None
+    else:
+        limiter = RateLimiter(config.max_articles_per_minute / size if kind == "scrape" else 0)
+        pause_ms = config.between_articles_ms if kind == "scrape" else None
+    page = state["page"]
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            index, item = job
+            limiter.acquire()
+            try:
+                results.put(("result", worker_id, index, task(page, item), None))
+            except Exception as exc:
+                results.put(("result", worker_id, index, None, str(exc)))
+                # クラッシュしたページは作り直して次のジョブへ（検索ページも同じ）
+                if page.is_closed():
+                    page = state["reopen"](page)
+            page = governor.after_navigation(page, state["reopen"], count=2 if kind == "collect" else 1)
+            _pause(pause_ms)
+    finally:
+        worker_stats = {}
+        if "diet" in state:
+            worker_stats["network"] = state["diet"].counters()
+        if "balloon" in state:
+            worker_stats["balloon"] = state["balloon"].elapsed
+        if "selectors" in state:
+            worker_stats["selectors"] = state["selectors"].take_recorded()
+        if METRICS.enabled:
+            worker_stats["metrics"] = METRICS.snapshot()
+        if governor.enabled:
+            governor.set_phase(None)
+            worker_stats["memory"] = governor.snapshot()
+        if throttle.enabled:
+            worker_stats["throttle"] = {"worker": worker_id, **throttle.snapshot()}
+        results.put(("stats", worker_id, worker_stats))
+        try:
+            lease.close()
+        finally:
+            playwright.stop()
+
+
+class ProcessPool:
+    """N個のワーカープロセスがそれぞれ1ブラウザで処理する（PagePool と同じ imap）
+
+    ジョブはワーカーごとのキューに親が振り分ける（1ワーカーあたり prefetch 件まで）。
+    どのジョブをどのワーカーに渡したか親が把握しているため、ワーカーが落ちたらそのジョブを失敗扱いにできる。
+    """
+
+    def __init__(
+        self,
+        size: int,
+        config_path: str,
+        kind: str,
+        prepare: Optional[Callable[[Any], Any]] = None,
+        startup_timeout: float = 180,
+        prefetch: int = 2,
+    ):
+        self.size = max(1, size)
+        self.config_path = config_path
+        self.kind = kind
+        # アイテムをワーカーへ送る形に変換（例: URL → (URL, 既知の項目)）
+        self.prepare = prepare
+        self.startup_timeout = startup_timeout
+        # ワーカーごとに渡しておくジョブ数（処理中の1件＋次の分。落ちたワーカーの分はすべて失敗扱い）
+        self.prefetch = max(1, prefetch)
+        context = multiprocessing.get_context("spawn")
+        self._jobs = [context.Queue() for _ in range(self.size)]
+        self._results = context.Queue()
+        self._processes: List[multiprocessing.Process] = []
+        self._context = context
+        self._ready: set = set()
+        # 起動できなかったワーカーと、途中で止まったワーカー
+        self._failed: set = set()
+        self._dead: set = set()
+        self.worker_stats: List[Dict] = []
+
+    def start(self) -> "ProcessPool":
+        for worker_id in range(self.size):
+            process = self._context.Process(
+                target=_worker,
+                args=(worker_id, self.size, self.config_path, self.kind, self._jobs[worker_id], self._results),
+                name=f"{self.kind}-shard-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        errors = []
+        deadline = time.monotonic() + self.startup_timeout
+        while len(self._ready) + len(errors) < self.size and time.monotonic() < deadline:
+            try:
+                kind, worker_id, error = self._results.get(timeout=5)
+            except queue.Empty:
+                continue
+            if kind == "ready":
+                self._ready.add(worker_id)
+            elif kind == "failed":
+                errors.append(error)
+                self._failed.add(worker_id)
+        if not self._ready:
+            raise RuntimeError(f"No shard worker could start: {errors}")
+        if errors:
+            print(f"[shard] {len(errors)} {self.kind} worker(s) failed to start: {errors[0]}")
+        print(f"[shard] {len(self._ready)} {self.kind} workers ready")
+        return self
+
+    def _alive(self) -> int:
+        return sum(1 for process in self._processes if process.is_alive())
+
+    def _newly_dead(self) -> List[int]:
+        """前回の確認以降に終了したワーカーの番号（close() 前に終了するのは異常終了）"""
+        dead = [
+            worker_id
+            for worker_id, process in enumerate(self._processes)
+            if worker_id not in self._dead and worker_id not in self._failed and not process.is_alive()
+        ]
+        self._dead.update(dead)
+        return dead
+
+    def imap(self, items: Iterable[Any]) -> Iterator[PoolResult]:
+        """全アイテムを振り分け、完了したものから投入順に返す"""
+        items = list(items)
+        next_job = 0
+        # ワーカー番号 -> 渡したが結果の届いていないジョブ番号
+        assigned: Dict[int, List[int]] = {}
+
+        def dispatch() -> None:
+            nonlocal next_job
+            for worker_id in sorted(self._ready - self._dead):
+                jobs = assigned.setdefault(worker_id, [])
+                while len(jobs) < self.prefetch and next_job < len(items):
+                    item = items[next_job]
+                    self._jobs[worker_id].put((next_job, self.prepare(item) if self.prepare else item))
+                    jobs.append(next_job)
+                    next_job += 1
+
+        pending: Dict[int, PoolResult] = {}
+        next_index = 0
+        next_check = time.monotonic() + 5
+        stopping: List[int] = []
+        dispatch()
+        while next_index < len(items):
+            try:
+                message = self._results.get(timeout=5)
+            except queue.Empty:
+                message = None
+            if message is None or time.monotonic() >= next_check:
+                next_check = time.monotonic() + 5
+                # OOM・Chromium のクラッシュでプロセスごと落ちたワーカーに渡したジョブは結果が届かないため失敗扱いにする。
+                # 終了直前に送ったメッセージを先に読み切るよう、失敗扱いは終了に気付いた次の確認で行う
+                stopped, stopping = stopping, self._newly_dead()
+                for worker_id in stopped:
+                    exitcode = self._processes[worker_id].exitcode
+                    print(f"[shard] {self.kind} worker {worker_id} stopped (exit code {exitcode})")
+                    for index in assigned.pop(worker_id, []):
+                        pending[index] = PoolResult(
+                            index,
+                            items[index],
+                            error=RuntimeError(f"Shard worker {worker_id} stopped (exit code {exitcode})"),
+                        )
+                if message is None and not stopping and self._alive() == 0 and next_index not in pending:
+                    raise RuntimeError("All shard workers have stopped")
+            if message is not None:
+                if message[0] == "stats":
+                    self.worker_stats.append(message[2])
+                    continue
+                if message[0] == "ready":
+                    # 起動待ちの後から準備できたワーカーにも振り分ける
+                    self._ready.add(message[1])
+                elif message[0] == "failed":
+                    self._failed.add(message[1])
+                elif message[0] == "result":
+                    _, worker_id, index, value, error = message
+                    if index in assigned.get(worker_id, []):
+                        assigned[worker_id].remove(index)
+                    pending[index] = PoolResult(
+                        index,
+                        items[index],
+                        value=value,
+                        error=RuntimeError(error) if error is not None else None,
+                    )
+            dispatch()
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+    def close(self) -> None:
+        for jobs in self._jobs:
+            jobs.put(None)
+        # 各ワーカーの集計（遮断件数・24h判定の所要時間）を受け取る
+        deadline = time.monotonic() + 30
+        while len(self.worker_stats) < len(self._ready - self._dead) and time.monotonic() < deadline:
+            try:
+                message = self._results.get(timeout=1)
+            except queue.Empty:
+                if self._alive() == 0:
+                    break
+                continue
+            if message[0] == "stats":
+                self.worker_stats.append(message[2])
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,378 @@
+"""HTTP優先の記事取得（サーバーレンダリング済みHTMLの解析）
+
+タイトル・著者・公開日時・価格・タグなど、サーバー側で描画される項目を
+プール済みHTTPセッションで取得したHTMLから読み取る。
+24h購入ポップアップなどクライアント描画が必要な項目と、
+HTMLから取れなかった項目だけをブラウザで補完する。
+"""
+import json
+import re
+import threading
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.browser import USER_AGENT
+from src.extractor import SALES_CLAIM_PATTERNS
+
+# ブラウザ抽出（extract_fields）と同じキー
+FIELDS = [
+    "title",
+    "author",
+    "authorUrl",
+    "likes",
+    "highRating",
+    "price",
+    "tags",
+    "createdAt",
+    "salesClaim",
+]
+
+FIELD_DEFAULTS = {field: "" for field in FIELDS}
+FIELD_DEFAULTS.update({"likes": 0, "highRating": 0, "price": 0})
+
+# HTMLに無ければ「該当なし」とみなす項目（本文の無料部分はサーバー描画されるため）
+# それ以外の項目が1つでも欠けていればブラウザで補完する
+OPTIONAL_FIELDS = {"salesClaim"}
+
+# 値を集める要素のクラス名（部分一致）
+CAPTURE_CLASSES = {
+    "o-noteContentText__title": "h1",
+    "o-noteContentHeader__name": "authorName",
+    "o-noteContentHeader__status": "priceStatus",
+    "o-noteContentHeader__price": "priceHeader",
+    "o-noteLikeV3__count": "likes",
+    "m-contentRaters__label": "highRating",
+}
+
+# この要素がHTMLにあれば、その部分はサーバー描画済み（値を表す要素が無ければ「該当なし」と判断できる）
+# - header: 記事ヘッダー。有料記事は価格が出るので、価格の要素が無ければ無料（0）
+# - footer: スキボタン。本文・タグ・高評価はその上にあるので、タグ・高評価の要素が無ければ無し
+RENDERED_MARKERS = {
+    "o-noteContentHeader": "header",
+    "o-noteLikeV3": "footer",
+}
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+SALES_CLAIM_RE = re.compile("|".join(SALES_CLAIM_PATTERNS))
+ARTICLE_URL_RE = re.compile(r"^(https://note\.com/[^/]+)/n/")
+
+
+class ArticleHTMLParser(HTMLParser):
+    """記事HTMLからmetaタグ・JSON-LD・主要要素のテキストを収集する"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.title = ""
+        self.json_ld: List[Dict] = []
+        self.captured: Dict[str, str] = {}
+        self.author_href = ""
+        self.hashtags: List[str] = []
+        self.first_h1 = ""
+        self.body_text: List[str] = []
+        # RENDERED_MARKERS のうち、HTMLにあった部分
+        self.rendered: set = set()
+        # (tag, capture名) のスタック。capture名がNoneの要素は収集対象外
+        self._stack: List[tuple] = []
+        self._buffers: Dict[str, List[str]] = {}
+        self._in_title = False
+        self._in_json_ld = False
+        self._json_ld_buffer: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attr = dict(attrs)
+        if tag == "meta":
+            key = attr.get("property") or attr.get("name")
+            if key and attr.get("content") and key not in self.meta:
+                self.meta[key] = attr["content"].strip()
+            return
+        if tag in VOID_TAGS:
+            return
+        if tag == "title":
+            self._in_title = True
+        if tag == "script" and attr.get("type") == "application/ld+json":
+            self._in_json_ld = True
+            self._json_ld_buffer = []
+        if tag in ("script", "style", "noscript"):
+            self._skip_depth += 1
+
+        capture = None
+        classes = attr.get("class") or ""
+        for class_name, part in RENDERED_MARKERS.items():
+            if class_name in classes:
+                self.rendered.add(part)
+        for class_name, name in CAPTURE_CLASSES.items():
+            if class_name in classes and name not in self.captured and name not in self._buffers:
+                capture = name
+                break
+        if capture is None and tag == "h1" and not self.first_h1 and "h1" not in self._buffers:
+            capture = "firstH1"
+        if capture is None and tag == "a" and "/hashtag/" in (attr.get("href") or ""):
+            capture = f"hashtag:{len(self.hashtags)}"
+            self.hashtags.append("")
+        if tag == "a" and not self.author_href and "authorName" in self._buffers:
+            self.author_href = attr.get("href") or ""
+
+        if capture is not None:
+            self._buffers[capture] = []
+        self._stack.append((tag, capture))
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag == "title":
+            self._in_title = False
+        if tag == "script" and self._in_json_ld:
+            self._in_json_ld = False
+            try:
+                data = json.loads("".join(self._json_ld_buffer))
+                self.json_ld.extend(data if isinstance(data, list) else [data])
+            except ValueError:
+                pass
+        if tag in ("script", "style", "noscript") and self._skip_depth:
+            self._skip_depth -= 1
+
+        # 閉じ忘れの要素を考慮し、対応する開始タグまで巻き戻す
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, capture = self._stack.pop()
+            if capture is not None:
+                self._finish(capture)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if self._in_json_ld:
+            self._json_ld_buffer.append(data)
+            return
+        if self._skip_depth:
+            return
+        self.body_text.append(data)
+        for buffer in self._buffers.values():
+            buffer.append(data)
+
+    def _finish(self, capture: str) -> None:
+        text = " ".join("".join(self._buffers.pop(capture, [])).split())
+        if capture == "firstH1":
+            self.first_h1 = text
+        elif capture.startswith("hashtag:"):
+            self.hashtags[int(capture.split(":", 1)[1])] = text
+        elif text:
+            self.captured[capture] = text
+
+
+def _json_ld_article(items: List[Dict]) -> Dict:
+    for item in items:
+        if isinstance(item, dict) and item.get("@type") in ("Article", "NewsArticle", "BlogPosting"):
+            return item
+    return {}
+
+
+def _price_from_text(text: str) -> Optional[int]:
+    if re.search(r"¥\s*0\s*[〜~]", text):
+        return 0
+    match = re.search(r"¥\s*([\d,]+)", text)
+    if match and match.group(1).replace(",", ""):
+        return int(match.group(1).replace(",", ""))
+    return None
+
+
+def parse_article_html(url: str, html: str) -> Dict:
+    """記事HTMLから取得できた項目だけを返す（見つからない項目はキー自体を含めない）
+
+    価格・高評価・タグは、その部分がサーバー描画されていて要素が無ければ「無い」と分かるので、
+    0・空文字を入れる（ブラウザでの補完が要らない）
+    """
+    parser = ArticleHTMLParser()
+    parser.feed(html)
+    parser.close()
+
+    fields: Dict = {}
+    article = _json_ld_article(parser.json_ld)
+    author_ld = article.get("author") or {}
+    if isinstance(author_ld, list):
+        author_ld = author_ld[0] if author_ld else {}
+
+    title = (
+        parser.captured.get("h1")
+        or parser.first_h1
+        or parser.meta.get("og:title", "")
+        or parser.title.replace(" | note", "").strip()
+    )
+    if title:
+        fields["title"] = title
+
+    author = parser.captured.get("authorName") or author_ld.get("name") or parser.meta.get("author", "")
+    if author:
+        fields["author"] = author
+
+    author_url = parser.author_href or author_ld.get("url") or ""
+    if not author_url:
+        match = ARTICLE_URL_RE.match(url)
+        author_url = match.group(1) if match else ""
+    if author_url.startswith("/"):
+        author_url = f"https://note.com{author_url}"
+    if author_url:
+        fields["authorUrl"] = author_url
+
+    created_at = parser.meta.get("article:published_time") or article.get("datePublished") or ""
+    if created_at:
+        fields["createdAt"] = created_at
+
+    price = None
+    for key in ("priceStatus", "priceHeader"):
+        if key in parser.captured:
+            price = _price_from_text(parser.captured[key])
+            if price is not None:
+                break
+    if price is None:
+        offers = article.get("offers") or {}
+        if isinstance(offers, dict) and str(offers.get("price", "")).isdigit():
+            price = int(offers["price"])
+    if price is None and "header" in parser.rendered and not ({"priceStatus", "priceHeader"} & set(parser.captured)):
+        # 記事ヘッダーはあるが価格の表示が無い＝無料記事
+        price = 0
+    if price is not None:
+        fields["price"] = price
+
+    tags: List[str] = []
+    for tag in parser.hashtags:
+        tag = tag.strip().lstrip("#")
+        if tag and tag not in tags:
+            tags.append(tag)
+    if tags:
+        fields["tags"] = ",".join(tags)
+    elif "footer" in parser.rendered:
+        fields["tags"] = ""
+
+    if "likes" in parser.captured:
+        match = re.search(r"([0-9,]+)", parser.captured["likes"])
+        if match and match.group(1).replace(",", ""):
+            fields["likes"] = int(match.group(1).replace(",", ""))
+
+    if "highRating" in parser.captured:
+        match = re.search(r"(\d+)人が高評価", parser.captured["highRating"])
+        if match:
+            fields["highRating"] = int(match.group(1))
+    elif "footer" in parser.rendered:
+        # 高評価は1人以上で表示される
+        fields["highRating"] = 0
+
+    if SALES_CLAIM_RE.search("".join(parser.body_text)):
+        fields["salesClaim"] = "○"
+
+    return fields
+
+
+class StaticFetcher:
+    """スレッドごとにプール済みHTTPセッションで記事HTMLを取得する"""
+
+    def __init__(self, timeout: float = 10.0, pool_size: int = 8, throttle=None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # 応答ステータス・所要時間を反映する AdaptiveThrottle（src/throttle.py）
+        self.throttle = throttle
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "ja-JP,ja;q=0.9"})
+            self._local.session = session
+        return session
+
+    def fetch(self, url: str) -> Dict:
+        """記事HTMLを取得・解析する（失敗時は空dictでブラウザに任せる）"""
+        try:
+            try:
+                response = self._session().get(url, timeout=self.timeout)
+            except requests.Timeout:
+                if self.throttle:
+                    self.throttle.record(timeout=True)
+                raise
+            # 正常な応答は同じ記事のブラウザの遷移で数える（混雑の兆候だけ反映）
+            if self.throttle:
+                self.throttle.record(
+                    response.status_code,
+                    response.elapsed.total_seconds() * 1000,
+                    retry_after=response.headers.get("Retry-After"),
+                    secondary=True,
+                )
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+            return parse_article_html(url, response.text)
+        except Exception as exc:
+            print(f"[static] Failed to fetch {url}: {exc}")
+            return {}
+
+
+def missing_fields(static: Dict) -> List[str]:
+    """ブラウザでの補完が必要な項目"""
+    return [field for field in FIELDS if field not in static and field not in OPTIONAL_FIELDS]
+
+
+def merge_fields(static: Dict, browser: Dict, search: Optional[Dict] = None) -> Tuple[Dict, Dict[str, str]]:
+    """HTML > 検索API > ブラウザ の優先順で項目をまとめ、項目ごとの取得元を返す
+
+    どこからも取れなかった項目は FIELD_DEFAULTS の値で、取得元は "default"
+    """
+    search = search or {}
+    fields: Dict = {}
+    sources: Dict[str, str] = {}
+    for field in FIELDS:
+        if field in static:
+            fields[field], sources[field] = static[field], "static"
+        elif field in search:
+            fields[field], sources[field] = search[field], "search"
+        elif field in browser:
+            fields[field], sources[field] = browser[field], "browser"
+        else:
+            # HTMLに無く、ブラウザ抽出も不要と判断した項目は「該当なし」
+            fields[field], sources[field] = FIELD_DEFAULTS[field], "default"
+    return fields, sources
+
+
+class FieldSourceStats:
+    """項目ごとの取得元（static / search / browser / default）の集計"""
+
+    def __init__(self):
+        self.static_hits: Dict[str, int] = {field: 0 for field in FIELDS}
+        self.search_hits = 0
+        self.articles = 0
+        self.browser_extractions = 0
+
+    def add(self, sources: Dict[str, str]) -> None:
+        self.articles += 1
+        for field, source in sources.items():
+            if source == "static":
+                self.static_hits[field] += 1
+            elif source == "search":
+                self.search_hits += 1
+        if "browser" in sources.values():
+            self.browser_extractions += 1
+
+    def summary(self) -> str:
+        if not self.articles:
+            return "対象なし"
+        rates = ", ".join(
+            f"{field}={hits * 100 // self.articles}%"
+            for field, hits in self.static_hits.items()
+        )
+        summary = f"ブラウザ抽出 {self.browser_extractions}/{self.articles}件 [{rates}]"
+        if self.search_hits:
+            summary += f" 検索API補完 {self.search_hits}項目"
+        return summary
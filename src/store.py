@@ -0,0 +1,347 @@
+"""ローカルSQLite記事ストア
+
+- articles: 正規化URLをキーにした記事ごとの最新状態
+- observations: スクレイプ・トラッキングごとの観測値（時系列）
+- runs: 実行ごとの統計
+- keyword_stats: 実行ごと・キーワードごとの所要時間と収穫件数（キーワードスケジューラ用）
+
+WALモードで開き、観測値はバッファしてまとめて1トランザクションで書き込む。
+URLは normalize_url() 済みの値を渡すこと。
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    author_url TEXT,
+    price INTEGER,
+    tags TEXT,
+    created_at TEXT,
+    first_seen_at TEXT NOT NULL,
+    last_seen_at TEXT,
+    last_delivered_at TEXT,
+    last_tracked_at TEXT,
+    last_likes INTEGER,
+    last_high_rating INTEGER,
+    last_purchased_24h INTEGER,
+    observation_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles(last_seen_at);
+CREATE INDEX IF NOT EXISTS idx_articles_author ON articles(author);
+
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    run_id TEXT,
+    source TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    likes INTEGER,
+    high_rating INTEGER,
+    price INTEGER,
+    purchased_24h INTEGER,
+    sales_claim TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_observations_url ON observations(url, observed_at);
+CREATE INDEX IF NOT EXISTS idx_observations_run ON observations(run_id);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    keywords INTEGER,
+    total_records INTEGER,
+    new_records INTEGER,
+    errors INTEGER,
+    elapsed_minutes REAL
+);
+
+CREATE TABLE IF NOT EXISTS keyword_stats (
+    run_id TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    ran_at TEXT NOT NULL,
+    minutes REAL,
+    articles REAL,
+    hits REAL,
+    PRIMARY KEY (run_id, keyword)
+);
+CREATE INDEX IF NOT EXISTS idx_keyword_stats_keyword ON keyword_stats(keyword, ran_at);
+"""
+
+UPSERT_ARTICLE = """
+INSERT INTO articles (
+    url, title, author, author_url, price, tags, created_at,
+    first_seen_at, last_seen_at, last_likes, last_high_rating, last_purchased_24h, observation_count
+) VALUES (
+    :url, :title, :author, :author_url, :price, :tags, :created_at,
+    :observed_at, :observed_at, :likes, :high_rating, :purchased_24h, 1
+)
+ON CONFLICT(url) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    author_url = excluded.author_url,
+    price = excluded.price,
+    tags = excluded.tags,
+    created_at = COALESCE(NULLIF(excluded.created_at, ''), articles.created_at),
+    last_seen_at = excluded.last_seen_at,
+    last_likes = excluded.last_likes,
+    last_high_rating = excluded.last_high_rating,
+    last_purchased_24h = excluded.last_purchased_24h,
+    observation_count = articles.observation_count + 1
+"""
+
+UPSERT_TRACKED = """
+INSERT INTO articles (url, first_seen_at, last_tracked_at, last_purchased_24h)
+VALUES (:url, :observed_at, :observed_at, :purchased_24h)
+ON CONFLICT(url) DO UPDATE SET
+    last_tracked_at = excluded.last_tracked_at,
+    last_purchased_24h = excluded.last_purchased_24h
+"""
+
+# GASへの記録（またはスプール）が済んだ取得（再巡回ポリシーはこの時刻から数える）
+MARK_DELIVERED = "UPDATE articles SET last_delivered_at = last_seen_at WHERE url = :url"
+
+INSERT_OBSERVATION = """
+INSERT INTO observations (url, run_id, source, observed_at, likes, high_rating, price, purchased_24h, sales_claim)
+VALUES (:url, :run_id, :source, :observed_at, :likes, :high_rating, :price, :purchased_24h, :sales_claim)
+"""
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class ArticleStore:
+    """記事と観測値のローカルストア（バッファ付き一括書き込み）"""
+
+    def __init__(self, path: str, batch_size: int = 50):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._pending_articles: List[Dict] = []
+        self._pending_tracked: List[Dict] = []
+        self._pending_delivered: List[Dict] = []
+        self._pending_urls = set()
+
+    def _migrate(self) -> None:
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        if "last_delivered_at" not in columns:
+            # 以前の取得は送信済みとみなす
+            with self._conn:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN last_delivered_at TEXT")
+                self._conn.execute("UPDATE articles SET last_delivered_at = last_seen_at")
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    # --- 書き込み ---
+
+    def record_article(self, url: str, payload: Dict, run_id: Optional[str] = None) -> bool:
+        """スクレイプ結果を記録し、初めて見るURLならTrueを返す"""
+        row = {
+            "url": url,
+            "run_id": run_id,
+            "source": "scrape",
+            "observed_at": payload.get("recordedAt") or _now(),
+            "title": payload.get("title", ""),
+            "author": payload.get("author", ""),
+            "author_url": payload.get("authorUrl", ""),
+            "price": payload.get("price", 0),
+            "tags": payload.get("tags", ""),
+            "created_at": payload.get("createdAt", ""),
+            "likes": payload.get("likes", 0),
+            "high_rating": payload.get("highRating", 0),
+            "purchased_24h": int(bool(payload.get("purchased24h"))),
+            "sales_claim": payload.get("salesClaim", ""),
+        }
+        with self._lock:
+            is_new = url not in self._pending_urls and not self._exists(url)
+            self._pending_urls.add(url)
+            self._pending_articles.append(row)
+            should_flush = len(self._pending_articles) + len(self._pending_tracked) >= self.batch_size
+        if should_flush:
+            self.flush()
+        return is_new
+
+    def mark_delivered(self, url: str) -> None:
+        """record_article した取得がGASに記録された（またはスプールに保存された）"""
+        with self._lock:
+            self._pending_delivered.append({"url": url})
+            should_flush = len(self._pending_delivered) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def record_tracking(self, url: str, hit: bool, run_id: Optional[str] = None) -> None:
+        """トラッカーのチェック結果を記録"""
+        row = {
+            "url": url,
+            "run_id": run_id,
+            "source": "tracker",
+            "observed_at": _now(),
+            "likes": None,
+            "high_rating": None,
+            "price": None,
+            "purchased_24h": int(hit),
+            "sales_claim": None,
+        }
+        with self._lock:
+            self._pending_tracked.append(row)
+            should_flush = len(self._pending_articles) + len(self._pending_tracked) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            articles, self._pending_articles = self._pending_articles, []
+            tracked, self._pending_tracked = self._pending_tracked, []
+            delivered, self._pending_delivered = self._pending_delivered, []
+            self._pending_urls = set()
+            if not articles and not tracked and not delivered:
+                return
+            with self._conn:
+                if articles:
+                    self._conn.executemany(UPSERT_ARTICLE, articles)
+                if tracked:
+                    self._conn.executemany(UPSERT_TRACKED, tracked)
+                self._conn.executemany(INSERT_OBSERVATION, articles + tracked)
+                # 取得の記録より後に適用する（同じ flush に入っていても送信済みの印が付く）
+                if delivered:
+                    self._conn.executemany(MARK_DELIVERED, delivered)
+
+    def start_run(self, kind: str, keywords: int = 0) -> str:
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, kind, started_at, keywords) VALUES (?, ?, ?, ?)",
+                (run_id, kind, _now(), keywords),
+            )
+        return run_id
+
+    def finish_run(self, run_id: str, total: int, new: int, errors: int, elapsed_minutes: float) -> None:
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE runs SET finished_at = ?, total_records = ?, new_records = ?, errors = ?, elapsed_minutes = ?
+                WHERE run_id = ?
+                """,
+                (_now(), total, new, errors, elapsed_minutes, run_id),
+            )
+
+    def record_keyword_stats(self, run_id: str, stats: Dict[str, Dict[str, float]]) -> None:
+        """キーワードごとの {minutes, articles, hits} を記録"""
+        rows = [
+            (run_id, keyword, _now(), entry["minutes"], entry["articles"], entry["hits"])
+            for keyword, entry in stats.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO keyword_stats (run_id, keyword, ran_at, minutes, articles, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # --- 読み取り ---
+
+    def _exists(self, url: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM articles WHERE url = ? AND last_seen_at IS NOT NULL", (url,)
+        ).fetchone() is not None
+
+    def get_article(self, url: str) -> Optional[sqlite3.Row]:
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT * FROM articles WHERE url = ?", (url,)).fetchone()
+
+    def get_articles(self, urls: List[str]) -> Dict[str, sqlite3.Row]:
+        """複数URLの記事をまとめて取得（見つからないURLは含めない）"""
+        self.flush()
+        found: Dict[str, sqlite3.Row] = {}
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT * FROM articles WHERE url IN ({placeholders})", chunk
+                ):
+                    found[row["url"]] = row
+        return found
+
+    def keyword_history(self, keywords: List[str], runs: int = 5) -> Dict[str, Dict]:
+        """キーワードごとの直近 runs 回の実績 {runs, minutes, hits, last_run_at}"""
+        history: Dict[str, Dict] = {}
+        with self._lock:
+            for start in range(0, len(keywords), 500):
+                chunk = keywords[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"""
+                    SELECT keyword, COUNT(*) AS runs, SUM(minutes) AS minutes, SUM(hits) AS hits,
+                           MAX(ran_at) AS last_run_at
+                    FROM (
+                        SELECT keyword, minutes, hits, ran_at,
+                               ROW_NUMBER() OVER (PARTITION BY keyword ORDER BY ran_at DESC) AS rn
+                        FROM keyword_stats WHERE keyword IN ({placeholders})
+                    )
+                    WHERE rn <= ?
+                    GROUP BY keyword
+                    """,
+                    (*chunk, runs),
+                ):
+                    history[row["keyword"]] = dict(row)
+        return history
+
+    def query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """アドホックな集計用"""
+        self.flush()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def summary(self) -> Dict:
+        rows = self.query(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM articles) AS articles,
+                (SELECT COUNT(*) FROM observations) AS observations,
+                (SELECT COUNT(*) FROM articles WHERE last_high_rating > 0) AS high_rated,
+                (SELECT COUNT(*) FROM articles WHERE last_purchased_24h = 1) AS purchased_24h,
+                (SELECT COUNT(*) FROM runs) AS runs
+            """
+        )
+        return dict(rows[0])
+
+
+def open_store(path: str) -> Optional[ArticleStore]:
+    """パスが空ならストアを使わない"""
+    return ArticleStore(path) if path else None
+
+
+if __name__ == "__main__":
+    # 使い方: python -m src.store [data/articles.db] ["SELECT ..."]
+    store = ArticleStore(sys.argv[1] if len(sys.argv) > 1 else "data/articles.db")
+    if len(sys.argv) > 2:
+        for result in store.query(sys.argv[2]):
+            print(dict(result))
+    else:
+        print(store.summary())
+        for result in store.query("SELECT * FROM runs ORDER BY started_at DESC LIMIT 5"):
+            print(dict(result))
+    store.close()
@@ -0,0 +1,234 @@
+"""応答状況に合わせてアクセス頻度を調整するスロットル（AIMD のトークンバケット）
+
+固定の待機（between_articles_ms・トラッカーの2-4秒）の代わりに、全ワーカー共通のトークンバケットで
+遷移の間隔を決める。レートは note.com の応答から調整する。
+
+- 正常な応答: 1分あたり increase_per_minute ずつ上げる（加算増加、max_per_minute まで）
+- 429・5xx・タイムアウト・slow_ms を超える応答: decrease_factor 倍に下げる（乗算減少、min_per_minute まで）。
+  同時に返ってきた複数の失敗で何度も下げないよう、下げてから cooldown_seconds の間は上げ下げしない
+- 429 の Retry-After はその秒数だけ次のトークンを遅らせる
+- 各トークンの重さを 1±jitter の乱数にし、平均レートを保ったまま間隔をばらつかせる
+
+RateLimiter と同じ acquire() を持つので、プールの limiter にそのまま渡せる。
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from src.metrics import METRICS
+
+# 減速の理由（集計・完了通知の表示順）
+SIGNALS = ("429", "5xx", "timeout", "slow")
+
+
+@dataclass
+class ThrottleConfig:
+    enabled: bool = False
+    # 1分あたりの遷移回数（全ワーカー合計）
+    initial_per_minute: float = 20
+    min_per_minute: float = 6
+    max_per_minute: float = 60
+    # 正常な応答が続いたときに1分あたり上げる量
+    increase_per_minute: float = 2
+    decrease_factor: float = 0.5
+    # これより遅い応答（ms）は混雑とみなす
+    slow_ms: int = 4000
+    cooldown_seconds: float = 10
+    jitter: float = 0.3
+
+
+def load_throttle(raw: Dict) -> ThrottleConfig:
+    data = raw.get("throttle", {}) or {}
+    defaults = ThrottleConfig()
+    config = ThrottleConfig(
+        enabled=bool(data.get("enabled", defaults.enabled)),
+        initial_per_minute=float(data.get("initial_per_minute", defaults.initial_per_minute)),
+        min_per_minute=float(data.get("min_per_minute", defaults.min_per_minute)),
+        max_per_minute=float(data.get("max_per_minute", defaults.max_per_minute)),
+        increase_per_minute=float(data.get("increase_per_minute", defaults.increase_per_minute)),
+        decrease_factor=float(data.get("decrease_factor", defaults.decrease_factor)),
+        slow_ms=int(data.get("slow_ms", defaults.slow_ms)),
+        cooldown_seconds=float(data.get("cooldown_seconds", defaults.cooldown_seconds)),
+        jitter=float(data.get("jitter", defaults.jitter)),
+    )
+    if not 0 < config.min_per_minute <= config.max_per_minute:
+        raise ValueError("throttle requires 0 < min_per_minute <= max_per_minute")
+    if not 0 < config.decrease_factor < 1:
+        raise ValueError("throttle.decrease_factor must be between 0 and 1")
+    if not 0 <= config.jitter < 1:
+        raise ValueError("throttle.jitter must be between 0 and 1")
+    return config
+
+
+def _retry_after_seconds(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value)) if value else 0.0
+    except ValueError:
+        # HTTP日付形式は扱わない（乗算減少だけで下げる）
+        return 0.0
+
+
+class AdaptiveThrottle:
+    """全ワーカー共通のトークンバケット（スレッドセーフ）
+
+    ceiling_per_minute（max_articles_per_minute）が正なら max_per_minute をそれ以下に抑える。
+    share は同じ設定を分け合うプロセス数（processes）で、各レートを等分する。
+    """
+
+    def __init__(
+        self,
+        config: ThrottleConfig,
+        ceiling_per_minute: float = 0,
+        share: int = 1,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.config = config
+        self.enabled = config.enabled
+        share = max(1, share)
+        ceiling = config.max_per_minute
+        if ceiling_per_minute > 0:
+            ceiling = min(ceiling, ceiling_per_minute)
+        self.ceiling = ceiling / share
+        self.floor = min(config.min_per_minute, ceiling) / share
+        self.rate = min(max(config.initial_per_minute / share, self.floor), self.ceiling)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # 1トークン分だけ貯められる（溜めた分を一度に使わない）
+        self._tokens = 1.0
+        self._updated = clock()
+        self._hold_until = 0.0
+        self.lowest = self.rate
+        self.highest = self.rate
+        self.responses = 0
+        self.decreases = 0
+        self.signals: Dict[str, int] = {}
+        # 別プロセスのワーカーごとの最終レート（merge。検索・記事の両フェーズで同じワーカー番号なら後の値）
+        self._worker_rates: Dict[int, float] = {}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate / 60.0)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """次の遷移の順番が来るまで待つ（待ち時間は先着順に予約する）"""
+        if not self.enabled:
+            return
+        cost = random.uniform(1 - self.config.jitter, 1 + self.config.jitter)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= cost
+            wait = -self._tokens * 60.0 / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            METRICS.observe("sleep_throttle", wait * 1000)
+            self._sleep(wait)
+
+    def record(
+        self,
+        status: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        timeout: bool = False,
+        retry_after: Optional[str] = None,
+        secondary: bool = False,
+    ) -> None:
+        """1回の応答（またはタイムアウト）を反映する
+
+        secondary は同じ記事の2回目以降のリクエスト（HTTP優先モードの事前のGET）。
+        混雑の兆候だけを反映し、正常な応答は数えない（加算増加を記事1件につき1回にする）
+        """
+        if not self.enabled:
+            return
+        signal = None
+        if timeout:
+            signal = "timeout"
+        elif status == 429:
+            signal = "429"
+        elif status is not None and status >= 500:
+            signal = "5xx"
+        elif latency_ms is not None and latency_ms > self.config.slow_ms:
+            signal = "slow"
+
+        if signal is None and secondary:
+            return
+
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.responses += 1
+            if signal is None:
+                if now >= self._hold_until:
+                    # 1分あたり rate 回の応答で increase_per_minute 上がる
+                    self.rate = min(self.ceiling, self.rate + self.config.increase_per_minute / self.rate)
+                    self.highest = max(self.highest, self.rate)
+                return
+            self.signals[signal] = self.signals.get(signal, 0) + 1
+            delay = _retry_after_seconds(retry_after) if status == 429 else 0.0
+            if delay > 0:
+                self._tokens = min(self._tokens, -delay * self.rate / 60.0)
+            if now < self._hold_until:
+                return
+            previous = self.rate
+            self.rate = max(self.floor, self.rate * self.config.decrease_factor)
+            # トークンの借りは新しいレートで返す（減速をすぐ効かせる）
+            if self._tokens < 0:
+                self._tokens *= self.rate / previous
+            self.lowest = min(self.lowest, self.rate)
+            self._hold_until = now + self.config.cooldown_seconds
+            self.decreases += 1
+        print(f"[throttle] {signal}: {previous:.1f} -> {self.rate:.1f}/min")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "lowest": self.lowest,
+                "highest": self.highest,
+                "responses": self.responses,
+                "decreases": self.decreases,
+                "signals": dict(self.signals),
+            }
+
+    def merge(self, snapshot: Dict) -> None:
+        """別プロセスのワーカーの snapshot()（と "worker" 番号）を合算する（レートはプロセスの合計で表示）"""
+        if not snapshot:
+            return
+        with self._lock:
+            self._worker_rates[snapshot.get("worker", len(self._worker_rates))] = snapshot["rate"]
+            self.responses += snapshot["responses"]
+            self.decreases += snapshot["decreases"]
+            for signal, count in snapshot["signals"].items():
+                self.signals[signal] = self.signals.get(signal, 0) + count
+
+    def summary(self) -> str:
+        with self._lock:
+            if self._worker_rates:
+                rate = f"最終 {sum(self._worker_rates.values()):.1f}/分（{len(self._worker_rates)}プロセス合計）"
+            else:
+                rate = f"最終 {self.rate:.1f}/分（最低 {self.lowest:.1f}, 最高 {self.highest:.1f}）"
+            signals = ", ".join(f"{s} {self.signals[s]}" for s in SIGNALS if self.signals.get(s))
+        return f"{rate} / 応答 {self.responses}件 / 減速 {self.decreases}回" + (f"（{signals}）" if signals else "")
+
+
+def goto(page, url: str, throttle: Optional[AdaptiveThrottle] = None, **kwargs):
+    """page.goto の応答ステータス・所要時間・タイムアウトを throttle に反映する"""
+    if throttle is None or not throttle.enabled:
+        return page.goto(url, **kwargs)
+    started = time.monotonic()
+    try:
+        response = page.goto(url, **kwargs)
+    except PlaywrightTimeoutError:
+        throttle.record(timeout=True)
+        raise
+    if response is not None:
+        throttle.record(
+            response.status,
+            (time.monotonic() - started) * 1000,
+            retry_after=response.headers.get("retry-after"),
+        )
+    return response
@@ -2,23 +2,32 @@
 """
 note 24h購入トラッキングチェッカー
 - GASから追跡中URLリストを取得
-- 各URLにアクセスして24hポップアップの有無を確認
-- 結果をGASに送信
+- 各URLにアクセスして24hポップアップの有無を確認（ページプールで並列）
+- 結果を一定件数ごとにGASへ送信
+- チェック結果と送信済みをローカルのチェックポイントに記録し、途中で落ちても同日中なら続きから再開
 """
 import json
 import os
-import random
 import time
+import uuid
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 
 import requests
 from dotenv import load_dotenv
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
-# 24h購入ポップアップのセレクタ
-PURCHASED_SELECTOR = ".m-purchasedWithinLast24HoursBalloon"
+from src.balloon import PURCHASED_SELECTOR, BalloonDetector, BalloonStats
+from src.browser import acquire_browser
+from src.main import load_config, make_balloon_detector
+from src.memory import MemoryGovernor
+from src.metrics import METRICS
+from src.network import NetworkDiet
+from src.pool import InlinePool, PagePool, RateLimiter
+from src.store import open_store
+from src.throttle import AdaptiveThrottle, goto
+from src.urls import normalize_url
 
 
 def get_tracking_list(gas_url: str) -> List[Dict]:
@@ -33,31 +42,178 @@ def get_tracking_list(gas_url: str) -> List[Dict]:
     return data.get("urls", [])
 
 
-def update_tracking_results(gas_url: str, results: Dict[str, bool]) -> Dict:
-    """トラッキング結果をGASに送信"""
+def new_run_id(date: str) -> str:
+    return f"{date}-{uuid.uuid4().hex[:8]}"
+
+
+def update_tracking_results(gas_url: str, results: Dict[str, bool], run_id: Optional[str] = None) -> Dict:
+    """トラッキング結果をGASに送信
+
+    run_id が同じ結果は GAS 側で1回しか加算しない（タイムアウト後の再送・再開で二重に数えない）
+    """
     payload = {
         "action": "updateTrackingResults",
         "results": results
     }
+    if run_id:
+        payload["runId"] = run_id
     response = requests.post(gas_url, json=payload, timeout=30)
     response.raise_for_status()
-    return response.json()
+    data = response.json()
 
+    if not data.get("success"):
+        raise RuntimeError(f"Failed to update tracking results: {data.get('error')}")
 
-def check_purchased_24h(page, url: str, timeout_ms: int = 1500) -> bool:
-    """URLにアクセスして24hポップアップの有無を確認"""
-    try:
-        page.goto(url, wait_until="domcontentloaded")
-        page.wait_for_selector(PURCHASED_SELECTOR, timeout=timeout_ms, state="attached")
-        return True
-    except PlaywrightTimeoutError:
-        return False
-    except Exception as e:
-        print(f"[error] Failed to check {url}: {e}")
-        return False
+    return data
+
+
+def check_purchased_24h(
+    page,
+    url: str,
+    timeout_ms: int = 1500,
+    detector: Optional[BalloonDetector] = None,
+    throttle: Optional[AdaptiveThrottle] = None,
+) -> bool:
+    """URLにアクセスして24hポップアップの有無を確認（throttle には応答ステータス・所要時間を反映）
+
+    ポップアップ待ちのタイムアウトだけを「なし」とし、ページの読み込み失敗・クラッシュは例外のまま返す
+    （「なし」として送信せず、プール側でページを作り直して次回のチェックに回す）。
+    """
+    with METRICS.timer("article_goto"):
+        goto(page, url, throttle, wait_until="domcontentloaded")
+    with METRICS.timer("balloon_wait"):
+        if detector:
+            return detector.detect(page).hit
+        try:
+            page.wait_for_selector(PURCHASED_SELECTOR, timeout=timeout_ms, state="attached")
+        except PlaywrightTimeoutError:
+            return False
+    return True
+
+
+class TrackerCheckpoint:
+    """チェック結果と送信済みURLを追記するローカルのチェックポイント（JSONL）
+
+    1行目は実行日と実行ID。同じ日の再実行ではチェック済みURLを飛ばし、未送信の結果から送り直す
+    （実行IDも引き継ぎ、GAS 側で送信済みの結果を二重に数えない）。
+    日付が変わっていれば前回分は破棄する（トラッキングは1日1回のチェック）。
+    """
+
+    def __init__(self, path: str, date: str):
+        self.path = path
+        self.date = date
+        self.run_id = new_run_id(date)
+        self.results: Dict[str, bool] = {}
+        self.uploaded: Set[str] = set()
+        self._file = None
+
+    def open(self) -> "TrackerCheckpoint":
+        if os.path.exists(self.path):
+            self._load()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.results:
+            self._file = open(self.path, "a", encoding="utf-8")
+            # 前回書き込み途中で落ちた行の続きに書かないよう改行を補う
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write({"date": self.date, "runId": self.run_id})
+        return self
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get("date") != self.date:
+            return
+        self.run_id = header.get("runId") or self.run_id
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 書き込み途中で落ちた最終行は無視
+                continue
+            if "url" in entry:
+                self.results[entry["url"]] = bool(entry["hit"])
+            for url in entry.get("uploaded", []):
+                self.uploaded.add(url)
+
+    def _write(self, entry: Dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, url: str, hit: bool) -> None:
+        self.results[url] = hit
+        self._write({"url": url, "hit": hit})
 
+    def mark_uploaded(self, urls: List[str]) -> None:
+        self.uploaded.update(urls)
+        self._write({"uploaded": urls})
 
-def run_tracker():
+    def pending(self) -> Dict[str, bool]:
+        """チェック済みでGAS未送信の結果"""
+        return {url: hit for url, hit in self.results.items() if url not in self.uploaded}
+
+    def close(self, completed: bool) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+        # 全件送信できたらチェックポイントは不要
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ResultUploader:
+    """チェック結果を chunk_size 件ごとにGASへ送信する（0なら flush() の呼び出し＝最後にまとめて送信）"""
+
+    def __init__(self, gas_url: str, chunk_size: int, checkpoint: Optional[TrackerCheckpoint]):
+        self.gas_url = gas_url
+        self.chunk_size = max(0, chunk_size)
+        self.checkpoint = checkpoint
+        # 再送・再開しても同じ実行ID（GAS 側で適用済みの結果を飛ばす）
+        self.run_id = checkpoint.run_id if checkpoint else new_run_id(datetime.now().strftime("%Y-%m-%d"))
+        self._buffer: Dict[str, bool] = {}
+        self._flush_at = self.chunk_size
+        self.sent = 0
+
+    def add(self, url: str, hit: bool) -> None:
+        self._buffer[url] = hit
+        if self.chunk_size and len(self._buffer) >= self._flush_at:
+            self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        chunk = self._buffer
+        try:
+            with METRICS.timer("gas_post_tracking"):
+                update_result = update_tracking_results(self.gas_url, chunk, self.run_id)
+        except Exception as exc:
+            # 未送信のまま残し、さらに chunk_size 件たまったら（または最後に）再送
+            self._flush_at = len(chunk) + self.chunk_size
+            print(f"[tracker] Failed to send {len(chunk)} results (will retry): {exc}")
+            return
+        self._buffer = {}
+        self._flush_at = self.chunk_size
+        self.sent += len(chunk)
+        if self.checkpoint:
+            self.checkpoint.mark_uploaded(list(chunk))
+        print(f"[tracker] Sent {len(chunk)} results: {update_result}")
+
+
+def run_tracker(config_path: str = "config.yaml"):
     """トラッキングチェッカーのメイン処理"""
     load_dotenv()
     gas_url = os.getenv("GAS_WEB_APP_URL", "").strip()
@@ -65,6 +221,10 @@ def run_tracker():
     if not gas_url:
         raise RuntimeError("GAS_WEB_APP_URL is not set")
 
+    config = load_config(config_path)
+    diet = NetworkDiet(config.network_diet)
+    METRICS.configure(config.metrics.enabled)
+
     print(f"[tracker] Starting at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # 追跡中URLリストを取得
@@ -75,44 +235,128 @@ def run_tracker():
         print("[tracker] No URLs to track")
         return
 
-    # 結果を格納
-    results: Dict[str, bool] = {}
-    hit_count = 0
+    # 同じ日の途中までの結果があれば再開
+    checkpoint = None
+    if config.tracker_checkpoint_path:
+        checkpoint = TrackerCheckpoint(config.tracker_checkpoint_path, datetime.now().strftime("%Y-%m-%d")).open()
+    uploader = ResultUploader(gas_url, config.tracker_upload_chunk, checkpoint)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-            locale="ja-JP",
-            timezone_id="Asia/Tokyo",
-        )
-        page = context.new_page()
+    results: Dict[str, bool] = dict(checkpoint.results) if checkpoint else {}
+    titles = {item["url"]: item.get("title", "")[:30] for item in tracking_list}
+    remaining = [item["url"] for item in tracking_list if item["url"] not in results]
+    if results:
+        print(f"[tracker] Resuming: {len(results)} already checked, {len(remaining)} remaining")
+        for url, hit in checkpoint.pending().items():
+            uploader.add(url, hit)
 
-        for i, item in enumerate(tracking_list, 1):
-            url = item["url"]
-            title = item.get("title", "")[:30]
+    hit_count = sum(1 for hit in results.values() if hit)
+    start_time = time.time()
 
-            print(f"[check] {i}/{len(tracking_list)} {url}")
+    # ローカル記事ストアにもチェック結果を記録
+    store = open_store(config.store_path)
+    run_id = store.start_run("tracker") if store else None
 
-            is_hit = check_purchased_24h(page, url)
-            results[url] = is_hit
+    balloon_stats = BalloonStats()
+    detector = make_balloon_detector(config, balloon_stats)
+    # 有効時は応答に合わせて調整するトークンバケットが固定の待機の代わりになる
+    throttle = AdaptiveThrottle(config.throttle, config.max_articles_per_minute)
 
-            if is_hit:
-                hit_count += 1
-                print(f"  -> HIT! {title}")
+    def check_task(page, url: str) -> bool:
+        return check_purchased_24h(page, url, config.article_wait_ms, detector, throttle)
+
+    completed = False
+    try:
+        with sync_playwright() as p:
+            limiter = throttle if throttle.enabled else RateLimiter(config.max_articles_per_minute)
+            # チェック間の待機（ワーカーごとに2-4秒。throttle 有効時は無し）
+            pause_ms = None if throttle.enabled else (2000, 4000)
+            lease = None
+            # 遷移回数・メモリ上限でのページの作り直し
+            governor = MemoryGovernor(config.memory)
+            governor.set_phase("tracker")
+            if config.concurrency > 1:
+                check_pool = PagePool(
+                    config.concurrency,
+                    True,
+                    check_task,
+                    limiter=limiter,
+                    pause_ms=pause_ms,
+                    diet=diet,
+                    service=config.browser_service,
+                    governor=governor,
+                ).start()
             else:
-                print(f"  -> miss {title}")
+                # 常駐ブラウザが動いていれば接続（無ければプロセス内で起動）
+                lease = acquire_browser(p, True, config.browser_service)
+                check_pool = InlinePool(
+                    lease.new_page(diet),
+                    check_task,
+                    limiter=limiter,
+                    pause_ms=pause_ms,
+                    governor=governor,
+                    reopen=lambda old: lease.reopen(old, diet, governor.renew_context),
+                )
+
+            try:
+                # 完了したものから順にチェックポイント・ストア・送信バッファへ
+                for result in check_pool.imap(remaining):
+                    url = result.item
+                    print(f"[check] {len(results) + 1}/{len(tracking_list)} {url}")
+                    if result.error is not None:
+                        print(f"[error] Failed to check {url}: {result.error}")
+                        continue
+
+                    is_hit = bool(result.value)
+                    METRICS.count("checks")
+                    results[url] = is_hit
+                    if checkpoint:
+                        checkpoint.record(url, is_hit)
+                    if store:
+                        store.record_tracking(normalize_url(url), is_hit, run_id)
+
+                    if is_hit:
+                        hit_count += 1
+                        print(f"  -> HIT! {titles.get(url, '')}")
+                    else:
+                        print(f"  -> miss {titles.get(url, '')}")
+
+                    uploader.add(url, is_hit)
+            finally:
+                check_pool.close()
+                governor.set_phase(None)
+                if lease:
+                    lease.close()
 
-            # 待機（2-4秒）
-            time.sleep(random.uniform(2, 4))
+        # 残りを送信
+        uploader.flush()
+        completed = uploader.pending == 0
+    finally:
+        if checkpoint:
+            checkpoint.close(completed)
+        if store:
+            store.finish_run(run_id, len(results), 0, 0, (time.time() - start_time) / 60)
+            store.close()
 
-        browser.close()
+    if config.network_diet.enabled:
+        print(f"[network] {diet.summary()}")
+    if detector:
+        print(f"[balloon] {balloon_stats.summary()}")
+    if throttle.enabled:
+        print(f"[throttle] {throttle.summary()}")
+    if governor.enabled:
+        print(f"[memory] {governor.summary()}")
+    if METRICS.enabled:
+        METRICS.export(config.metrics, "tracker", run_id)
+        for line in METRICS.summary():
+            print(f"[metrics] {line}")
 
-    # 結果をGASに送信
-    print(f"[tracker] Sending results: {hit_count}/{len(tracking_list)} hits")
-    update_result = update_tracking_results(gas_url, results)
-    print(f"[tracker] Update result: {update_result}")
+    print(f"[tracker] Results: {hit_count}/{len(results)} hits, {uploader.sent} sent")
+    if not completed:
+        if checkpoint:
+            raise RuntimeError(
+                f"{uploader.pending} results were not sent; rerun today to resume from {config.tracker_checkpoint_path}"
+            )
+        raise RuntimeError(f"{uploader.pending} results were not sent")
 
     print(f"[tracker] Completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
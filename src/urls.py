@@ -0,0 +1,9 @@
+"""記事URLの正規化（ストア・フロンティア・検索API収集で共通のキー）"""
+
+
+def normalize_url(url: str) -> str:
+    if not url:
+        return ""
+    url = url.split("#", 1)[0]
+    url = url.split("?", 1)[0]
+    return url.rstrip("/")
@@ -0,0 +1,85 @@
+"""24h購入バルーンの早期判定（BalloonDetector）のテスト
+
+fixtures/balloon/*.json のページ状態の時系列（バルーン有無・描画完了）を
+疑似クロックで再生する。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_balloon_detector.py
+"""
+import json
+from pathlib import Path
+
+from src.balloon import BalloonDetector, BalloonStats
+
+FIXTURES = Path(__file__).parent / "fixtures" / "balloon"
+TIMEOUT_MS = 1500
+GRACE_MS = 300
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TimelinePage:
+    """page.evaluate の代わりに、疑似時刻時点のページ状態を返す"""
+
+    def __init__(self, timeline, clock: FakeClock):
+        self.timeline = timeline
+        self.clock = clock
+        self.evaluations = 0
+
+    def evaluate(self, script, arg=None):
+        self.evaluations += 1
+        elapsed_ms = self.clock.now * 1000
+        state = self.timeline[0]
+        for entry in self.timeline:
+            if entry["at_ms"] <= elapsed_ms:
+                state = entry
+        return {"balloon": state["balloon"], "settled": state["settled"]}
+
+
+def run_fixture(name: str, stats: BalloonStats):
+    fixture = json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+    clock = FakeClock()
+    page = TimelinePage(fixture["timeline"], clock)
+    detector = BalloonDetector(TIMEOUT_MS, grace_ms=GRACE_MS, stats=stats, clock=clock, sleep=clock.sleep)
+    return fixture["expected"], detector.detect(page), page
+
+
+def test_balloon_fixtures():
+    stats = BalloonStats()
+    names = sorted(path.name for path in FIXTURES.glob("*.json"))
+    assert names
+    for name in names:
+        expected, decision, page = run_fixture(name, stats)
+        assert decision.hit == expected["hit"], name
+        assert decision.reason == expected["reason"], name
+        if "max_elapsed_ms" in expected:
+            assert decision.elapsed_ms <= expected["max_elapsed_ms"], (name, decision.elapsed_ms)
+        if "min_elapsed_ms" in expected:
+            assert decision.elapsed_ms >= expected["min_elapsed_ms"], (name, decision.elapsed_ms)
+        # 上限を超えて待たない
+        assert decision.elapsed_ms <= TIMEOUT_MS + 100, name
+        print(f"[ok] {name}: {decision}  evaluations={page.evaluations}")
+
+    # 判定ごとの所要時間が理由別に集計される
+    assert sum(len(values) for values in stats.elapsed.values()) == len(names)
+    print(f"[stats] {stats.summary()}")
+
+
+def test_miss_is_faster_than_timeout():
+    _, decision, _ = run_fixture("miss.json", BalloonStats())
+    assert decision.elapsed_ms < TIMEOUT_MS / 2
+
+
+if __name__ == "__main__":
+    test_balloon_fixtures()
+    test_miss_is_faster_than_timeout()
+    print("[done] balloon detector tests passed")
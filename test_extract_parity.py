@@ -0,0 +1,178 @@
+"""ページ内一括抽出（extract_fields）と従来の extract_* の結果一致テスト
+
+URLを指定しなければ、記録済みの HAR（python -m src.bench record で作る data/har/note.har、
+無ければ fixtures/har/sample.har）を再生して確認する（note.com にはアクセスしない）。
+あわせて fixtures/extract/cascades.json の記事HTMLを page.set_content で読み込み、
+各候補リストのすべての分岐で両者が一致することを確かめる。
+Chromium を起動できない環境では skip になる。
+
+使い方:
+  python test_extract_parity.py                                # 記録済みの HAR で確認
+  python test_extract_parity.py https://note.com/xxx/n/nxxxx [url2 ...]   # note.com の記事で確認
+  python test_extract_parity.py --search                       # note.com の検索結果の先頭記事で確認
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from playwright.sync_api import sync_playwright
+
+from src.bench import DEFAULT_HAR_PATH, manifest_path
+from src.browser import new_context
+from src.extractor import ADAPTIVE_FIELDS, EXTRACT_SCRIPT, SELECTORS, extract_fields
+from src.replay import replay_context
+from src.main import (
+    SEARCH_URL_PAID_POPULAR,
+    extract_article_urls,
+    extract_author,
+    extract_author_url,
+    extract_created_at,
+    extract_high_rating,
+    extract_like_count,
+    extract_price,
+    extract_sales_claim,
+    extract_tags,
+    extract_title,
+)
+
+LEGACY_EXTRACTORS = {
+    "title": extract_title,
+    "author": extract_author,
+    "authorUrl": extract_author_url,
+    "likes": extract_like_count,
+    "highRating": extract_high_rating,
+    "price": extract_price,
+    "tags": extract_tags,
+    "createdAt": extract_created_at,
+    "salesClaim": extract_sales_claim,
+}
+
+
+FIXTURE_HAR_PATH = str(Path(__file__).parent / "fixtures" / "har" / "sample.har")
+CASES_PATH = Path(__file__).parent / "fixtures" / "extract" / "cascades.json"
+
+# 既定の順序では前の候補（.o-paywall .text-2xl）が必ず先に当たるため、値を返すページが作れないセレクタ
+UNREACHABLE_SELECTORS = {"pricePaywall": ["section.o-paywall span.text-2xl"]}
+
+
+def load_cases():
+    with open(CASES_PATH, encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+def case_html(case) -> str:
+    return (
+        f'<html><head><meta charset="utf-8"><title>{case["title"]}</title>{case["head"]}</head>'
+        f'<body>{case["body"]}</body></html>'
+    )
+
+
+def launch_chromium(p):
+    try:
+        return p.chromium.launch(headless=True)
+    except Exception as exc:
+        pytest.skip(f"Chromium not available: {exc}")
+
+
+def recorded_article_urls(har_path: str):
+    """HAR に記録された記事ページのURL（bench の記録なら manifest の順、無ければ HAR のHTML応答）"""
+    if os.path.exists(manifest_path(har_path)):
+        with open(manifest_path(har_path), encoding="utf-8") as f:
+            return json.load(f)["urls"]
+    with open(har_path, encoding="utf-8") as f:
+        entries = json.load(f).get("log", {}).get("entries", [])
+    return [
+        entry["request"]["url"]
+        for entry in entries
+        if entry["response"].get("status") == 200
+        and "/n/" in entry["request"]["url"]
+        and "text/html" in entry["response"].get("content", {}).get("mimeType", "")
+    ]
+
+
+def test_extract_parity(urls=None, har_path=None):
+    """urls が無ければ HAR を再生する（urls=["--search"] なら note.com の検索結果の先頭記事）"""
+    live = bool(urls)
+    if not live:
+        har_path = har_path or (DEFAULT_HAR_PATH if os.path.exists(DEFAULT_HAR_PATH) else FIXTURE_HAR_PATH)
+        if not os.path.exists(har_path):
+            pytest.skip("no HAR recording: extract comparison")
+        urls = recorded_article_urls(har_path)
+
+    with sync_playwright() as p:
+        browser = launch_chromium(p)
+        context = new_context(browser) if live else replay_context(browser, har_path)
+        page = context.new_page()
+        if not live:
+            print(f"[replay] {har_path} ({len(urls)} articles)")
+
+        if urls == ["--search"]:
+            page.goto(SEARCH_URL_PAID_POPULAR.format(keyword="副業"), wait_until="networkidle")
+            urls = extract_article_urls(page)[:10]
+
+        mismatches = 0
+        for url in urls:
+            page.goto(url, wait_until="domcontentloaded")
+            page.wait_for_timeout(1500)
+            fields = extract_fields(page)
+            for key, extractor in LEGACY_EXTRACTORS.items():
+                expected = extractor(page)
+                if fields[key] != expected:
+                    mismatches += 1
+                    print(f"[mismatch] {url} {key}: legacy={expected!r} evaluate={fields[key]!r}")
+            print(f"[checked] {url}")
+
+        browser.close()
+        print(f"[done] {len(urls)} articles, {mismatches} mismatches")
+        assert mismatches == 0
+
+
+def test_cascade_cases_cover_every_selector():
+    """記事HTMLの例が、各候補リストの全セレクタと「全候補が外れた」場合をひととおり含む"""
+    cases = load_cases()
+    for field in ADAPTIVE_FIELDS:
+        hit = {case["hits"][field] for case in cases if field in case["hits"]}
+        expected = set(SELECTORS[field]) - set(UNREACHABLE_SELECTORS.get(field, [])) | {None}
+        assert hit == expected, f"{field}: missing {sorted(expected - hit, key=str)}"
+
+
+def test_extract_parity_cascades():
+    """各分岐の記事HTMLで、extract_fields と従来の extract_* が一致し、想定したセレクタで値が取れる"""
+    cases = load_cases()
+    with sync_playwright() as p:
+        browser = launch_chromium(p)
+        page = browser.new_page()
+
+        failures = 0
+        for case in cases:
+            page.set_content(case_html(case))
+            fields = extract_fields(page)
+            hits = page.evaluate(EXTRACT_SCRIPT, SELECTORS)["selectorHits"]
+            for key, extractor in LEGACY_EXTRACTORS.items():
+                expected = extractor(page)
+                if fields[key] != expected:
+                    failures += 1
+                    print(f"[mismatch] {case['name']} {key}: legacy={expected!r} evaluate={fields[key]!r}")
+            for key, value in case["expected"].items():
+                if fields[key] != value:
+                    failures += 1
+                    print(f"[unexpected] {case['name']} {key}: {fields[key]!r} (expected {value!r})")
+            for key, selector in case["hits"].items():
+                if hits.get(key) != selector:
+                    failures += 1
+                    print(f"[unexpected] {case['name']} hit {key}: {hits.get(key)!r} (expected {selector!r})")
+
+        browser.close()
+        print(f"[done] {len(cases)} cascade cases, {failures} failures")
+        assert failures == 0
+
+
+if __name__ == "__main__":
+    test_cascade_cases_cover_every_selector()
+    for test in (lambda: test_extract_parity(sys.argv[1:]), test_extract_parity_cascades):
+        try:
+            test()
+        except pytest.skip.Exception as exc:
+            print(f"[skip] {exc.msg}")
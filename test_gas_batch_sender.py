@@ -0,0 +1,120 @@
+"""BatchSender（件数・経過時間での一括送信）のテスト
+
+ローカルの GAS 代替（LocalGas、receiver の recordBatch と同じ形で応答）に送る。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_gas_batch_sender.py
+"""
+import time
+
+from src.gas_client import BatchSender
+from src.replay import LocalGas
+
+
+def article(n):
+    return {"url": f"https://note.com/writer/n/n{n:012d}", "title": f"記事{n}"}
+
+
+def make_sender(gas, max_records, max_age_seconds=60):
+    outcomes = []
+    sender = BatchSender(
+        gas.url,
+        lambda payload, result, error: outcomes.append((payload["url"], result, error)),
+        max_records=max_records,
+        max_age_seconds=max_age_seconds,
+    )
+    return sender, outcomes
+
+
+def test_flush_by_count():
+    gas = LocalGas().start()
+    try:
+        sender, outcomes = make_sender(gas, max_records=3)
+        for n in range(2):
+            sender.add(article(n))
+        # まだ件数に届いていない
+        assert gas.requests == 0 and not outcomes
+        sender.add(article(2))
+        assert gas.requests == 1 and len(outcomes) == 3
+        sender.add(article(3))
+        sender.close()
+        # 残りは close で送る
+        assert gas.requests == 2
+        assert [url for url, _, _ in outcomes] == [article(n)["url"] for n in range(4)]
+    finally:
+        gas.close()
+
+
+def test_flush_by_age():
+    gas = LocalGas().start()
+    try:
+        sender, outcomes = make_sender(gas, max_records=10, max_age_seconds=0.05)
+        sender.add(article(0))
+        sender.flush_if_stale()
+        assert gas.requests == 0
+        time.sleep(0.06)
+        sender.flush_if_stale()
+        assert gas.requests == 1 and len(outcomes) == 1
+        # 古い1件があれば次の add で一緒に送る
+        sender.add(article(1))
+        time.sleep(0.06)
+        sender.add(article(2))
+        assert gas.requests == 2 and len(outcomes) == 3
+        sender.close()
+        assert gas.requests == 2
+    finally:
+        gas.close()
+
+
+def test_results_follow_input_order():
+    gas = LocalGas().start()
+    try:
+        sender, outcomes = make_sender(gas, max_records=3)
+        # 同じ記事（クエリ違い）は2件目から更新扱い
+        sender.add(article(0))
+        sender.add({**article(0), "url": article(0)["url"] + "?from=search"})
+        sender.add(article(1))
+        sender.close()
+        assert [error for _, _, error in outcomes] == [None] * 3
+        assert [result["isUpdate"] for _, result, _ in outcomes] == [False, True, False]
+        assert [result["recordCount"] for _, result, _ in outcomes] == [1, 2, 1]
+        assert [record["title"] for record in gas.records] == ["記事0", "記事0", "記事1"]
+    finally:
+        gas.close()
+
+
+def test_result_count_mismatch_fails_whole_batch():
+    gas = LocalGas().start()
+    try:
+        gas.short_results = 1
+        sender, outcomes = make_sender(gas, max_records=2)
+        sender.add(article(0))
+        sender.add(article(1))
+        sender.close()
+        # どの記事の結果か対応が付かないため、バッチ全体を失敗として通知する
+        assert [url for url, _, _ in outcomes] == [article(0)["url"], article(1)["url"]]
+        assert all(result is None and "Batch record failed" in str(error) for _, result, error in outcomes)
+    finally:
+        gas.close()
+
+
+def test_single_record_mode():
+    gas = LocalGas().start()
+    try:
+        sender, outcomes = make_sender(gas, max_records=1)
+        sender.add(article(0))
+        sender.add(article(0))
+        sender.close()
+        assert gas.requests == 2
+        assert [result["isUpdate"] for _, result, _ in outcomes] == [False, True]
+    finally:
+        gas.close()
+
+
+if __name__ == "__main__":
+    test_flush_by_count()
+    test_flush_by_age()
+    test_results_follow_input_order()
+    test_result_count_mismatch_fails_whole_batch()
+    test_single_record_mode()
+    print("[done] gas batch sender tests passed")
@@ -0,0 +1,183 @@
+"""BackgroundUploader（別スレッド送信・再送・スプール）のテスト
+
+ローカルの GAS 代替（LocalGas）に送る。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_gas_uploader.py
+"""
+import os
+import tempfile
+
+from src.gas_client import BackgroundUploader, GasRejectedError, SpooledError, UploadConfig
+from src.replay import LocalGas
+
+
+def article(n):
+    return {"url": f"https://note.com/writer/n/n{n:012d}", "title": f"記事{n}"}
+
+
+def upload(gas, payloads, spool_path, max_records=2, **overrides):
+    outcomes = []
+    config = UploadConfig(backoff_seconds=0.01, max_backoff_seconds=0.05, spool_path=spool_path, **overrides)
+    uploader = BackgroundUploader(
+        gas.url,
+        lambda payload, result, error: outcomes.append((payload["url"], result, error)),
+        max_records=max_records,
+        max_age_seconds=0.05,
+        config=config,
+    ).start()
+    for payload in payloads:
+        uploader.add(payload)
+    uploader.close()
+    return uploader, outcomes
+
+
+def test_retries_transient_failures():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            spool_path = os.path.join(tmp, "spool.jsonl")
+            # 最初の2回は 503 → バックオフして再送
+            gas.fail_posts = 2
+            uploader, outcomes = upload(gas, [article(n) for n in range(5)], spool_path)
+            assert [error for _, _, error in outcomes] == [None] * 5
+            assert [url for url, _, _ in outcomes] == [article(n)["url"] for n in range(5)]
+            assert uploader.retries == 2 and uploader.sent == 5 and uploader.spooled == 0
+            assert len(gas.records) == 5
+            assert not os.path.exists(spool_path)
+    finally:
+        gas.close()
+
+
+def test_spools_and_replays_first():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            spool_path = os.path.join(tmp, "spool.jsonl")
+            # 再送しても届かない → スプールへ（スクレイプのエラーにはしない）
+            gas.fail_posts = 10
+            uploader, outcomes = upload(gas, [article(n) for n in range(3)], spool_path, max_retries=1, max_records=1)
+            assert all(isinstance(error, SpooledError) for _, _, error in outcomes)
+            assert uploader.spooled == 3 and not gas.records
+            with open(spool_path, encoding="utf-8") as f:
+                assert len(f.readlines()) == 3
+
+            # 次の実行: スプールの分を先に送る
+            gas.fail_posts = 0
+            uploader, outcomes = upload(gas, [article(9)], spool_path)
+            assert [url for url, _, _ in outcomes] == [article(n)["url"] for n in (0, 1, 2, 9)]
+            assert uploader.replayed == 3 and uploader.sent == 4
+            assert [record["title"] for record in gas.records] == ["記事0", "記事1", "記事2", "記事9"]
+            assert not os.path.exists(spool_path) and not os.path.exists(spool_path + ".replaying")
+    finally:
+        gas.close()
+
+
+def test_success_false_is_retried_then_spooled():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            spool_path = os.path.join(tmp, "spool.jsonl")
+            # HTTP 200 の success:false（ロック待ちのタイムアウトなど）も再送する
+            gas.reject_posts = 1
+            uploader, outcomes = upload(gas, [article(n) for n in range(2)], spool_path)
+            assert [error for _, _, error in outcomes] == [None, None]
+            assert uploader.retries == 1 and len(gas.records) == 2
+
+            # 続けば失わずにスプールへ
+            gas.reject_posts = 10
+            uploader, outcomes = upload(gas, [article(n) for n in range(2, 4)], spool_path, max_retries=1)
+            assert all(isinstance(error, SpooledError) for _, _, error in outcomes)
+            assert uploader.spooled == 2
+
+            # スプールの再送中に失敗しても .replaying と一緒に消さない
+            gas.reject_posts = 10
+            uploader, outcomes = upload(gas, [], spool_path, max_retries=1)
+            assert uploader.replayed == 2 and uploader.spooled == 2
+            with open(spool_path, encoding="utf-8") as f:
+                assert len(f.readlines()) == 2
+            assert not os.path.exists(spool_path + ".replaying")
+
+            gas.reject_posts = 0
+            uploader, outcomes = upload(gas, [], spool_path)
+            assert uploader.sent == 2 and len(gas.records) == 4
+            assert not os.path.exists(spool_path)
+    finally:
+        gas.close()
+
+
+def test_retries_do_not_record_twice():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            spool_path = os.path.join(tmp, "spool.jsonl")
+            # 行を書いた後に success:false → 同じ batchId で再送し、receiver は前回の結果を返す
+            gas.fail_after_apply = 1
+            uploader, outcomes = upload(gas, [article(n) for n in range(2)], spool_path)
+            assert [error for _, _, error in outcomes] == [None, None]
+            assert uploader.retries == 1 and len(gas.records) == 2
+            assert all(result["duplicate"] and result["recordCount"] == 1 for _, result, _ in outcomes)
+
+            # 再送しきれずにスプールへ回った分も、次回は同じ batchId で送るので重複しない
+            gas.fail_after_apply = 10
+            uploader, outcomes = upload(gas, [article(n) for n in range(2, 4)], spool_path, max_retries=1)
+            assert uploader.spooled == 2 and len(gas.records) == 4
+            gas.fail_after_apply = 0
+            uploader, outcomes = upload(gas, [], spool_path)
+            assert uploader.replayed == 2 and len(gas.records) == 4
+            assert all(result["duplicate"] for _, result, _ in outcomes)
+    finally:
+        gas.close()
+
+
+def test_old_receiver_success_false_is_not_retried():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # batchId を返さない receiver では、行を書いた後の失敗かもしれないので再送しない
+            gas.legacy_receiver = True
+            gas.reject_posts = 1
+            uploader, outcomes = upload(gas, [article(n) for n in range(2)], os.path.join(tmp, "spool.jsonl"))
+            assert all(isinstance(error, GasRejectedError) for _, _, error in outcomes)
+            assert uploader.retries == 0 and uploader.spooled == 0 and not gas.records
+    finally:
+        gas.close()
+
+
+def test_rejected_spool_batch_is_set_aside():
+    gas = LocalGas().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            spool_path = os.path.join(tmp, "spool.jsonl")
+            gas.fail_posts = 10
+            upload(gas, [article(n) for n in range(2)], spool_path, max_retries=0)
+            gas.fail_posts = 0
+
+            # 再送できない失敗が spool_max_attempts 回続くまではスプールに戻す
+            gas.legacy_receiver = True
+            gas.reject_posts = 10
+            uploader, outcomes = upload(gas, [], spool_path, spool_max_attempts=2)
+            assert uploader.spooled == 2 and uploader.rejected == 0
+
+            uploader, outcomes = upload(gas, [], spool_path, spool_max_attempts=2)
+            assert uploader.spooled == 0 and uploader.rejected == 2
+            assert all(isinstance(error, GasRejectedError) for _, _, error in outcomes)
+            assert not os.path.exists(spool_path) and not os.path.exists(spool_path + ".replaying")
+            with open(spool_path + ".rejected", encoding="utf-8") as f:
+                assert len(f.readlines()) == 2
+
+            # 次の実行では送らない
+            uploader, outcomes = upload(gas, [], spool_path, spool_max_attempts=2)
+            assert uploader.replayed == 0 and not outcomes
+    finally:
+        gas.close()
+
+
+if __name__ == "__main__":
+    test_retries_transient_failures()
+    test_spools_and_replays_first()
+    test_success_false_is_retried_then_spooled()
+    test_retries_do_not_record_twice()
+    test_old_receiver_success_false_is_not_retried()
+    test_rejected_spool_batch_is_set_aside()
+    print("[done] gas uploader tests passed")
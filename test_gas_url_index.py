@@ -0,0 +1,317 @@
+"""GAS receiver の URLインデックス（gas/receiver/Code.js の openUrlIndex_）のテスト
+
+Code.js を node で実行し、SpreadsheetApp などをメモリ上のシートで置き換えて 10万行の記録シートに
+一括記録する。記録数・トラッキング行が rebuildUrlIndex() で作り直した結果と一致することと、
+シートAPIの呼び出し回数（URLごとに検索・書き込みしていないこと）を確認する。node が無い場合は skip になる。
+ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_gas_url_index.py
+"""
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+RECEIVER_PATH = Path(__file__).parent / "gas" / "receiver" / "Code.js"
+
+RECORD_ROWS = 100_000
+UNIQUE_URLS = 60_000
+SPECIAL_URL = "https://note.com/user1/n/nspecial?a=1+2(3)"
+
+# メモリ上のシートで SpreadsheetApp / LockService / Utilities を置き換え、Code.js を読み込んで
+# 標準入力のシナリオ（seed: 記録シートの URL 列、tracking: トラッキングシートの行、batch: 記録する記事、
+# batchId・repeat: 同じ一括記録IDで送る回数、failTracking: 行を書いた後に1回失敗させる、
+# invalidate: 最後に invalidateUrlIndex でインデックスを削除する）を実行する
+NODE_SCRIPT = r"""
+const fs = require('fs');
+const vm = require('vm');
+
+const calls = {};
+const locks = [];  // スクリプトロックの取得・解放とインデックスの削除の順序
+const count = (sheet, method) => {
+  const key = sheet.name + '.' + method;
+  calls[key] = (calls[key] || 0) + 1;
+};
+const blank = (value) => value === '' || value === undefined || value === null;
+
+class FakeSheet {
+  constructor(name) { this.name = name; this.data = []; }
+  getName() { return this.name; }
+  getLastRow() {
+    count(this, 'getLastRow');
+    let n = this.data.length;
+    while (n > 0 && this.data[n - 1].every(blank)) n--;
+    return n;
+  }
+  getLastColumn() {
+    count(this, 'getLastColumn');
+    return this.data.reduce((max, row) => {
+      let n = row.length;
+      while (n > 0 && blank(row[n - 1])) n--;
+      return Math.max(max, n);
+    }, 0);
+  }
+  getRange(row, column, numRows, numColumns) {
+    if (row < 1 || column < 1) throw new Error('Range out of bounds: ' + row + ',' + column);
+    return new FakeRange(this, row, column, numRows || 1, numColumns || 1);
+  }
+  clearContents() { count(this, 'clearContents'); this.data = []; }
+  deleteRows(start, n) { count(this, 'deleteRows'); this.data.splice(start - 1, n); }
+  hideSheet() {}
+  setColumnWidth() {}
+  setFrozenRows() {}
+  cell(row, column) {
+    const values = this.data[row - 1];
+    return values && !blank(values[column - 1]) ? values[column - 1] : '';
+  }
+  put(row, column, value) {
+    while (this.data.length < row) this.data.push([]);
+    const values = this.data[row - 1];
+    while (values.length < column - 1) values.push('');
+    values[column - 1] = value;
+  }
+}
+
+class FakeRange {
+  constructor(sheet, row, column, numRows, numColumns) {
+    Object.assign(this, { sheet, row, column, numRows, numColumns });
+  }
+  getRow() { return this.row; }
+  getValues() {
+    count(this.sheet, 'getValues');
+    const values = [];
+    for (let r = 0; r < this.numRows; r++) {
+      const row = [];
+      for (let c = 0; c < this.numColumns; c++) row.push(this.sheet.cell(this.row + r, this.column + c));
+      values.push(row);
+    }
+    return values;
+  }
+  setValues(values) {
+    count(this.sheet, 'setValues');
+    if (values.length !== this.numRows || values.some(row => row.length !== this.numColumns)) {
+      throw new Error('The number of rows or columns in the data does not match the range');
+    }
+    values.forEach((row, r) => row.forEach((value, c) => this.sheet.put(this.row + r, this.column + c, value)));
+    return this;
+  }
+  getValue() { return this.getValues()[0][0]; }
+  setValue(value) { return this.setValues([[value]]); }
+  setFormulasR1C1(formulas) { count(this.sheet, 'setFormulasR1C1'); return this.setValues(formulas); }
+  clearContent() { return this.setValues(this.getValues().map(row => row.map(() => ''))); }
+  setFontWeight() { return this; }
+  setBackground() { return this; }
+  setFontColor() { return this; }
+  createFilter() { return this; }
+  createTextFinder(text) { count(this.sheet, 'createTextFinder'); return new FakeTextFinder(this, text); }
+}
+
+class FakeTextFinder {
+  constructor(range, text) {
+    Object.assign(this, { range, text, caseSensitive: false, entireCell: false, regex: false });
+  }
+  matchCase(value) { this.caseSensitive = value; return this; }
+  matchEntireCell(value) { this.entireCell = value; return this; }
+  useRegularExpression(value) { this.regex = value; return this; }
+  matches(cell) {
+    const text = String(cell);
+    const flags = this.caseSensitive ? '' : 'i';
+    if (this.regex) {
+      return new RegExp(this.entireCell ? '^(?:' + this.text + ')$' : this.text, flags).test(text);
+    }
+    const [a, b] = this.caseSensitive ? [text, this.text] : [text.toLowerCase(), this.text.toLowerCase()];
+    return this.entireCell ? a === b : a.includes(b);
+  }
+  findAll() {
+    count(this.range.sheet, 'findAll');
+    const found = [];
+    const { sheet, row, column, numRows, numColumns } = this.range;
+    for (let r = row; r < row + numRows; r++) {
+      for (let c = column; c < column + numColumns; c++) {
+        const cell = sheet.cell(r, c);
+        if (cell !== '' && this.matches(cell)) found.push(sheet.getRange(r, c));
+      }
+    }
+    return found;
+  }
+  findNext() { return this.findAll()[0] || null; }
+}
+
+const sheets = new Map();
+const spreadsheet = {
+  getSheetByName: (name) => sheets.get(name) || null,
+  insertSheet: (name) => { const sheet = new FakeSheet(name); sheets.set(name, sheet); return sheet; },
+  deleteSheet: (sheet) => { locks.push('delete ' + sheet.getName()); sheets.delete(sheet.getName()); }
+};
+const pad = (n) => String(n).padStart(2, '0');
+const context = {
+  console,
+  SpreadsheetApp: { getActiveSpreadsheet: () => spreadsheet },
+  LockService: { getScriptLock: () => ({ waitLock() { locks.push('wait'); }, releaseLock() { locks.push('release'); } }) },
+  Logger: { log() {} },
+  Utilities: {
+    formatDate: (date, timeZone, format) => format
+      .replace('yyyy', date.getUTCFullYear())
+      .replace('MM', pad(date.getUTCMonth() + 1))
+      .replace('dd', pad(date.getUTCDate()))
+      .replace('HH', pad(date.getUTCHours()))
+      .replace('mm', pad(date.getUTCMinutes()))
+      .replace('ss', pad(date.getUTCSeconds()))
+  }
+};
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(process.argv[1], 'utf8'), context, { filename: 'Code.js' });
+
+const scenario = JSON.parse(fs.readFileSync(0, 'utf8'));
+const records = context.initializeSheet();
+scenario.seed.forEach((url, i) => {
+  records.data.push(['2026/01/01 00:00:00', '', 't' + i, 'author', '', url, 0, 0, 0, '', '', '']);
+});
+const tracking = context.initializeTrackingSheet();
+scenario.tracking.forEach(row => tracking.data.push(row));
+context.rebuildUrlIndex();
+const indexSheet = sheets.get('_URLインデックス');
+
+const snapshot = () => Object.fromEntries(indexSheet.data.slice(1).map(([url, n, row]) => [url, [Number(n) || 0, Number(row) || 0]]));
+const before = snapshot();
+if (scenario.failTracking) {
+  // 行を書いた後の失敗（実行時間の上限など）: 最初の1回だけトラッキングへの追加で例外
+  const addToTracking = context.addToTracking;
+  let failed = false;
+  context.addToTracking = (...args) => {
+    if (!failed) { failed = true; throw new Error('Exceeded maximum execution time'); }
+    return addToTracking(...args);
+  };
+}
+for (const key of Object.keys(calls)) delete calls[key];
+// doPost と同じく、例外は success:false として扱う
+const post = () => {
+  try { return context.recordArticles(scenario.batch, scenario.batchId); } catch (error) { return { error: error.message }; }
+};
+const results = post();
+const used = Object.assign({}, calls);
+const repeated = [];
+for (let i = 1; i < (scenario.repeat || 1); i++) repeated.push(post());
+const recordRows = records.getLastRow() - 1;
+const index = snapshot();
+context.rebuildUrlIndex();
+const rebuilt = snapshot();
+const invalidated = scenario.invalidate ? context.invalidateUrlIndex() : null;
+process.stdout.write(JSON.stringify({ results, repeated, recordRows, calls: used, before, index, rebuilt, invalidated, locks }));
+"""
+
+
+def seed_urls():
+    """記録シートの URL 列（UNIQUE_URLS 種類、先頭の記事ほど2回記録されている）"""
+    urls = [f"https://note.com/user{i % UNIQUE_URLS % 7}/n/n{i % UNIQUE_URLS}" for i in range(RECORD_ROWS - 1)]
+    urls.append(SPECIAL_URL)
+    return urls
+
+
+def require_node() -> str:
+    node = shutil.which("node")
+    if not node:
+        pytest.skip("node not found: GAS URL index emulation")
+    return node
+
+
+def run_scenario(node, seed, tracking, batch, **options):
+    completed = subprocess.run(
+        [node, "-e", NODE_SCRIPT, str(RECEIVER_PATH)],
+        input=json.dumps({"seed": seed, "tracking": tracking, "batch": batch, **options}, ensure_ascii=False),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def test_batch_updates_index_without_per_url_calls():
+    node = require_node()
+    seed = seed_urls()
+    tracked = seed[UNIQUE_URLS - 50]
+    tracking = [[tracked, "tracked", "author", 100, "2026/01/01", "2026/01/15", 0, 1, "2026/01/01", "追跡中", "", ""]]
+    # 直近の記事（インデックスの末尾付近）の再記録が中心で、古い記事・新規・特殊文字入りのURLが混ざるバッチ
+    existing = [seed[UNIQUE_URLS - 300 + 25 * i] for i in range(8)] + [seed[100], seed[30000], SPECIAL_URL, tracked]
+    new = [f"https://note.com/new/n/nnew{i}" for i in range(7)]
+    urls = existing + new + [existing[0]]
+    batch = [
+        {"url": url, "title": f"title{i}", "author": "author", "price": 100, "purchased24h": i % 5 == 0 or url == tracked}
+        for i, url in enumerate(urls)
+    ]
+    assert len(batch) == 20
+
+    out = run_scenario(node, seed, tracking, batch)
+
+    counts = {}
+    for url in seed:
+        counts[url] = counts.get(url, 0) + 1
+    for record, result in zip(batch, out["results"]):
+        counts[record["url"]] = counts.get(record["url"], 0) + 1
+        assert result["success"]
+        assert result["recordCount"] == counts[record["url"]], (record["url"], result)
+        assert result["isUpdate"] == (counts[record["url"]] > 1)
+    # 追跡中の記事はトラッキングに追加し直さない
+    assert not out["results"][urls.index(tracked)]["trackingAdded"]
+    assert out["index"][tracked][1] == 2
+
+    # 1回の実行で付け足したインデックスが、全件から作り直したものと一致する
+    assert len(out["before"]) == UNIQUE_URLS + 1
+    assert out["index"] == out["rebuilt"]
+
+    calls = out["calls"]
+    index_calls = {key: n for key, n in calls.items() if key.startswith("_URLインデックス.")}
+    # URLの検索は1回、既存行の読み書きは近い行ごと（直近の記事・古い記事2件・特殊文字のURL・追跡中の記事）
+    assert index_calls.get("_URLインデックス.createTextFinder") == 1, index_calls
+    assert index_calls.get("_URLインデックス.getValues", 0) <= 4, index_calls
+    assert index_calls.get("_URLインデックス.setValues", 0) <= 5, index_calls
+    assert sum(index_calls.values()) <= 12, index_calls
+    assert sum(calls.values()) < 40, calls
+
+
+def test_first_batch_on_empty_sheets():
+    node = require_node()
+    batch = [{"url": f"https://note.com/a/n/n{i % 3}", "purchased24h": i == 0} for i in range(5)]
+    out = run_scenario(node, [], [], batch)
+    assert [r["recordCount"] for r in out["results"]] == [1, 1, 1, 2, 2]
+    assert out["index"] == out["rebuilt"]
+    assert out["index"]["https://note.com/a/n/n0"] == [2, 2]
+
+
+def test_batch_id_applied_once():
+    node = require_node()
+    batch = [{"url": f"https://note.com/a/n/n{i}", "purchased24h": i == 0} for i in range(3)]
+    out = run_scenario(node, [], [], batch, batchId="b1", repeat=2)
+    assert out["recordRows"] == 3
+    assert [r["recordCount"] for r in out["repeated"][0]] == [1, 1, 1]
+    assert all(r["duplicate"] for r in out["repeated"][0])
+
+    # 行を書いた後に失敗しても、同じIDの再送では行を追加しない
+    out = run_scenario(node, [], [], batch, batchId="b2", repeat=2, failTracking=True)
+    assert out["results"] == {"error": "Exceeded maximum execution time"}
+    assert out["recordRows"] == 3
+    assert [r["row"] for r in out["repeated"][0]] == [2, 3, 4]
+    assert all(r["duplicate"] and r["isUpdate"] for r in out["repeated"][0])
+
+
+def test_invalidate_holds_script_lock():
+    node = require_node()
+    out = run_scenario(node, [], [], [{"url": "https://note.com/a/n/n0"}], invalidate=True)
+    assert out["invalidated"] == {"success": True, "deleted": True}
+    # 記録（recordArticles）と同じスクリプトロックを取ってから削除する
+    assert out["locks"][-3:] == ["wait", "delete _URLインデックス", "release"]
+
+
+if __name__ == "__main__":
+    try:
+        test_batch_updates_index_without_per_url_calls()
+        test_first_batch_on_empty_sheets()
+        test_batch_id_applied_once()
+        test_invalidate_holds_script_lock()
+    except pytest.skip.Exception as exc:
+        print(f"[skip] {exc.msg}")
+    print("[done] GAS URL index tests passed")
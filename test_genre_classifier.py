@@ -0,0 +1,136 @@
+"""ジャンル分類（src/genre.py）のテスト
+
+GAS organizer の detectGenre（Main.js）を node で実行した結果と突き合わせる。node が無い場合はその部分が skip になる。
+ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_genre_classifier.py
+"""
+import json
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from src.genre import (
+    GAS_RULES_PATH,
+    GenreClassifier,
+    PatternAutomaton,
+    detect_genre_reference,
+    load_genre_rules,
+    render_gas_rules,
+    sample_records,
+)
+
+ORGANIZER_DIR = Path(GAS_RULES_PATH).parent
+
+# GenreRules.js・Config.js・Main.js を同じコンテキストで読み込み、標準入力の各行を detectGenre にかける
+NODE_SCRIPT = """
+const fs = require('fs');
+const vm = require('vm');
+const context = {};
+vm.createContext(context);
+for (const file of ['GenreRules.js', 'Config.js', 'Main.js']) {
+  vm.runInContext(fs.readFileSync(process.argv[1] + '/' + file, 'utf8'), context, { filename: file });
+}
+context.cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+vm.runInContext('this.genres = cases.map(c => detectGenre(c[0], c[1], c[2]))', context);
+process.stdout.write(JSON.stringify(context.genres));
+"""
+
+
+def edge_cases(rules):
+    """キーワード・著者名そのもの、重なり・組み合わせ、空・数値など"""
+    rng = random.Random(1)
+    words = [word for genre in rules.priority for word in rules.keywords(genre)]
+    names = [name for genre in rules.authors for name in rules.author_names(genre)]
+    cases = [
+        [None, None, None],
+        ["", "", ""],
+        [0, 0, 0],
+        [12345, 2024.0, False],
+        [True, "true", None],
+        ["", "", "  "],
+        ["その他", "", ""],
+    ]
+    for word in words:
+        cases.append([word, "", ""])
+        cases.append(["", f"【{word}】", ""])
+        # 大文字小文字は区別する
+        cases.append([word.lower(), word.upper(), ""])
+        # 前後を削ったもの（別のキーワードの一部に当たる）
+        cases.append(["", word[1:], word[:-1]])
+    for name in names:
+        cases.append(["", "", name])
+        cases.append([rng.choice(words), rng.choice(words), f"{name}｜note"])
+    for _ in range(2000):
+        picked = rng.sample(words, rng.randint(1, 4))
+        tags = ",".join(picked[: rng.randint(0, len(picked))])
+        title = "".join(rng.sample(picked, len(picked)))
+        cases.append([tags, title, rng.choice(names) if rng.random() < 0.05 else "著者"])
+    return cases
+
+
+def test_matches_gas_detect_genre():
+    node = shutil.which("node")
+    if not node:
+        pytest.skip("node not found: GAS detectGenre comparison")
+    rules = load_genre_rules()
+    classifier = GenreClassifier(rules)
+    cases = edge_cases(rules)
+    cases += [[r["tags"], r["title"], r["author"]] for r in sample_records(rules, 3000, seed=7)]
+    completed = subprocess.run(
+        [node, "-e", NODE_SCRIPT, str(ORGANIZER_DIR)],
+        input=json.dumps(cases, ensure_ascii=False),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+    expected = json.loads(completed.stdout)
+    actual = [classifier.classify(*case) for case in cases]
+    mismatches = [(case, a, e) for case, a, e in zip(cases, actual, expected) if a != e]
+    assert not mismatches, mismatches[:5]
+
+
+def test_matches_reference_in_batches():
+    rules = load_genre_rules()
+    classifier = GenreClassifier(rules)
+    records = sample_records(rules, 5000, seed=3)
+    # 同じ組が繰り返されても結果は変わらない
+    records += records[:500]
+    expected = [detect_genre_reference(rules, r["tags"], r["title"], r["author"]) for r in records]
+    assert classifier.classify_many(records) == expected
+    assert classifier.classify_record({"title": "ChatGPTで新NISA"}) == "投資・金融"
+    assert classifier.classify_record({}) == "その他"
+
+
+def test_automaton_prefers_lowest_value():
+    automaton = PatternAutomaton([("she", 2), ("he", 1), ("hers", 0), ("x", 3)], none=9)
+    assert automaton.best("ushers") == 0
+    assert automaton.best("ushe") == 1
+    assert automaton.best("sh") == 9
+    assert automaton.best("xsh") == 3
+    # 空のパターンはどの文字列にも含まれる（JS の ''.includes('') と同じ）
+    assert PatternAutomaton([("", 4), ("ab", 1)], none=9).best("") == 4
+
+
+def test_gas_rules_file_is_generated():
+    rules = load_genre_rules()
+    assert Path(GAS_RULES_PATH).read_text(encoding="utf-8") == render_gas_rules(rules), (
+        "GenreRules.js is stale: run python -m src.genre sync-gas"
+    )
+    assert set(rules.genres) <= set(rules.priority)
+
+
+if __name__ == "__main__":
+    try:
+        test_matches_gas_detect_genre()
+    except pytest.skip.Exception as exc:
+        print(f"[skip] {exc.msg}")
+    test_matches_reference_in_batches()
+    test_automaton_prefers_lowest_value()
+    test_gas_rules_file_is_generated()
+    print("[done] genre classifier tests passed")
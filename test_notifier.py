@@ -0,0 +1,101 @@
+"""Slack通知の送信スレッド（まとめ送り・進捗の定期通知）のテスト
+
+ローカルのWebhook代替に送る。ネットワーク不要。
+
+使い方:
+  python test_notifier.py
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.notifier import NotifierConfig, RunProgress, SlackNotifier
+
+
+class LocalWebhook:
+    """受け取ったテキストを texts に保持する。delay 秒待ってから応答する（遅いWebhook）"""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.texts = []
+        hook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                hook.texts.append(json.loads(self.rfile.read(length))["text"])
+                time.sleep(hook.delay)
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}/hook"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def test_non_blocking_and_coalesced():
+    hook = LocalWebhook(delay=1.0)
+    notifier = SlackNotifier()
+    try:
+        config = NotifierConfig(background=True, coalesce_seconds=0.2, heartbeat_minutes=0)
+        notifier.configure(config, webhook_url=hook.url)
+        started = time.monotonic()
+        for n in range(3):
+            assert notifier.post(f"message {n}", "info")
+        # 遅いWebhookでも呼び出し元は待たない
+        assert time.monotonic() - started < 0.1
+        notifier.close()
+        assert hook.texts == ["ℹ️ message 0\n\nℹ️ message 1\n\nℹ️ message 2"]
+        assert notifier.sent == 1
+    finally:
+        hook.close()
+
+
+def test_heartbeat_reports_progress():
+    hook = LocalWebhook()
+    notifier = SlackNotifier()
+    progress = RunProgress(total_keywords=4)
+    progress.keywords_done = 4
+    progress.start_articles(100)
+    progress.articles_done = 10
+    progress.errors = 1
+    try:
+        config = NotifierConfig(background=True, coalesce_seconds=0, min_interval_seconds=0, heartbeat_minutes=0.002)
+        notifier.configure(config, webhook_url=hook.url)
+        notifier.start_heartbeat(progress.summary)
+        deadline = time.monotonic() + 5
+        while not hook.texts and time.monotonic() < deadline:
+            time.sleep(0.05)
+        notifier.close()
+        text = hook.texts[0]
+        assert text.startswith("⏳ 進捗")
+        assert "• キーワード: 4/4" in text
+        assert "• 記事: 10/100（" in text and "件/分、残り約" in text
+        assert "• エラー率: 10.0%（1件）" in text
+    finally:
+        hook.close()
+
+
+def test_disabled_without_webhook():
+    notifier = SlackNotifier()
+    notifier.configure(NotifierConfig(), webhook_url="")
+    assert not notifier.running
+    notifier.close()
+
+
+if __name__ == "__main__":
+    test_non_blocking_and_coalesced()
+    test_heartbeat_reports_progress()
+    test_disabled_without_webhook()
+    print("[done] notifier tests passed")
@@ -0,0 +1,207 @@
+"""再生ハーネス（HarFetcher・LocalGas・CallCounter）のテスト
+
+保存済みの HAR（fixtures/har/sample.har）とローカルの GAS 代替を使う。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_replay_harness.py
+"""
+import os
+import tempfile
+from pathlib import Path
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from src.gas_client import send_batch_to_gas, send_to_gas
+from src.replay import CallCounter, HarFetcher, LocalGas, load_har_documents
+from src.static_fetch import FIELD_DEFAULTS, FIELDS, merge_fields, missing_fields, parse_article_html
+from src.tracker import (
+    ResultUploader,
+    TrackerCheckpoint,
+    check_purchased_24h,
+    get_tracking_list,
+    update_tracking_results,
+)
+
+HAR_PATH = str(Path(__file__).parent / "fixtures" / "har" / "sample.har")
+
+
+def test_har_fetcher():
+    # 記事ページのHTMLのみ（検索API・404は含まない）。base64 の本文も読める
+    documents = load_har_documents(HAR_PATH)
+    assert sorted(documents) == [
+        "https://note.com/ai_guide/n/n9f8e7d6c5b4a",
+        "https://note.com/sample_writer/n/n1a2b3c4d5e6f",
+    ]
+
+    fetcher = HarFetcher(HAR_PATH)
+    fields = fetcher.fetch("https://note.com/sample_writer/n/n1a2b3c4d5e6f")
+    assert fields["title"] == "副業の始め方"
+    assert fields["author"] == "サンプル書き手"
+    assert fields["createdAt"] == "2024-05-01T20:00:00+09:00"
+    assert fetcher.fetch("https://note.com/ai_guide/n/n9f8e7d6c5b4a")["title"] == "AI活用ガイド"
+    assert fetcher.fetch("https://note.com/gone_writer/n/n000000000000") == {}
+
+
+def test_field_sources():
+    static = HarFetcher(HAR_PATH).fetch("https://note.com/sample_writer/n/n1a2b3c4d5e6f")
+    fields, sources = merge_fields(static, {"highRating": 3}, {"likes": 12, "title": "検索APIのタイトル"})
+    assert sources["title"] == "static" and fields["title"] == "副業の始め方"
+    assert sources["likes"] == "search" and fields["likes"] == 12
+    assert sources["highRating"] == "browser"
+    # どこからも取れなかった項目は既定値（HTMLから取れたことにはしない）
+    missing = [field for field in FIELDS if field not in static and field not in ("likes", "highRating")]
+    assert missing
+    assert all(sources[field] == "default" and fields[field] == FIELD_DEFAULTS[field] for field in missing)
+
+
+def test_local_gas():
+    urls = ["https://note.com/sample_writer/n/n1a2b3c4d5e6f", "https://note.com/ai_guide/n/n9f8e7d6c5b4a"]
+    gas = LocalGas(tracking_urls=urls).start()
+    try:
+        # 本番と同じクライアント関数で receiver と同じ形の応答を受け取る
+        assert send_to_gas(gas.url, {"url": urls[0]})["isUpdate"] is False
+        results = send_batch_to_gas(gas.url, [{"url": urls[0] + "?from=search"}, {"url": urls[1]}])
+        assert [result["isUpdate"] for result in results] == [True, False]
+        assert results[0]["recordCount"] == 2
+
+        assert [item["url"] for item in get_tracking_list(gas.url)] == urls
+        assert update_tracking_results(gas.url, {urls[0]: True})["updated"] == 1
+        assert gas.tracking_updates == {urls[0]: True}
+        assert len(gas.records) == 3
+        assert gas.requests == 4
+    finally:
+        gas.close()
+
+
+def test_tracking_results_applied_once():
+    urls = ["https://note.com/sample_writer/n/n1a2b3c4d5e6f", "https://note.com/ai_guide/n/n9f8e7d6c5b4a"]
+    gas = LocalGas(tracking_urls=urls).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.jsonl")
+            checkpoint = TrackerCheckpoint(path, "2026-10-17").open()
+            checkpoint.record(urls[0], True)
+            checkpoint.record(urls[1], False)
+            # 1回目の送信は GAS に届いたが、応答前に落ちた（送信済みに記録されていない）
+            assert update_tracking_results(gas.url, checkpoint.pending(), checkpoint.run_id)["updated"] == 2
+            checkpoint.close(completed=False)
+
+            # 同じ日の再開: 同じ実行IDで送り直すので二重に数えない
+            resumed = TrackerCheckpoint(path, "2026-10-17").open()
+            assert resumed.run_id == checkpoint.run_id
+            uploader = ResultUploader(gas.url, 10, resumed)
+            for url, hit in resumed.pending().items():
+                uploader.add(url, hit)
+            uploader.flush()
+            assert uploader.sent == 2 and not uploader.pending
+            assert gas.tracking_checks == {urls[0]: 1, urls[1]: 1}
+            resumed.close(completed=True)
+
+            # success:false の応答は送信済みにしない
+            gas.reject_posts = 1
+            uploader = ResultUploader(gas.url, 10, None)
+            uploader.add(urls[0], True)
+            uploader.flush()
+            assert uploader.sent == 0 and uploader.pending == 1
+            uploader.flush()
+            assert uploader.sent == 1 and gas.tracking_checks[urls[0]] == 2
+
+            # chunk_size 0 は従来通り最後にまとめて送信
+            uploader = ResultUploader(gas.url, 0, None)
+            for url in urls[:2]:
+                uploader.add(url, False)
+            assert uploader.sent == 0 and uploader.pending == 2
+            uploader.flush()
+            assert uploader.sent == 2
+    finally:
+        gas.close()
+
+
+class FakeLocator:
+    def count(self):
+        return 3
+
+
+FakeLocator.__module__ = "playwright._impl.fake"
+
+
+class FakePage:
+    def goto(self, url, wait_until=None):
+        return None
+
+    def locator(self, selector):
+        return FakeLocator()
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return False
+
+
+def test_call_counter():
+    page = CallCounter(FakePage())
+    page.goto("https://note.com/")
+    page.on("response", print)
+    assert page.is_closed() is False
+    # Playwright オブジェクトを返すと包んで、その先の呼び出しも数える
+    assert page.locator("a").count() == 3
+    assert page.counts == {"goto": 1, "locator": 1, "count": 1}
+    assert page.total == 3
+
+
+def test_static_html_resolves_absent_fields():
+    url = "https://note.com/sample_writer/n/n1a2b3c4d5e6f"
+    header = '<div class="o-noteContentHeader"><div class="o-noteContentHeader__name"><a href="/sample_writer">書き手</a></div></div>'
+    footer = '<div class="o-noteLikeV3"><span class="o-noteLikeV3__count">12</span></div>'
+    body = '<h1 class="o-noteContentText__title">無料の記事</h1>'
+    # ヘッダー・スキボタンまで描画されていれば、価格・高評価・タグの要素が無いことは「無い」とみなす
+    head = '<head><meta property="article:published_time" content="2024-05-01T20:00:00+09:00"></head>'
+    fields = parse_article_html(url, f"<html>{head}<body>{header}{body}{footer}</body></html>")
+    assert fields["price"] == 0 and fields["highRating"] == 0 and fields["tags"] == ""
+    assert fields["likes"] == 12
+    assert not missing_fields(fields)
+
+    # 描画されていない部分は分からないまま（ブラウザで補完する）
+    fields = parse_article_html(url, f"<html><body>{body}</body></html>")
+    assert {"price", "highRating", "tags"} <= set(missing_fields(fields))
+
+    paid = '<div class="o-noteContentHeader"><span class="o-noteContentHeader__status">¥500</span></div>'
+    assert parse_article_html(url, f"<html><body>{paid}{body}</body></html>")["price"] == 500
+
+
+class CheckPage:
+    """check_purchased_24h 用: goto で落ちる・ポップアップ待ちがタイムアウトするページ"""
+
+    def __init__(self, crash: bool):
+        self.crash = crash
+
+    def goto(self, url, **kwargs):
+        if self.crash:
+            raise RuntimeError("Target page, context or browser has been closed")
+
+    def wait_for_selector(self, selector, **kwargs):
+        raise PlaywrightTimeoutError("Timeout 1500ms exceeded")
+
+
+def test_failed_check_is_not_a_miss():
+    url = "https://note.com/sample_writer/n/n1a2b3c4d5e6f"
+    assert check_purchased_24h(CheckPage(crash=False), url) is False
+    # ページが落ちたチェックは「なし」にせず例外のまま（送信されず、プールがページを作り直す）
+    try:
+        check_purchased_24h(CheckPage(crash=True), url)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("crashed check returned a result")
+
+
+if __name__ == "__main__":
+    test_har_fetcher()
+    test_field_sources()
+    test_static_html_resolves_absent_fields()
+    test_local_gas()
+    test_tracking_results_applied_once()
+    test_call_counter()
+    test_failed_check_is_not_a_miss()
+    print("[done] replay harness tests passed")
@@ -0,0 +1,78 @@
+"""検索APIレスポンスの収集（SearchHarvester）のテスト
+
+保存済みの検索APIレスポンス（fixtures/search_api/*.json）を使う。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_search_harvest.py
+"""
+import json
+from pathlib import Path
+
+from src.search_harvest import SearchHarvester, parse_search_response
+
+FIXTURES = Path(__file__).parent / "fixtures" / "search_api"
+
+
+def load_fixture(name: str):
+    return json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+class FakeResponse:
+    """Playwright の Response の代わり（url / headers / json のみ）"""
+
+    def __init__(self, url: str, body, content_type: str = "application/json; charset=utf-8"):
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def test_parse_search_response():
+    records = parse_search_response(load_fixture("popular_page1.json"))
+    assert list(records) == [
+        "https://note.com/sample_writer/n/n1a2b3c4d5e6f",
+        "https://note.com/ai_guide/n/n9f8e7d6c5b4a",
+    ]
+
+    first = records["https://note.com/sample_writer/n/n1a2b3c4d5e6f"]
+    assert first == {
+        "title": "副業で月5万円を稼ぐまでにやったこと全部",
+        "author": "サンプル書き手",
+        "authorUrl": "https://note.com/sample_writer",
+        "price": 980,
+        "likes": 1234,
+        "createdAt": "2024-05-01T20:00:00+09:00",
+        "tags": "副業,ブログ",
+    }
+
+    # note_url が無くても user.urlname と key から組み立てる。タグが無ければキー自体を含めない
+    second = records["https://note.com/ai_guide/n/n9f8e7d6c5b4a"]
+    assert second["price"] == 0
+    assert "tags" not in second
+
+
+def test_harvester_merges_responses():
+    harvester = SearchHarvester()
+    base = "https://note.com/api/v3/searches?context=note_for_sale&q=%E5%89%AF%E6%A5%AD"
+    harvester._on_response(FakeResponse(f"{base}&sort=popular&start=0", load_fixture("popular_page1.json")))
+    harvester._on_response(FakeResponse(f"{base}&sort=trend&start=0", load_fixture("trend_page1.json")))
+    # 検索API以外・JSON以外は無視
+    harvester._on_response(FakeResponse("https://note.com/api/v2/creators/x", load_fixture("trend_page1.json")))
+    harvester._on_response(FakeResponse(f"{base}&sort=popular", {}, content_type="text/html"))
+
+    assert harvester.responses == 2
+    # クエリ付きの note_url も正規化URLでまとまる。組み立てられない記事とユーザー一覧は含まない
+    assert len(harvester.records) == 2
+
+    record = harvester.get("https://note.com/sample_writer/n/n1a2b3c4d5e6f?from=search#top")
+    assert record["likes"] == 1240  # 後から届いた値で更新
+    assert record["tags"] == "副業,ブログ"  # 後のレスポンスに無い項目は残る
+    assert harvester.get("https://note.com/unknown/n/nxxxx") == {}
+
+
+if __name__ == "__main__":
+    test_parse_search_response()
+    test_harvester_merges_responses()
+    print("[done] search harvest tests passed")
@@ -0,0 +1,51 @@
+"""SelectorRegistry（抽出セレクタの並べ替え・集計）のテスト
+
+ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_selector_stats.py
+"""
+from src.extractor import TAG_SELECTORS, TITLE_SELECTORS
+from src.selector_stats import SelectorRegistry
+
+
+def test_fallbacks_stay_in_place():
+    registry = SelectorRegistry()
+    # 広く当たる h1 が具体的なセレクタより多く値を返しても、先頭には来ない
+    for _ in range(50):
+        registry.record({"title": "h1", "tags": 'a[href*="/hashtag/"]'})
+    for _ in range(5):
+        registry.record({"title": ".p-note__title h1", "tags": ".o-noteHashtag a"})
+    order = registry.ordered()
+    assert order["title"] == [
+        ".p-note__title h1",
+        "h1.o-noteContentText__title",
+        "h1.note-title",
+        "h1",
+        'meta[property="og:title"]',
+    ]
+    assert order["tags"][:3] == [".o-noteHashtag a", ".m-tagList__item a", 'a[href*="/hashtag/"]']
+    assert sorted(order["tags"]) == sorted(TAG_SELECTORS)
+    # 購入ボタン周辺は入れ替えない
+    registry.record({"priceButton": "[class*='price']"})
+    assert order["priceButton"] == registry.ordered()["priceButton"]
+
+
+def test_merge_uses_worker_order():
+    worker = SelectorRegistry(keep_recorded=True)
+    worker_order = {"title": [".p-note__title h1"] + [s for s in TITLE_SELECTORS if s != ".p-note__title h1"]}
+    # ワーカーでは .p-note__title h1 を先に試して当たった（他の候補は試していない）
+    worker.record({"title": ".p-note__title h1"}, worker_order)
+
+    parent = SelectorRegistry()
+    parent.merge(worker.take_recorded())
+    selectors = parent.fields["title"]["selectors"]
+    assert selectors[".p-note__title h1"]["tries"] == 1 and selectors[".p-note__title h1"]["hits"] == 1
+    assert selectors["h1.o-noteContentText__title"]["tries"] == 0
+    assert worker.take_recorded() == []
+
+
+if __name__ == "__main__":
+    test_fallbacks_stay_in_place()
+    test_merge_uses_worker_order()
+    print("[done] selector stats tests passed")
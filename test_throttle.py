@@ -0,0 +1,126 @@
+"""AdaptiveThrottle（AIMD のトークンバケット）のテスト
+
+時計と sleep を差し替えて実時間を使わずに確認する。ネットワーク・ブラウザ不要。
+
+使い方:
+  python test_throttle.py
+"""
+from src.throttle import AdaptiveThrottle, ThrottleConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_throttle(clock, ceiling=0, share=1, **overrides):
+    config = ThrottleConfig(enabled=True, jitter=0, **overrides)
+    return AdaptiveThrottle(config, ceiling, share, clock=clock, sleep=clock.sleep)
+
+
+def test_token_bucket_spacing():
+    clock = FakeClock()
+    throttle = make_throttle(clock, initial_per_minute=30)
+    # 1トークン目は待たず、以降は 60/30 = 2秒間隔
+    for _ in range(4):
+        throttle.acquire()
+    assert clock.slept == [2.0, 2.0, 2.0]
+    # 処理に時間がかかった分は待ち時間から差し引く
+    clock.now += 1.5
+    throttle.acquire()
+    assert clock.slept[-1] == 0.5
+
+
+def test_additive_increase_and_ceiling():
+    clock = FakeClock()
+    throttle = make_throttle(clock, ceiling=25, initial_per_minute=20, increase_per_minute=2)
+    # 20回/分の応答が1分続くと約 +2/分
+    for _ in range(20):
+        throttle.record(200, 500)
+    assert 21.8 < throttle.rate < 22.1
+    # max_articles_per_minute が上限
+    for _ in range(200):
+        throttle.record(200, 500)
+    assert throttle.rate == 25
+
+
+def test_multiplicative_decrease_with_cooldown():
+    clock = FakeClock()
+    throttle = make_throttle(clock, initial_per_minute=40, min_per_minute=8, cooldown_seconds=10)
+    throttle.record(503, 300)
+    assert throttle.rate == 20
+    # 同じ混雑の続きの失敗・回復では上げ下げしない
+    throttle.record(status=None, timeout=True)
+    throttle.record(200, 300)
+    assert throttle.rate == 20
+    clock.now += 10
+    throttle.record(200, 5000)
+    assert throttle.rate == 10
+    clock.now += 10
+    throttle.record(429, 100)
+    # 下限で止まる
+    assert throttle.rate == 8
+    assert throttle.decreases == 3
+    assert throttle.signals == {"5xx": 1, "timeout": 1, "slow": 1, "429": 1}
+
+
+def test_retry_after_delays_next_token():
+    clock = FakeClock()
+    throttle = make_throttle(clock, initial_per_minute=60, min_per_minute=6)
+    throttle.record(429, 100, retry_after="30")
+    throttle.acquire()
+    # Retry-After の30秒 + 下げた後のレート（30/分）での1トークン分
+    assert clock.slept == [32.0]
+
+
+def test_shared_across_processes():
+    clock = FakeClock()
+    throttle = make_throttle(clock, ceiling=45, share=3, initial_per_minute=30, min_per_minute=6, max_per_minute=60)
+    assert (throttle.floor, throttle.rate, throttle.ceiling) == (2, 10, 15)
+
+    parent = make_throttle(clock)
+    parent.merge({"worker": 0, **throttle.snapshot()})
+    throttle.record(503, 100)
+    parent.merge({"worker": 0, **throttle.snapshot()})
+    parent.merge({"worker": 1, "rate": 12.0, "lowest": 10.0, "highest": 12.0, "responses": 3, "decreases": 0, "signals": {}})
+    assert parent.summary() == "最終 17.0/分（2プロセス合計） / 応答 4件 / 減速 1回（5xx 1）"
+
+
+def test_secondary_requests_only_slow_down():
+    clock = FakeClock()
+    throttle = make_throttle(clock, initial_per_minute=20, increase_per_minute=2)
+    # HTTP優先モードの事前のGETの正常な応答は数えない（記事1件につき1回の加算）
+    for _ in range(20):
+        throttle.record(200, 300, secondary=True)
+        throttle.record(200, 500)
+    assert throttle.responses == 20 and 21.8 < throttle.rate < 22.1
+    throttle.record(503, 300, secondary=True)
+    assert throttle.decreases == 1 and throttle.signals == {"5xx": 1}
+
+
+def test_disabled_is_noop():
+    clock = FakeClock()
+    throttle = AdaptiveThrottle(ThrottleConfig(), clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        throttle.acquire()
+        throttle.record(503)
+    assert clock.slept == [] and throttle.responses == 0
+
+
+if __name__ == "__main__":
+    test_token_bucket_spacing()
+    test_additive_increase_and_ceiling()
+    test_multiplicative_decrease_with_cooldown()
+    test_retry_after_delays_next_token()
+    test_shared_across_processes()
+    test_secondary_requests_only_slow_down()
+    test_disabled_is_noop()
+    print("[done] throttle tests passed")
@@ -3,16 +3,14 @@ import time
 import random
 from playwright.sync_api import sync_playwright
 
+from src.browser import acquire_browser
+from src.main import load_config
+
 def test_scroll():
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-            locale="ja-JP",
-            timezone_id="Asia/Tokyo",
-        )
-        page = context.new_page()
+        # 常駐ブラウザが動いていれば接続（無ければプロセス内で起動）
+        lease = acquire_browser(p, True, load_config("config.yaml").browser_service)
+        page = lease.new_page()
 
         url = "https://note.com/search?context=note_for_sale&q=副業&sort=popular"
         print(f"[1] Navigating to {url}")
@@ -47,7 +45,7 @@ def test_scroll():
             print(f"[scroll {i+1}] Articles after scroll: {articles_after}")
             print(f"[scroll {i+1}] Delta: {articles_after - articles_before}")
 
-        browser.close()
+        lease.close()
         print("[done] Test complete")
 
 if __name__ == "__main__":